@@ -0,0 +1,19 @@
+# Gunicorn settings, read automatically when gunicorn starts in this directory.
+wsgi_app = 'myproject.wsgi:application'
+
+# Import the application, views and templates once in the master process;
+# workers are forked with them already loaded (see sales/startup.py).
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Write buffered read receipts and view counts while the worker is idle.
+    from django.conf import settings
+    from sales.buffers import start_flush_thread
+    start_flush_thread(getattr(settings, 'BUFFER_FLUSH_POLL_INTERVAL', 1))
+
+
+def worker_exit(server, worker):
+    # Write whatever the worker still has buffered before it goes away.
+    from sales.buffers import flush_all
+    flush_all()
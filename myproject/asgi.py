@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
 
 application = get_asgi_application()
+
+# Load views and templates now, so a preloading server does it once before
+# forking its workers (see sales/startup.py).
+from sales.startup import warm_up  # noqa: E402
+
+warm_up()
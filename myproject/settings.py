@@ -33,10 +33,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'sales.metrics.MetricsMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'sales.rate_limiting.ConcurrencyLimitMiddleware',
+    'sales.compression.CompressionMiddleware',
+    'sales.compression.HTMLMinifyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sales.auth_cache.CachedAuthenticationMiddleware',
+    'sales.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -108,6 +114,7 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -128,3 +135,144 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Read receipts are buffered per (conversation, user) and written in batches.
+# See sales/read_receipts.py.
+READ_RECEIPT_FLUSH_INTERVAL = 2  # seconds
+READ_RECEIPT_MAX_PENDING = 500
+READ_RECEIPT_BATCH_SIZE = 100
+
+# Ad detail page views are counted in memory and flushed in bulk.
+# See sales/view_counts.py.
+AD_VIEW_FLUSH_INTERVAL = 30  # seconds
+AD_VIEW_MAX_PENDING = 1000
+AD_VIEW_BATCH_SIZE = 200
+
+# How often a gunicorn worker's flush thread checks the buffers above, so an
+# idle worker still writes them. See sales/buffers.py and gunicorn.conf.py.
+BUFFER_FLUSH_POLL_INTERVAL = 1  # seconds
+
+# Facet counts for the ad search sidebar. See sales/facets.py.
+FACET_CACHE_TIMEOUT = 300  # seconds
+FACET_PRICE_BUCKETS = [0, 100, 500, 1000, 5000, 10000]
+FACET_LOCATION_LIMIT = 10
+
+# Radius searches return at most this many of the closest ads. See sales/geo.py.
+GEO_MAX_RESULTS = 500
+
+# Search-as-you-type suggestions are served from a per-process prefix index.
+# See sales/autocomplete.py.
+AUTOCOMPLETE_MAX_TERMS = 20000  # per index
+AUTOCOMPLETE_REBUILD_INTERVAL = 600  # seconds
+
+# Number of similar listings precomputed per ad by the compute_related_ads
+# command. See sales/related_ads.py.
+RELATED_ADS_COUNT = 6
+
+# Ads whose estimated text similarity reaches this share are flagged as
+# near-duplicates. See sales/duplicates.py.
+DUPLICATE_SIMILARITY_THRESHOLD = 0.8
+
+# Ads are deactivated AD_EXPIRY_DAYS after they are posted (or once their
+# event date has passed) and archived after AD_ARCHIVE_AFTER_DAYS of
+# inactivity by the expire_ads command. See sales/lifecycle.py.
+AD_EXPIRY_DAYS = 60
+AD_ARCHIVE_AFTER_DAYS = 180
+
+# Deleted ads and users are removed by the process_deletions command, this
+# many dependent rows per DELETE. See sales/deletion.py.
+BULK_DELETE_CHUNK_SIZE = 1000
+
+# Admin changelists for large tables count at most ADMIN_COUNT_LIMIT rows and
+# only offer index-backed search. See sales/admin_performance.py.
+ADMIN_PERFORMANCE_MODE = True
+ADMIN_COUNT_LIMIT = 10000
+
+# Most images accepted by one batch upload request to the ad image API.
+AD_IMAGE_UPLOAD_LIMIT = 20
+
+# Uploaded media is stored once per distinct content, reference counted
+# (see sales/storage.py). Blobs live under MEDIA_ROOT/MEDIA_BLOB_DIR.
+STORAGES = {
+    'default': {'BACKEND': 'sales.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+MEDIA_BLOB_DIR = 'blobs'
+
+# The default cache is per process. It holds sessions, cached users, facet
+# counts and rate-limit buckets, so a deployment running more than one worker
+# process (gunicorn -w N) must point it at a cache shared by the workers, or
+# logouts and deactivated users are only cleared in the worker that handled
+# them. `manage.py check --deploy` warns about this (sales.W001). E.g.:
+#     CACHES = {'default': {
+#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#         'LOCATION': 'redis://127.0.0.1:6379',
+#     }}
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+# Sessions are read from the cache and written through to the database, and
+# authenticated users are cached by id and session auth hash (see
+# sales/auth_cache.py), so a logged-in request normally runs no auth queries.
+# 'django.contrib.sessions.backends.signed_cookies' also avoids session reads
+# but keeps session data on the client.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTH_USER_CACHE = 'default'
+AUTH_USER_CACHE_TIMEOUT = 300
+
+# Outside DEBUG, WhiteNoise serves collected static files under hashed names
+# with far-future cache headers, plus the gzip (and, with the Brotli package
+# installed, brotli) copies made by collectstatic.
+if not DEBUG:
+    STORAGES['staticfiles'] = {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'}
+
+# How media files are served (see sales/media.py): 'python' streams them with
+# range support, 'x-accel' hands them to nginx through an internal location
+# at MEDIA_ACCEL_REDIRECT_PREFIX, 'sendfile' hands them to Apache/lighttpd.
+MEDIA_SERVE_MODE = 'python'
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_MAX_AGE = 3600
+
+# Text responses of at least COMPRESSION_MIN_SIZE bytes are sent brotli (when
+# the Brotli package is installed) or gzip compressed, and with HTML_MINIFY
+# on, template whitespace is collapsed first (see sales/compression.py).
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_BROTLI_QUALITY = 4
+HTML_MINIFY = False
+
+# Metrics served at /metrics (see sales/metrics.py). Set METRICS_MULTIPROC_DIR
+# to a directory shared by the gunicorn workers, emptied on every restart, to
+# aggregate their samples.
+METRICS_MULTIPROC_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+
+# Request profiling (see sales/profiling.py): staff users can profile a
+# request with an "X-Profile: 1" header or ?profile=1, and one in every
+# PROFILING_SAMPLE_RATE requests is profiled at random (0 disables sampling).
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_SAMPLE_RATE = 0
+
+# Templates compiled at process start-up, before workers are forked (see
+# sales/startup.py).
+STARTUP_TEMPLATES = (
+    'base.html', 'welcome.html', 'ad_list_view.html', 'ad_detail_view.html', 'dashboard.html',
+    'conversations/list.html', 'conversations/detail.html',
+)
+
+# Per-user token buckets, as (requests per minute, burst), for the views
+# using RateLimitMixin (see sales/rate_limiting.py). The chat page polls every
+# 3 seconds, so the polling budget covers a few open tabs.
+RATE_LIMITS = {
+    'send_message': (20, 5),
+    'poll_messages': (60, 10),
+}
+RATE_LIMIT_CACHE = 'default'
+
+# Load shedding per worker process: with MAX_CONCURRENT_REQUESTS set (e.g. to
+# the gunicorn thread count), LOW_PRIORITY_VIEWS are turned away with a 503
+# once LOAD_SHED_THRESHOLD of it is in use, and every request at the limit.
+MAX_CONCURRENT_REQUESTS = None
+LOAD_SHED_THRESHOLD = 0.75
+LOW_PRIORITY_VIEWS = ('conversation_messages_json',)
+LOAD_SHED_RETRY_AFTER = 5
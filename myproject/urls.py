@@ -1,7 +1,7 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from sales.media import MediaFileView
 from sales.views import (
     StartConversationView, ConversationListView, ConversationDetailView,
     SendMessageView, ConversationMessagesJSONView, AdConversationListView,
@@ -20,8 +20,5 @@ urlpatterns = [
     path('ads/<int:ad_id>/conversations/', AdConversationListView.as_view(), name='conversation_list_for_ad'),
     path('messages/<int:message_id>/update/', UpdateMessageView.as_view(), name='update_message'),
     path('messages/<int:message_id>/delete/', DeleteMessageView.as_view(), name='delete_message'),
-
+    re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.+)$', MediaFileView.as_view(), name='media'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
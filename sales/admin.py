@@ -1,6 +1,16 @@
+from collections import defaultdict
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Category, Ad, Message, AdImage, Conversation
+from django.db.models import Q
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from .models import CustomUser, Category, Ad, Message, AdImage, Conversation, SavedSearch
+from .admin_performance import PerformanceModeAdminMixin, prefix_condition
+from .autocomplete import ad_autocomplete
+from .deletion import exclude_pending_deletion, schedule_ads_deletion, schedule_users_deletion
+from .facets import invalidate_facets
+from .message_search import content_condition
+from .saved_searches import percolate_ads
 from ordered_model.admin import OrderedTabularInline
 
 
@@ -11,6 +21,13 @@ class CustomUserAdmin(UserAdmin):
         ('Contact Information', {'fields': ('phone_number', 'contact_info_visibility')}),
         ('Profile', {'fields': ('profile_picture',)}),
     )
+    actions = ['delete_in_background']
+
+    @admin.action(description="Delete selected users and their ads in the background")
+    def delete_in_background(self, request, queryset):
+        user_ids = list(queryset.values_list('pk', flat=True))
+        schedule_users_deletion(user_ids)
+        self.message_user(request, f"Deactivated {len(user_ids)} users; they will be deleted by the deletion job.")
 
 
 @admin.register(Category)
@@ -24,14 +41,106 @@ class AdImageInline(OrderedTabularInline):
     extra = 1
     ordering = ('order',)
 
+class DuplicateListFilter(admin.SimpleListFilter):
+    title = 'duplicates'
+    parameter_name = 'duplicates'
+
+    def lookups(self, request, model_admin):
+        return [('duplicate', 'Near-duplicates'), ('original', 'Originals with duplicates')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'duplicate':
+            return queryset.filter(duplicate_of__isnull=False)
+        if self.value() == 'original':
+            return queryset.filter(duplicates__isnull=False).distinct()
+        return queryset
+
+def set_ads_active(queryset, is_active, batch_size=500):
+    """
+    Switch the ads on or off with a single UPDATE, then bring what the
+    post_save receivers would have maintained up to date in bulk: the facets
+    and the autocomplete index are invalidated once, and newly activated ads
+    are percolated in batches. Returns the number of ads changed.
+    """
+    now = timezone.now()
+    updated = queryset.filter(is_active=not is_active).update(is_active=is_active, updated_at=now)
+    if not updated:
+        return 0
+    invalidate_facets()
+    ad_autocomplete.mark_stale()
+    if is_active:
+        # The UPDATE's timestamp identifies the rows it activated.
+        activated = Ad.objects.filter(is_active=True, updated_at=now).order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(activated.filter(pk__gt=last_pk)[:batch_size])
+            percolate_ads(batch)
+            if len(batch) < batch_size:
+                break
+            last_pk = batch[-1].pk
+    return updated
+
 @admin.register(Ad)
-class AdAdmin(admin.ModelAdmin):
-    list_display = ['title', 'user', 'category', 'price', 'is_active', 'created_at']
-    list_filter = ['category', 'is_active', 'created_at']
+class AdAdmin(PerformanceModeAdminMixin, admin.ModelAdmin):
+    list_display = ['title', 'user', 'category', 'price', 'is_active', 'views', 'duplicate_of_id', 'created_at']
+    list_select_related = ['user', 'category']
+    list_filter = ['category', 'is_active', DuplicateListFilter, 'created_at']
     search_fields = ['title', 'description', 'location']
+    indexed_search_help_text = "Search by ad id, exact username or the beginning of the title."
     date_hierarchy = 'created_at'
     raw_id_fields = ['user', 'category']
     inlines = [AdImageInline]
+    actions = [
+        'activate_ads', 'deactivate_ads', 'delete_in_background',
+        'review_duplicate_clusters', 'deactivate_duplicates',
+    ]
+
+    def get_indexed_search_condition(self, term):
+        condition = Q(user__username=term) | prefix_condition('title', term)
+        if term.isdigit():
+            condition |= Q(pk=term)
+        return condition
+
+    @admin.action(description="Activate selected ads")
+    def activate_ads(self, request, queryset):
+        # Ads queued for deletion stay hidden until the deletion job removes them.
+        updated = set_ads_active(exclude_pending_deletion(queryset), True)
+        self.message_user(request, f"Activated {updated} ads.")
+
+    @admin.action(description="Deactivate selected ads")
+    def deactivate_ads(self, request, queryset):
+        updated = set_ads_active(queryset, False)
+        self.message_user(request, f"Deactivated {updated} ads.")
+
+    @admin.action(description="Review near-duplicate clusters of the selected ads")
+    def review_duplicate_clusters(self, request, queryset):
+        roots = {duplicate_of_id or pk for pk, duplicate_of_id in queryset.values_list('pk', 'duplicate_of_id')}
+        clusters = defaultdict(list)
+        members = (
+            Ad.objects.filter(Q(pk__in=roots) | Q(duplicate_of__in=roots))
+            .select_related('user', 'category')
+            .order_by('pk')
+        )
+        for ad in members:
+            clusters[ad.duplicate_of_id or ad.pk].append(ad)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Near-duplicate clusters',
+            'opts': self.model._meta,
+            'clusters': [cluster for cluster in clusters.values() if len(cluster) > 1],
+        }
+        return TemplateResponse(request, 'admin/sales/ad/duplicate_clusters.html', context)
+
+    @admin.action(description="Deactivate selected ads that are near-duplicates")
+    def deactivate_duplicates(self, request, queryset):
+        updated = set_ads_active(queryset.filter(duplicate_of__isnull=False), False)
+        self.message_user(request, f"Deactivated {updated} duplicate ads.")
+
+    @admin.action(description="Delete selected ads in the background")
+    def delete_in_background(self, request, queryset):
+        ad_ids = list(queryset.values_list('pk', flat=True))
+        schedule_ads_deletion(ad_ids)
+        self.message_user(request, f"Hid {len(ad_ids)} ads; they will be deleted by the deletion job.")
 
 @admin.register(AdImage)
 class AdImageAdmin(admin.ModelAdmin):
@@ -42,18 +151,47 @@ class AdImageAdmin(admin.ModelAdmin):
     ordering = ('ad', 'order')
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(PerformanceModeAdminMixin, admin.ModelAdmin):
     list_display = ['ad_title', 'sender', 'recipient', 'sent_at', 'read']
     list_select_related = (
         'conversation',
         'conversation__ad',
-        'conversation__ad__user',  # ad owner
+        'conversation__owner',
+        'conversation__buyer',
         'sender',
     )
     list_filter = ['read', 'sent_at']
     search_fields = ['content', 'conversation__ad__title', 'sender__username', 'sender__email']
+    indexed_search_help_text = (
+        "Search by words in the message, conversation id, exact sender username or the beginning of the ad title."
+    )
     date_hierarchy = 'sent_at'
     raw_id_fields = ['conversation', 'sender']
+    actions = ['mark_read', 'mark_unread', 'delete_messages']
+
+    def get_indexed_search_condition(self, term):
+        condition = (
+            content_condition(term) | Q(sender__username=term) | prefix_condition('conversation__ad__title', term)
+        )
+        if term.isdigit():
+            condition |= Q(conversation_id=term)
+        return condition
+
+    @admin.action(description="Mark selected messages as read")
+    def mark_read(self, request, queryset):
+        updated = queryset.filter(read=False).update(read=True)
+        self.message_user(request, f"Marked {updated} messages as read.")
+
+    @admin.action(description="Mark selected messages as unread")
+    def mark_unread(self, request, queryset):
+        updated = queryset.filter(read=True).update(read=False)
+        self.message_user(request, f"Marked {updated} messages as unread.")
+
+    @admin.action(description="Delete selected messages")
+    def delete_messages(self, request, queryset):
+        # Messages have no dependents or signal receivers, so this is a single DELETE.
+        deleted, _ = queryset.delete()
+        self.message_user(request, f"Deleted {deleted} messages.")
 
     def ad_title(self, obj):
         return obj.conversation.ad.title
@@ -68,3 +206,10 @@ class ConversationAdmin(admin.ModelAdmin):
     list_display = ['ad', 'owner', 'buyer', 'created_at']
     search_fields = ['ad__title', 'owner__username', 'buyer__username']
     raw_id_fields = ['ad', 'owner', 'buyer']
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'user', 'category', 'minimum_price', 'maximum_price', 'created_at']
+    search_fields = ['name', 'user__username']
+    raw_id_fields = ['user', 'category']
+    readonly_fields = ['anchor_term']
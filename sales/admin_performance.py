@@ -0,0 +1,126 @@
+"""
+Admin "performance mode" for changelists over very large tables.
+
+While `ADMIN_PERFORMANCE_MODE` is on, admins using `PerformanceModeAdminMixin`
+(which read the setting on every request):
+
+* count at most `ADMIN_COUNT_LIMIT` rows per changelist (or use the
+  database's own row estimate for an unfiltered PostgreSQL table) and never
+  run the extra unfiltered "N total" count,
+* drop `date_hierarchy`, whose drill-down runs distinct-date queries over
+  the whole table,
+* replace substring search with lookups that can use indexes: exact ids and
+  usernames, case-sensitive prefix ranges on indexed text columns, and
+  full-text lookups (see `message_search`) for message content,
+* drop the stock "delete selected" action, whose confirmation page collects
+  every related object.
+"""
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Upper bound of every character, for turning a prefix into a range.
+_MAX_CHARACTER = '\U0010ffff'
+
+
+def performance_mode_enabled():
+    return getattr(settings, 'ADMIN_PERFORMANCE_MODE', True)
+
+
+def prefix_condition(field, term):
+    """
+    Match values of `field` starting with `term` (or with it capitalized) as
+    plain range comparisons, which any B-tree index on the column serves.
+    """
+    condition = Q()
+    for prefix in {term, term[:1].upper() + term[1:]}:
+        condition |= Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + _MAX_CHARACTER})
+    return condition
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator whose count is capped at `ADMIN_COUNT_LIMIT`, so pages past
+    the limit are not reachable but no query ever counts a whole table.
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10000)
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self._estimate_table_rows(queryset)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+    def _estimate_table_rows(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] > 0 else None
+
+
+class PerformanceModeChangeList(ChangeList):
+    """
+    A ChangeList taking its date hierarchy and search help text from the
+    model admin's per-request `get_date_hierarchy()` and
+    `get_search_help_text()`.
+    """
+
+    def __init__(
+        self, request, model, list_display, list_display_links, list_filter, date_hierarchy, search_fields,
+        list_select_related, list_per_page, list_max_show_all, list_editable, model_admin, sortable_by,
+        search_help_text,
+    ):
+        super().__init__(
+            request, model, list_display, list_display_links, list_filter,
+            model_admin.get_date_hierarchy(request), search_fields, list_select_related, list_per_page,
+            list_max_show_all, list_editable, model_admin, sortable_by, model_admin.get_search_help_text(request),
+        )
+
+
+class PerformanceModeAdminMixin:
+    """
+    ModelAdmin mixin applying performance mode. Subclasses implement
+    `get_indexed_search_condition(term)` returning a Q object and set
+    `indexed_search_help_text`.
+    """
+
+    @property
+    def show_full_result_count(self):
+        return not performance_mode_enabled()
+
+    def get_changelist(self, request, **kwargs):
+        return PerformanceModeChangeList
+
+    def get_date_hierarchy(self, request):
+        return None if performance_mode_enabled() else self.date_hierarchy
+
+    def get_search_help_text(self, request):
+        return self.indexed_search_help_text if performance_mode_enabled() else self.search_help_text
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        paginator = EstimatedCountPaginator if performance_mode_enabled() else self.paginator
+        return paginator(queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not performance_mode_enabled() or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(self.get_indexed_search_condition(search_term)), False
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if performance_mode_enabled():
+            actions.pop('delete_selected', None)
+        return actions
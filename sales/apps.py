@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SalesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sales'
+
+    def ready(self):
+        from . import checks  # register system checks
+        from . import auth_cache, autocomplete, deletion, duplicates, facets, metrics, read_receipts, saved_searches, view_counts  # connect signal receivers
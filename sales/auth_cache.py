@@ -0,0 +1,107 @@
+"""
+Cached authenticated users.
+
+Django's `AuthenticationMiddleware` loads the user with one `SELECT` on every
+request, including each chat poll. `CachedAuthenticationMiddleware` keeps
+the user object in the cache under its id, together with the session auth
+hash it was loaded for. A request whose session carries the same hash gets
+the cached user without touching the database. Otherwise the user is loaded
+and verified the usual way, which also logs out sessions whose password has
+changed.
+
+Saving, deleting or logging out a user drops the cached copy, so profile
+updates, password changes and deactivation take effect on the next request;
+`invalidate_users()` does the same for queryset updates. A cached user the
+authentication backend would no longer let in (e.g. deactivated) is never
+served. `AUTH_USER_CACHE_TIMEOUT` bounds how long a cached user is kept.
+
+The users are kept in the `AUTH_USER_CACHE` cache. Invalidation only reaches
+other worker processes when that cache is shared between them (Redis,
+Memcached); with the per-process `LocMemCache` a worker keeps serving its
+own copy until the timeout. The `sales.W001` check warns about that.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import caches
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import record_cache_lookup
+from .models import CustomUser
+
+
+def _cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def get_user_cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE', 'default')]
+
+
+def get_user(request):
+    """Return the request's user, from the cache when the session allows it."""
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _load_user(request)
+    return request._cached_user
+
+
+def _load_user(request):
+    user_id = request.session.get(auth.SESSION_KEY)
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    backend_path = request.session.get(auth.BACKEND_SESSION_KEY)
+    if user_id is None or not session_hash or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    cache = get_user_cache()
+    cached = cache.get(_cache_key(user_id))
+    hit = cached is not None and constant_time_compare(cached[0], session_hash) and _can_authenticate(
+        backend_path, cached[1]
+    )
+    record_cache_lookup('auth_user', hit)
+    if hit:
+        user = cached[1]
+        user.backend = backend_path
+        return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(
+            _cache_key(user.pk), (user.get_session_auth_hash(), user),
+            getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300),
+        )
+    return user
+
+
+def _can_authenticate(backend_path, user):
+    # The same check ModelBackend.get_user() makes, e.g. that the user is active.
+    user_can_authenticate = getattr(auth.load_backend(backend_path), 'user_can_authenticate', None)
+    return user_can_authenticate is None or user_can_authenticate(user)
+
+
+def invalidate_users(user_ids):
+    """Drop the cached copies of the given users."""
+    get_user_cache().delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """`AuthenticationMiddleware` serving `request.user` from the user cache."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='sales.auth_cache.user_saved')
+@receiver(post_delete, sender=CustomUser, dispatch_uid='sales.auth_cache.user_deleted')
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_users([instance.pk])
+
+
+@receiver(user_logged_out, dispatch_uid='sales.auth_cache.user_logged_out')
+def invalidate_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_users([user.pk])
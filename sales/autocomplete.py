@@ -0,0 +1,218 @@
+"""
+In-memory prefix index for search-as-you-type suggestions.
+
+Each worker process keeps one `PrefixIndex` for title words and one for
+distinct ad locations. An index is a sorted list of normalized terms searched
+with `bisect`, plus a popularity count per term (the number of active ads
+using it). The indexes are built from the database on first use and kept
+up to date from Ad save/delete signals. Saves that may change an indexed
+ad's title, location or activity read its stored row in `pre_save`, and only
+while the index is built; other saves cost nothing. Every
+`AUTOCOMPLETE_REBUILD_INTERVAL` seconds, or sooner after `mark_stale()`, the
+indexes are rebuilt from scratch to pick up changes made by other workers and
+by queryset updates. The rebuild runs after a request has finished and from
+the worker's flush thread (see sales/buffers.py), never inside a lookup,
+which keeps serving the previous index meanwhile. Memory is bounded by `AUTOCOMPLETE_MAX_TERMS` per index; the least
+popular terms are dropped first.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import buffers
+from .models import Ad
+from .text import tokenize
+
+MIN_TERM_LENGTH = 3
+# Saving an ad with update_fields outside this set cannot change the indexes.
+INDEXED_FIELDS = {'title', 'location', 'is_active'}
+# How many prefix matches are ranked per lookup; bounds the work for short
+# prefixes such as "a".
+MAX_SCAN = 500
+
+
+def _normalize(value):
+    return ' '.join(value.lower().split())
+
+
+class PrefixIndex:
+    def __init__(self, max_terms):
+        self.max_terms = max_terms
+        self._terms = []
+        self._counts = {}
+        self._labels = {}
+
+    def __len__(self):
+        return len(self._terms)
+
+    def add(self, label, count=1):
+        term = _normalize(label)
+        if not term:
+            return
+        if term in self._counts:
+            self._counts[term] += count
+            return
+        bisect.insort(self._terms, term)
+        self._counts[term] = count
+        self._labels[term] = label.strip()
+        if len(self._terms) > self.max_terms:
+            self._evict()
+
+    def remove(self, label, count=1):
+        term = _normalize(label)
+        if term not in self._counts:
+            return
+        self._counts[term] -= count
+        if self._counts[term] <= 0:
+            del self._counts[term]
+            del self._labels[term]
+            del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def search(self, prefix, limit):
+        """Return up to `limit` labels starting with `prefix`, most popular first."""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._terms, prefix)
+        matches = []
+        for term in self._terms[start:start + MAX_SCAN]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        matches.sort(key=lambda term: (-self._counts[term], term))
+        return [self._labels[term] for term in matches[:limit]]
+
+    def _evict(self):
+        # Drop the least popular tenth in one pass instead of one term per insert.
+        keep = sorted(self._counts, key=self._counts.get, reverse=True)[:int(self.max_terms * 0.9)]
+        self._counts = {term: self._counts[term] for term in keep}
+        self._labels = {term: self._labels[term] for term in keep}
+        self._terms = sorted(keep)
+
+
+class AdAutocomplete:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self.titles = None
+        self.locations = None
+        self._built_at = None
+        self._stale = False
+
+    def _title_terms(self, title):
+        return {term for term in tokenize(title) if len(term) >= MIN_TERM_LENGTH}
+
+    def build(self):
+        max_terms = getattr(settings, 'AUTOCOMPLETE_MAX_TERMS', 20000)
+        titles, locations = PrefixIndex(max_terms), PrefixIndex(max_terms)
+        rows = Ad.objects.filter(is_active=True).values_list('title', 'location')
+        for title, location in rows.iterator(chunk_size=2000):
+            for term in self._title_terms(title):
+                titles.add(term)
+            locations.add(location)
+        with self._lock:
+            self.titles, self.locations = titles, locations
+            self._built_at = time.monotonic()
+            self._stale = False
+
+    def is_built(self):
+        return self._built_at is not None
+
+    def _ensure_built(self):
+        # Only the first lookup builds; later rebuilds happen off the lookup path.
+        if self._built_at is None:
+            self.build()
+
+    def mark_stale(self):
+        """Have the next `rebuild_if_stale()` rebuild, e.g. after a queryset update."""
+        self._stale = True
+
+    def rebuild_if_stale(self):
+        if self._built_at is None:
+            return
+        interval = getattr(settings, 'AUTOCOMPLETE_REBUILD_INTERVAL', 600)
+        if not (self._stale or time.monotonic() - self._built_at >= interval):
+            return
+        # One rebuild at a time; other threads keep serving the current index.
+        if self._rebuild_lock.acquire(blocking=False):
+            try:
+                self.build()
+            finally:
+                self._rebuild_lock.release()
+
+    def suggest(self, prefix, field, limit=8):
+        self._ensure_built()
+        index = self.titles if field == 'title' else self.locations
+        with self._lock:
+            return index.search(prefix, limit)
+
+    def update(self, old, new):
+        """
+        Apply the change of one ad, given as (title, location) tuples for its
+        previous and current active state (None when not active).
+        """
+        if self._built_at is None or old == new:
+            return
+        with self._lock:
+            if old is not None:
+                for term in self._title_terms(old[0]):
+                    self.titles.remove(term)
+                self.locations.remove(old[1])
+            if new is not None:
+                for term in self._title_terms(new[0]):
+                    self.titles.add(term)
+                self.locations.add(new[1])
+
+    def reset(self):
+        with self._lock:
+            self.titles = self.locations = self._built_at = None
+            self._stale = False
+
+
+ad_autocomplete = AdAutocomplete()
+
+
+def _indexed_state(title, location, is_active):
+    return (title, location) if is_active else None
+
+
+@receiver(pre_save, sender=Ad, dispatch_uid='sales.autocomplete.read_stored_state')
+def read_stored_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._autocomplete_state = None
+    if (
+        raw or instance._state.adding or not ad_autocomplete.is_built()
+        or (update_fields is not None and not INDEXED_FIELDS & set(update_fields))
+    ):
+        return
+    stored = Ad.objects.filter(pk=instance.pk).values_list('title', 'location', 'is_active').first()
+    instance._autocomplete_state = _indexed_state(*stored) if stored else None
+
+
+@receiver(post_save, sender=Ad, dispatch_uid='sales.autocomplete.update_on_save')
+def update_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    new_state = _indexed_state(instance.title, instance.location, instance.is_active)
+    ad_autocomplete.update(instance.__dict__.pop('_autocomplete_state', None), new_state)
+
+
+@receiver(post_delete, sender=Ad, dispatch_uid='sales.autocomplete.update_on_delete')
+def update_on_delete(sender, instance, **kwargs):
+    if instance.get_deferred_fields() & INDEXED_FIELDS:
+        # Deleted without its indexed fields loaded: leave it to the rebuild.
+        ad_autocomplete.mark_stale()
+    else:
+        ad_autocomplete.update(_indexed_state(instance.title, instance.location, instance.is_active), None)
+
+
+@receiver(request_finished, dispatch_uid='sales.autocomplete.rebuild_if_stale')
+def rebuild_if_stale(**kwargs):
+    ad_autocomplete.rebuild_if_stale()
+
+
+buffers.register_periodic(ad_autocomplete.rebuild_if_stale)
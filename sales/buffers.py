@@ -0,0 +1,119 @@
+"""
+In-process write buffers.
+
+Read receipts and ad view counts are collected in a `WriteBuffer` shared by
+the threads of a worker process and written to the database in bulk later.
+Each buffering module registers its `flush` and `flush_due` functions with
+`register()`:
+
+* `flush_due` runs after every request (a `request_finished` receiver in the
+  module) and, in gunicorn workers, every `BUFFER_FLUSH_POLL_INTERVAL`
+  seconds from the thread started by `start_flush_thread()`, so an idle
+  worker still writes what it holds;
+* `flush_all()` writes everything, and runs when a gunicorn worker exits
+  (see gunicorn.conf.py) and from the `flush_read_receipts` command.
+
+Other per-process upkeep that must stay off the request path, such as
+rebuilding the autocomplete index, is registered with `register_periodic()`
+and run by the same thread.
+"""
+import logging
+import threading
+import time
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_registered = []
+_periodic = []
+
+
+class WriteBuffer:
+    """
+    A dict of pending writes guarded by a lock. `combine(old, new)` merges a
+    value into the one already pending for its key; `size(pending)` is what
+    `is_due()` compares with the buffer's limit.
+    """
+
+    def __init__(self, combine, size=len):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._combine = combine
+        self._size = size
+
+    def add(self, key, value):
+        with self._lock:
+            self._pending[key] = self._combine(self._pending[key], value) if key in self._pending else value
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._pending.get(key, default)
+
+    def values_for(self, predicate):
+        with self._lock:
+            return [value for key, value in self._pending.items() if predicate(key)]
+
+    def drain(self, predicate=None):
+        """
+        Remove and return the pending writes whose key matches `predicate`,
+        or all of them. Draining everything restarts the flush interval.
+        """
+        with self._lock:
+            if predicate is None:
+                drained, self._pending = self._pending, {}
+                self._last_flush = time.monotonic()
+            else:
+                drained = {key: self._pending.pop(key) for key in [key for key in self._pending if predicate(key)]}
+        return drained
+
+    def clear(self):
+        self.drain()
+
+    def is_due(self, interval, max_pending):
+        """Whether the buffer holds writes and is old or big enough to flush."""
+        with self._lock:
+            if not self._pending:
+                return False
+            return time.monotonic() - self._last_flush >= interval or self._size(self._pending) >= max_pending
+
+
+def register(flush, flush_due):
+    _registered.append((flush, flush_due))
+
+
+def register_periodic(job):
+    _periodic.append(job)
+
+
+def flush_all():
+    for flush, _ in _registered:
+        flush()
+
+
+def flush_due_all():
+    for _, flush_due in _registered:
+        flush_due()
+
+
+def start_flush_thread(interval):
+    """
+    Run `flush_due_all()` and the periodic jobs every `interval` seconds in
+    a daemon thread.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush_due_all()
+                for job in _periodic:
+                    job()
+            except Exception:
+                logger.exception("Flushing the write buffers failed.")
+            finally:
+                connections.close_all()
+
+    thread = threading.Thread(target=run, name='write-buffer-flush', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,40 @@
+"""
+System checks for deployment settings.
+
+`sales.W001` warns when the user cache (`AUTH_USER_CACHE`) or the session
+cache of a cache-backed `SESSION_ENGINE` is Django's per-process
+`LocMemCache`. Each worker process then has its own copy: deactivating a
+user or logging out only clears the copy in the worker that handled it, and
+the other workers keep accepting the user or session until the entries time
+out. Multi-worker deployments need a cache shared between the workers.
+"""
+from django.conf import settings
+from django.core import checks
+
+CACHED_SESSION_ENGINES = {
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+}
+
+
+def _is_per_process(alias):
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    return backend == 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    aliases = {getattr(settings, 'AUTH_USER_CACHE', 'default')}
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        aliases.add(settings.SESSION_CACHE_ALIAS)
+    return [
+        checks.Warning(
+            f"The '{alias}' cache is a per-process LocMemCache, but it holds cached users or sessions.",
+            hint=(
+                "With more than one worker process, logouts and deactivated users are only cleared in one "
+                "worker. Point CACHES at a shared cache such as Redis or Memcached."
+            ),
+            id='sales.W001',
+        )
+        for alias in sorted(aliases) if _is_per_process(alias)
+    ]
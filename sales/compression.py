@@ -0,0 +1,139 @@
+"""
+Response compression and HTML whitespace collapsing.
+
+`CompressionMiddleware` compresses text responses (HTML, JSON, JavaScript,
+CSS, XML, SVG) with brotli when the `brotli` package is installed and the
+client accepts it, and with gzip otherwise. Responses smaller than
+`COMPRESSION_MIN_SIZE` bytes, partial responses and responses that are
+already encoded are left alone. Streaming responses are compressed chunk by
+chunk, so they are never buffered. Gzip output is padded with random bytes
+as Django's `GZipMiddleware` does, to hinder BREACH attacks.
+
+`HTMLMinifyMiddleware` collapses every whitespace run that spans a line
+break in rendered HTML into a single newline, leaving `<pre>`,
+`<textarea>`, `<script>` and `<style>` blocks untouched. It only runs when
+`HTML_MINIFY` is on.
+
+The `benchmark_compression` command reports bytes on the wire and CPU time
+per request for each encoding.
+"""
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+_ACCEPTS_BROTLI_RE = re.compile(r'\bbr\b')
+_ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+_MINIFY_RE = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>)|\s*\n\s*', re.IGNORECASE | re.DOTALL
+)
+
+
+def minify_html(content):
+    """Collapse whitespace spanning line breaks outside preformatted blocks."""
+    return _MINIFY_RE.sub(lambda match: match.group(1) or '\n', content)
+
+
+def brotli_compress(content):
+    return brotli.compress(content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+
+
+def gzip_compress(content):
+    return compress_string(content, max_random_bytes=GZipMiddleware.max_random_bytes)
+
+
+def _brotli_compress_sequence(sequence):
+    compressor = brotli.Compressor(quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+    for chunk in sequence:
+        # Without the flush brotli holds the output back until finish().
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def get_encoding(request):
+    """Return the best content encoding the client accepts, or None."""
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if brotli is not None and _ACCEPTS_BROTLI_RE.search(accept_encoding):
+        return 'br'
+    if _ACCEPTS_GZIP_RE.search(accept_encoding):
+        return 'gzip'
+    return None
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').lower()
+    return (
+        response.status_code == 200
+        and not response.has_header('Content-Encoding')
+        and content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress text responses with brotli or gzip."""
+
+    def process_response(self, request, response):
+        if not is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = get_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                return response
+            if encoding == 'br':
+                response.streaming_content = _brotli_compress_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=GZipMiddleware.max_random_bytes
+                )
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 512):
+                return response
+            compressed = brotli_compress(response.content) if encoding == 'br' else gzip_compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is no longer byte-for-byte the one the ETag was
+        # computed for.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+class HTMLMinifyMiddleware(MiddlewareMixin):
+    """Collapse template whitespace in HTML responses when HTML_MINIFY is on."""
+
+    def process_response(self, request, response):
+        if (
+            not getattr(settings, 'HTML_MINIFY', False)
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('text/html')
+        ):
+            return response
+        charset = response.charset
+        response.content = minify_html(response.content.decode(charset)).encode(charset)
+        response.headers['Content-Length'] = str(len(response.content))
+        return response
@@ -0,0 +1,200 @@
+"""
+Deferred bulk deletion of ads and users.
+
+Deleting an ad or user through Django's collector loads every dependent
+image, conversation and message into memory, and each `AdImage` delete
+triggers a reorder of its siblings. Instead, `schedule_ad_deletion()` and
+`schedule_user_deletion()` hide the object at once and queue a
+`DeletionRequest`. The `process_deletions` command then removes the large
+dependent tables in chunks of `BULK_DELETE_CHUNK_SIZE` rows before deleting
+the object itself. Media files of deleted rows are queued as
+`PendingFileDeletion` rows and removed from storage afterwards, so a failed
+transaction never leaves rows pointing at missing files.
+
+Image rows deleted any other way, through a model or queryset `delete()` or
+a cascade from their ad, category or user, queue their files the same way
+from a `post_delete` receiver, and so do archived ads for the images they
+hold. Removing a queued file drops its `MediaBlob` reference (see
+sales/storage.py), so no reference outlives the row that held it.
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import router, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .auth_cache import invalidate_users
+from .facets import invalidate_facets
+from .models import (
+    Ad, AdImage, ArchivedAd, Conversation, CustomUser, DeletionRequest, Message, PendingFileDeletion
+)
+
+
+def exclude_pending_deletion(queryset):
+    """
+    Leave out ads queued for deletion, on their own or with their owner, so
+    they cannot be edited, archived or restored before the job removes them.
+    """
+    return queryset.exclude(
+        pk__in=DeletionRequest.objects.filter(kind=DeletionRequest.AD).values('object_id')
+    ).exclude(
+        user_id__in=DeletionRequest.objects.filter(kind=DeletionRequest.USER).values('object_id')
+    )
+
+
+def is_pending_deletion(ad_id, user_id):
+    return DeletionRequest.objects.filter(
+        Q(kind=DeletionRequest.AD, object_id=ad_id) | Q(kind=DeletionRequest.USER, object_id=user_id)
+    ).exists()
+
+
+def schedule_ad_deletion(ad):
+    """Hide the ad and queue it for deletion by the background job."""
+    schedule_ads_deletion([ad.pk])
+    ad.is_active = False
+
+
+def schedule_ads_deletion(ad_ids):
+    """Hide the ads and queue them for deletion, in a fixed number of queries."""
+    ad_ids = list(ad_ids)
+    Ad.objects.filter(pk__in=ad_ids).update(is_active=False)
+    DeletionRequest.objects.bulk_create(
+        [DeletionRequest(kind=DeletionRequest.AD, object_id=ad_id) for ad_id in ad_ids],
+        ignore_conflicts=True,
+    )
+    invalidate_facets()
+
+
+def schedule_user_deletion(user):
+    """Deactivate the user, hide their ads and queue them for deletion."""
+    schedule_users_deletion([user.pk])
+    user.is_active = False
+
+
+def schedule_users_deletion(user_ids):
+    """Deactivate the users, hide their ads and queue them for deletion."""
+    user_ids = list(user_ids)
+    CustomUser.objects.filter(pk__in=user_ids).update(is_active=False)
+    invalidate_users(user_ids)
+    Ad.objects.filter(user_id__in=user_ids, is_active=True).update(is_active=False)
+    DeletionRequest.objects.bulk_create(
+        [DeletionRequest(kind=DeletionRequest.USER, object_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    invalidate_facets()
+
+
+def _raw_delete_in_chunks(queryset):
+    """
+    Delete the rows of the queryset a chunk of primary keys at a time, each
+    chunk with one DELETE that neither collects the rows nor sends signals.
+    Only use it for rows whose own dependents are already gone.
+    """
+    model = queryset.model
+    chunk_size = getattr(settings, 'BULK_DELETE_CHUNK_SIZE', 1000)
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += model._base_manager.filter(pk__in=ids)._raw_delete(using=router.db_for_write(model))
+
+
+def _delete_images(queryset):
+    """
+    Delete image rows in chunks, queueing their files for removal. The rows
+    are raw-deleted so OrderedModel does not renumber siblings that are being
+    deleted anyway.
+    """
+    chunk_size = getattr(settings, 'BULK_DELETE_CHUNK_SIZE', 1000)
+    while True:
+        images = list(queryset.order_by().values_list('pk', 'image')[:chunk_size])
+        if not images:
+            return
+        with transaction.atomic():
+            PendingFileDeletion.objects.bulk_create(
+                [PendingFileDeletion(name=name) for _, name in images if name]
+            )
+            AdImage.objects.filter(pk__in=[pk for pk, _ in images])._raw_delete(
+                using=router.db_for_write(AdImage)
+            )
+
+
+def delete_ad(ad_id):
+    """Delete the ad and everything that depends on it in bounded chunks."""
+    _raw_delete_in_chunks(Message.objects.filter(conversation__ad_id=ad_id))
+    _raw_delete_in_chunks(Conversation.objects.filter(ad_id=ad_id))
+    _delete_images(AdImage.objects.filter(ad_id=ad_id))
+    # The remaining dependents hold a handful of rows per ad; the collector
+    # handles them and sends the Ad post_delete signals.
+    Ad.objects.filter(pk=ad_id).delete()
+
+
+def delete_archived_ads(ad_ids):
+    """
+    Delete archived ads with their images, conversations and messages in
+    chunks, like `delete_ad()`, but leave the image files in place: the
+    archive still refers to them.
+    """
+    _raw_delete_in_chunks(Message.objects.filter(conversation__ad_id__in=ad_ids))
+    _raw_delete_in_chunks(Conversation.objects.filter(ad_id__in=ad_ids))
+    _raw_delete_in_chunks(AdImage.objects.filter(ad_id__in=ad_ids))
+    Ad.objects.filter(pk__in=ad_ids).delete()
+
+
+def delete_user(user_id):
+    """Delete the user, their ads and their conversations in bounded chunks."""
+    for ad_id in list(Ad.objects.filter(user_id=user_id).values_list('pk', flat=True)):
+        delete_ad(ad_id)
+    _raw_delete_in_chunks(Message.objects.filter(conversation__buyer_id=user_id))
+    _raw_delete_in_chunks(Conversation.objects.filter(buyer_id=user_id))
+    profile_picture = CustomUser.objects.filter(pk=user_id).values_list('profile_picture', flat=True).first()
+    with transaction.atomic():
+        if profile_picture:
+            PendingFileDeletion.objects.create(name=profile_picture)
+        CustomUser.objects.filter(pk=user_id).delete()
+
+
+def delete_pending_files():
+    """Remove queued media files from storage. Returns the number removed."""
+    chunk_size = getattr(settings, 'BULK_DELETE_CHUNK_SIZE', 1000)
+    removed = 0
+    while True:
+        pending = list(PendingFileDeletion.objects.order_by('pk')[:chunk_size])
+        if not pending:
+            return removed
+        for pending_file in pending:
+            default_storage.delete(pending_file.name)
+        PendingFileDeletion.objects.filter(pk__in=[pending_file.pk for pending_file in pending]).delete()
+        removed += len(pending)
+
+
+def process_deletions():
+    """
+    Carry out every queued deletion and remove the files left behind.
+    Returns the numbers of ads, users and files deleted.
+    """
+    deleted = {DeletionRequest.AD: 0, DeletionRequest.USER: 0}
+    for deletion_request in DeletionRequest.objects.order_by('requested_at', 'pk'):
+        if deletion_request.kind == DeletionRequest.USER:
+            delete_user(deletion_request.object_id)
+        else:
+            delete_ad(deletion_request.object_id)
+        deletion_request.delete()
+        deleted[deletion_request.kind] += 1
+    return deleted[DeletionRequest.AD], deleted[DeletionRequest.USER], delete_pending_files()
+
+
+@receiver(post_delete, sender=AdImage, dispatch_uid='sales.deletion.queue_image_file')
+def queue_image_file(sender, instance, **kwargs):
+    if instance.image:
+        PendingFileDeletion.objects.create(name=instance.image.name)
+
+
+@receiver(post_delete, sender=ArchivedAd, dispatch_uid='sales.deletion.queue_archived_image_files')
+def queue_archived_image_files(sender, instance, **kwargs):
+    PendingFileDeletion.objects.bulk_create([
+        PendingFileDeletion(name=row['fields']['image'])
+        for row in instance.data if row['model'] == 'sales.adimage' and row['fields'].get('image')
+    ])
@@ -0,0 +1,189 @@
+"""
+Near-duplicate ad detection with MinHash and locality-sensitive hashing.
+
+An ad's title and description are split into overlapping word shingles and
+summarised by a MinHash signature of `NUM_PERMUTATIONS` values; the share of
+equal values between two signatures estimates the Jaccard similarity of their
+shingle sets. The signature is cut into `BANDS` bands whose hashes are stored
+as indexed `AdFingerprintBand` rows, so ads that share any band are found
+with one indexed lookup instead of comparing every pair. Candidates whose
+estimated similarity reaches `DUPLICATE_SIMILARITY_THRESHOLD` are duplicates.
+
+New ads are checked as they are saved; `scan_duplicates()` (the
+`find_duplicate_ads` command) fingerprints the whole table and rebuilds
+every cluster. Within a cluster, `Ad.duplicate_of` points at the oldest ad.
+"""
+import hashlib
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Ad, AdFingerprint, AdFingerprintBand
+from .text import tokenize
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must stay comparable across processes and runs.
+_random = random.Random(20261018)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+# Saving an ad with update_fields outside this set cannot change its fingerprint.
+FINGERPRINTED_FIELDS = {'title', 'description'}
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def get_shingles(title, description):
+    words = tokenize(f"{title} {description}")
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[index:index + SHINGLE_SIZE]) for index in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def get_signature(title, description):
+    """Return the MinHash signature of the text, or None when it has no words."""
+    hashes = [_hash64(shingle) for shingle in get_shingles(title, description)]
+    if not hashes:
+        return None
+    return [min((a * value + b) % MERSENNE_PRIME for value in hashes) for a, b in PERMUTATIONS]
+
+
+def get_band_buckets(signature):
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(','.join(map(str, rows)).encode(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, 'big', signed=True))
+    return buckets
+
+
+def estimate_similarity(signature, other_signature):
+    return sum(a == b for a, b in zip(signature, other_signature)) / NUM_PERMUTATIONS
+
+
+def _is_duplicate(signature, other_signature):
+    threshold = getattr(settings, 'DUPLICATE_SIMILARITY_THRESHOLD', 0.8)
+    return estimate_similarity(signature, other_signature) >= threshold
+
+
+def _store_fingerprints(signatures):
+    """Replace the fingerprints of the given {ad id: signature} mapping."""
+    with transaction.atomic():
+        AdFingerprint.objects.filter(ad_id__in=signatures).delete()
+        AdFingerprintBand.objects.filter(ad_id__in=signatures).delete()
+        AdFingerprint.objects.bulk_create(
+            [AdFingerprint(ad_id=ad_id, signature=signature) for ad_id, signature in signatures.items() if signature]
+        )
+        AdFingerprintBand.objects.bulk_create([
+            AdFingerprintBand(ad_id=ad_id, band=band, bucket=bucket)
+            for ad_id, signature in signatures.items() if signature
+            for band, bucket in enumerate(get_band_buckets(signature))
+        ])
+
+
+def find_duplicates(ad_id, signature):
+    """
+    Return the (ad id, duplicate_of id) pairs of the fingerprinted ads that
+    are near-duplicates of the signature, excluding the ad itself.
+    """
+    band_condition = Q()
+    for band, bucket in enumerate(get_band_buckets(signature)):
+        band_condition |= Q(band=band, bucket=bucket)
+    candidate_ids = AdFingerprintBand.objects.filter(band_condition).exclude(ad_id=ad_id).values('ad_id')
+    candidates = AdFingerprint.objects.filter(ad_id__in=candidate_ids).values_list(
+        'ad_id', 'signature', 'ad__duplicate_of_id'
+    )
+    return [
+        (candidate_id, duplicate_of_id)
+        for candidate_id, candidate_signature, duplicate_of_id in candidates
+        if _is_duplicate(signature, candidate_signature)
+    ]
+
+
+def check_ad(ad):
+    """
+    Fingerprint the ad and point `duplicate_of` at the oldest ad of the
+    cluster it belongs to. Returns that ad id, or None.
+    """
+    signature = get_signature(ad.title, ad.description)
+    _store_fingerprints({ad.pk: signature})
+    original_id = None
+    if signature:
+        roots = [duplicate_of_id or candidate_id for candidate_id, duplicate_of_id in find_duplicates(ad.pk, signature)]
+        roots = [root for root in roots if root < ad.pk]
+        original_id = min(roots, default=None)
+    if original_id != ad.duplicate_of_id:
+        Ad.objects.filter(pk=ad.pk).update(duplicate_of=original_id)
+        ad.duplicate_of_id = original_id
+    return original_id
+
+
+def scan_duplicates(batch_size=1000):
+    """
+    Fingerprint every ad and rebuild all duplicate clusters. Returns the
+    number of ads marked as duplicates and the number of clusters.
+    """
+    signatures = {}
+    buckets = defaultdict(list)
+    last_pk = 0
+    while True:
+        batch = list(
+            Ad.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'title', 'description')[:batch_size]
+        )
+        if not batch:
+            break
+        batch_signatures = {pk: get_signature(title, description) for pk, title, description in batch}
+        _store_fingerprints(batch_signatures)
+        for pk, signature in batch_signatures.items():
+            if signature:
+                signatures[pk] = signature
+                for band, bucket in enumerate(get_band_buckets(signature)):
+                    buckets[band, bucket].append(pk)
+        last_pk = batch[-1][0]
+
+    parents = {}
+
+    def find_root(pk):
+        while parents.get(pk, pk) != pk:
+            pk = parents[pk]
+        return pk
+
+    compared = set()
+    for members in buckets.values():
+        for index, pk in enumerate(members):
+            for other in members[index + 1:]:
+                if (pk, other) in compared:
+                    continue
+                compared.add((pk, other))
+                if _is_duplicate(signatures[pk], signatures[other]):
+                    root, other_root = find_root(pk), find_root(other)
+                    if root != other_root:
+                        parents[max(root, other_root)] = min(root, other_root)
+
+    duplicate_of = {pk: find_root(pk) for pk in parents}
+    with transaction.atomic():
+        Ad.objects.filter(duplicate_of__isnull=False).exclude(pk__in=duplicate_of).update(duplicate_of=None)
+        Ad.objects.bulk_update(
+            [Ad(pk=pk, duplicate_of_id=root) for pk, root in duplicate_of.items()],
+            ['duplicate_of'], batch_size=batch_size,
+        )
+    return len(duplicate_of), len(set(duplicate_of.values()))
+
+
+@receiver(post_save, sender=Ad, dispatch_uid='sales.duplicates.check_on_save')
+def check_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not FINGERPRINTED_FIELDS & set(update_fields)):
+        return
+    check_ad(instance)
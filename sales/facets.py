@@ -0,0 +1,117 @@
+"""
+Facet counts for the ad search sidebar.
+
+Each facet is computed against the current `AdFilter` parameters minus the
+facet's own parameters, so e.g. the category counts show how many ads every
+category would have if the user picked it. Every facet is a single grouped
+or conditionally aggregated query, and the combined result is cached under a
+signature of the filter parameters. Saving or deleting an ad bumps a
+generation number that is part of the cache key, so stale facets are never
+served after a change made in this process; `FACET_CACHE_TIMEOUT` bounds the
+staleness for changes made elsewhere.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .filters import AdFilter, get_filter_params
+from .metrics import record_cache_lookup
+from .models import Ad, Category
+
+GENERATION_CACHE_KEY = 'ad-facets:generation'
+
+# Which request parameters each facet ignores when it is computed.
+FACET_OWN_PARAMS = {
+    'categories': ('category',),
+    'price_ranges': ('minimum_price', 'maximum_price'),
+    'locations': ('location',),
+}
+
+
+def get_filter_signature(params):
+    raw = '&'.join(f"{name}={value}" for name, value in sorted(params.items()))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def get_facets(data):
+    """
+    Return category counts, price range buckets and top locations for the
+    ads matching the given filter parameters.
+    """
+    params = get_filter_params(data)
+    cache_key = f"ad-facets:{_get_generation()}:{get_filter_signature(params)}"
+    facets = cache.get(cache_key)
+    record_cache_lookup('facets', facets is not None)
+    if facets is None:
+        facets = {
+            'categories': _get_category_facet(_get_facet_queryset(params, 'categories')),
+            'price_ranges': _get_price_range_facet(_get_facet_queryset(params, 'price_ranges')),
+            'locations': _get_location_facet(_get_facet_queryset(params, 'locations')),
+        }
+        cache.set(cache_key, facets, getattr(settings, 'FACET_CACHE_TIMEOUT', 300))
+    return facets
+
+
+def _get_facet_queryset(params, facet):
+    facet_params = {
+        name: value for name, value in params.items()
+        if name not in FACET_OWN_PARAMS[facet]
+    }
+    return AdFilter(facet_params, queryset=Ad.objects.filter(is_active=True)).qs.order_by()
+
+
+def _get_category_facet(queryset):
+    counts = {
+        row['category_id']: row['count']
+        for row in queryset.values('category_id').annotate(count=Count('pk'))
+    }
+    return [
+        {'id': category_id, 'name': name, 'count': counts.get(category_id, 0)}
+        for category_id, name in Category.objects.order_by('name').values_list('pk', 'name')
+    ]
+
+
+def _get_price_range_facet(queryset):
+    bounds = getattr(settings, 'FACET_PRICE_BUCKETS', [0, 100, 500, 1000, 5000, 10000])
+    ranges = list(zip(bounds, bounds[1:] + [None]))
+    aggregates = {}
+    for index, (low, high) in enumerate(ranges):
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        aggregates[f'bucket_{index}'] = Count('pk', filter=condition)
+    counts = queryset.aggregate(**aggregates)
+    return [
+        {
+            'minimum': low,
+            'maximum': high,
+            # AdFilter's maximum_price is inclusive, buckets are not.
+            'maximum_price_param': f"{high - 0.01:.2f}" if high is not None else None,
+            'count': counts[f'bucket_{index}'],
+        }
+        for index, (low, high) in enumerate(ranges)
+    ]
+
+
+def _get_location_facet(queryset):
+    limit = getattr(settings, 'FACET_LOCATION_LIMIT', 10)
+    return list(
+        queryset.values('location')
+        .annotate(count=Count('pk'))
+        .order_by('-count', 'location')[:limit]
+    )
+
+
+def _get_generation():
+    return cache.get_or_set(GENERATION_CACHE_KEY, time.time_ns, None)
+
+
+@receiver(post_save, sender=Ad, dispatch_uid='sales.facets.invalidate_on_save')
+@receiver(post_delete, sender=Ad, dispatch_uid='sales.facets.invalidate_on_delete')
+def invalidate_facets(**kwargs):
+    cache.set(GENERATION_CACHE_KEY, time.time_ns(), None)
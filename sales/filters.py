@@ -2,6 +2,7 @@ import django_filters
 from .models import Ad
 from django.utils.dateparse import parse_date
 from django.db.models import Q
+from .geo import parse_point, filter_within_radius, DEFAULT_RADIUS_KM, MAX_RADIUS_KM
 
 class AdFilter(django_filters.FilterSet):
     keyword_to_search = django_filters.CharFilter(
@@ -14,12 +15,41 @@ class AdFilter(django_filters.FilterSet):
     category = django_filters.NumberFilter(field_name="category_id")
     location = django_filters.CharFilter(field_name="location", lookup_expr="icontains")
     event_date = django_filters.DateFilter(field_name="event_date")
+    near = django_filters.CharFilter(
+        method="filter_near",
+        label="Near",
+        help_text="Only show ads within `radius` km of a \"latitude,longitude\" point, nearest first."
+    )
+    radius = django_filters.NumberFilter(method="filter_radius", label="Radius (km)")
 
     class Meta:
         model = Ad
-        fields = ["keyword_to_search", "category", "location", "minimum_price", "maximum_price", "event_date"]
+        fields = ["keyword_to_search", "category", "location", "minimum_price", "maximum_price", "event_date", "near", "radius"]
 
     def filter_search(self, queryset, name, value):
         return queryset.filter(
             Q(title__icontains=value) | Q(description__icontains=value)
         )
+
+    def filter_near(self, queryset, name, value):
+        point = parse_point(value)
+        if point is None:
+            return queryset.none()
+        radius = self.form.cleaned_data.get("radius") or DEFAULT_RADIUS_KM
+        return filter_within_radius(queryset, *point, float(min(radius, MAX_RADIUS_KM)))
+
+    def filter_radius(self, queryset, name, value):
+        # Applied together with `near` in filter_near.
+        return queryset
+
+
+def get_filter_params(data):
+    """
+    Return the non-empty `AdFilter` parameters from a request QueryDict as a
+    plain dict, ignoring unrelated parameters such as `page`.
+    """
+    return {
+        name: data.get(name).strip()
+        for name in AdFilter.base_filters
+        if data.get(name, '').strip()
+    }
@@ -0,0 +1,178 @@
+"""
+Offline geocoding and radius search for ads.
+
+Ad locations are resolved against the gazetteer shipped in
+`sales/data/gazetteer.csv` and stored as latitude/longitude plus a geohash.
+A radius query first narrows candidates with index-friendly geohash range
+lookups and a bounding box in SQL, then computes exact haversine distances
+for the candidates only.
+"""
+import csv
+import math
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Case, When, Value, FloatField, Q
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / 'data' / 'gazetteer.csv'
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+# Geohash cells that cover a search box; more cells means tighter ranges but
+# more OR'ed conditions.
+MAX_COVER_CELLS = 16
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer():
+    gazetteer_path = getattr(settings, 'GAZETTEER_PATH', GAZETTEER_PATH)
+    with open(gazetteer_path, newline='', encoding='utf-8') as gazetteer_file:
+        return {
+            _normalize(row['name']): (float(row['latitude']), float(row['longitude']))
+            for row in csv.DictReader(gazetteer_file)
+        }
+
+
+def _normalize(name):
+    return ' '.join(name.lower().split())
+
+
+def geocode(location):
+    """
+    Resolve a free-text location such as "Chennai, Tamil Nadu" to a
+    (latitude, longitude) tuple, or None when no gazetteer entry matches.
+    """
+    if not location:
+        return None
+    gazetteer = load_gazetteer()
+    normalized = _normalize(location)
+    if normalized in gazetteer:
+        return gazetteer[normalized]
+    for part in normalized.split(','):
+        part = part.strip()
+        if part in gazetteer:
+            return gazetteer[part]
+    return None
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, bit_count, even = [], 0, 0, True
+    while len(geohash) < precision:
+        value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def _cell_size(precision):
+    """Return the (height, width) in degrees of a geohash cell."""
+    total_bits = 5 * precision
+    lat_bits, lon_bits = total_bits // 2, total_bits - total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing the circle."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0), min(latitude + lat_delta, 90.0),
+        max(longitude - lon_delta, -180.0), min(longitude + lon_delta, 180.0),
+    )
+
+
+def covering_geohashes(min_lat, max_lat, min_lon, max_lon):
+    """
+    Return the set of geohash prefixes that together cover the box, using the
+    finest precision that needs no more than MAX_COVER_CELLS cells.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_height, cell_width = _cell_size(precision)
+        rows = math.floor(max_lat / cell_height) - math.floor(min_lat / cell_height) + 1
+        columns = math.floor(max_lon / cell_width) - math.floor(min_lon / cell_width) + 1
+        if rows * columns <= MAX_COVER_CELLS:
+            break
+    prefixes = set()
+    for row in range(rows):
+        latitude = min(min_lat + row * cell_height, max_lat)
+        for column in range(columns):
+            longitude = min(min_lon + column * cell_width, max_lon)
+            prefixes.add(encode_geohash(latitude, longitude, precision))
+        prefixes.add(encode_geohash(latitude, max_lon, precision))
+    for column in range(columns):
+        prefixes.add(encode_geohash(max_lat, min(min_lon + column * cell_width, max_lon), precision))
+    prefixes.add(encode_geohash(max_lat, max_lon, precision))
+    return prefixes
+
+
+def haversine_km(latitude, longitude, points):
+    """
+    Return the great-circle distance in km from (latitude, longitude) to each
+    (latitude, longitude) in `points`.
+    """
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    cos_lat1 = math.cos(lat1)
+    distances = []
+    for point_latitude, point_longitude in points:
+        lat2, lon2 = math.radians(point_latitude), math.radians(point_longitude)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))))
+    return distances
+
+
+def parse_point(value):
+    """Parse a "lat,lon" string into a tuple of floats, or return None."""
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def filter_within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Restrict an Ad queryset to ads within `radius_km` of the point, annotated
+    with `distance_km` and ordered nearest first. At most
+    `GEO_MAX_RESULTS` of the closest ads are returned.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    cell_condition = Q()
+    for prefix in covering_geohashes(min_lat, max_lat, min_lon, max_lon):
+        cell_condition |= Q(geohash__gte=prefix, geohash__lt=prefix + '{')
+    candidates = list(
+        queryset.filter(
+            cell_condition,
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lon, max_lon),
+        ).order_by().values_list('pk', 'latitude', 'longitude')
+    )
+    distances = haversine_km(latitude, longitude, [(lat, lon) for _, lat, lon in candidates])
+    nearby = sorted(
+        (distance, pk) for (pk, _, _), distance in zip(candidates, distances)
+        if distance <= radius_km
+    )[:getattr(settings, 'GEO_MAX_RESULTS', 500)]
+    if not nearby:
+        return queryset.none()
+    return queryset.filter(pk__in=[pk for _, pk in nearby]).annotate(
+        distance_km=Case(
+            *[When(pk=pk, then=Value(round(distance, 1))) for distance, pk in nearby],
+            output_field=FloatField(),
+        )
+    ).order_by('distance_km', 'pk')
@@ -0,0 +1,109 @@
+import base64
+from collections import namedtuple
+
+from django.db.models import Q, Case, When, F, Exists, OuterRef, Subquery
+from django.utils.dateparse import parse_datetime
+
+from .models import Conversation, Message
+
+INBOX_PAGE_SIZE = 20
+
+InboxPage = namedtuple('InboxPage', ['conversations', 'next_cursor'])
+
+
+def encode_cursor(conversation):
+    """
+    Encode the (created_at, pk) position of a conversation as an opaque,
+    URL-safe cursor string.
+    """
+    raw = f"{conversation.created_at.isoformat()}|{conversation.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`. Returns a (created_at, pk)
+    tuple, or None when the cursor is missing or malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at_raw, pk_raw = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+        created_at = parse_datetime(created_at_raw)
+        pk = int(pk_raw)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+def get_inbox_page(user, cursor=None, ad_id=None, unread_only=False,
+                   sides=('owner', 'buyer'), page_size=INBOX_PAGE_SIZE):
+    """
+    Return one page of the user's conversations, newest first.
+
+    Instead of a single `owner=user OR buyer=user` scan, every side the user
+    can participate on is queried as its own branch (each served by the
+    matching `(owner|buyer, created_at, id)` index) and the branches are
+    combined with UNION ALL. A conversation can never list the same user as
+    both owner and buyer, so the branches are disjoint.
+    """
+    position = decode_cursor(cursor)
+    branches = [
+        _get_branch(user, side, position, ad_id, unread_only)
+        for side in sides
+    ]
+    combined = branches[0].union(*branches[1:], all=True) if len(branches) > 1 else branches[0]
+    rows = list(combined.order_by('-created_at', '-pk')[:page_size + 1])
+
+    page_ids = [row['pk'] for row in rows[:page_size]]
+    conversations = _get_page_conversations(user, page_ids)
+
+    next_cursor = None
+    if len(rows) > page_size:
+        next_cursor = encode_cursor(conversations[-1])
+    return InboxPage(conversations, next_cursor)
+
+
+def _get_branch(user, side, position, ad_id, unread_only):
+    qs = Conversation.objects.filter(**{side: user})
+    if ad_id is not None:
+        qs = qs.filter(ad_id=ad_id)
+    if position is not None:
+        created_at, pk = position
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    if unread_only:
+        qs = qs.filter(_get_unread_exists(user))
+    return qs.order_by().values('pk', 'created_at')
+
+
+def _get_unread_exists(user):
+    return Exists(
+        Message.objects.filter(
+            conversation=OuterRef('pk'),
+            read=False
+        ).exclude(sender=user)
+    )
+
+
+def _get_page_conversations(user, page_ids):
+    if not page_ids:
+        return []
+    last_message = Message.objects.filter(conversation=OuterRef('pk')).order_by('-sent_at', '-pk')
+    conversations = (
+        Conversation.objects
+        .filter(pk__in=page_ids)
+        .select_related('ad', 'owner', 'buyer')
+        .annotate(
+            other_username=Case(
+                When(owner=user, then=F('buyer__username')),
+                default=F('owner__username'),
+            ),
+            last_message_at=Subquery(last_message.values('sent_at')[:1]),
+            last_message_content=Subquery(last_message.values('content')[:1]),
+        )
+    )
+    conversations_by_id = {conversation.pk: conversation for conversation in conversations}
+    return [conversations_by_id[pk] for pk in page_ids if pk in conversations_by_id]
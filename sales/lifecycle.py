@@ -0,0 +1,126 @@
+"""
+Ad expiry and archival.
+
+`expire_ads()` deactivates ads whose `expires_at` has passed (set
+`AD_EXPIRY_DAYS` after creation) and event ads whose `event_date` is over,
+in chunked `UPDATE`s. `archive_ads()` moves ads that have been inactive for
+`AD_ARCHIVE_AFTER_DAYS` out of the hot tables: the ad, its images,
+conversations and messages are serialized into one `ArchivedAd` row and
+deleted in chunks (see `deletion.delete_archived_ads()`). `restore_ad()` puts them back with their original primary keys.
+
+Both jobs are run by the `expire_ads` management command.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import serializers
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .deletion import delete_archived_ads, exclude_pending_deletion, is_pending_deletion
+from .facets import invalidate_facets
+from .models import Ad, ArchivedAd, Conversation, CustomUser, Message
+
+
+def get_expired_ads(now=None):
+    now = now or timezone.now()
+    return Ad.objects.filter(is_active=True).filter(
+        Q(expires_at__lt=now) | Q(event_date__lt=timezone.localdate(now))
+    )
+
+
+def expire_ads(batch_size=1000, now=None):
+    """Deactivate every expired ad. Returns the number of ads expired."""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        batch = list(get_expired_ads(now).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+        # updated_at is bumped so archival counts from the expiry.
+        expired += Ad.objects.filter(pk__in=batch).update(is_active=False, updated_at=now)
+    if expired:
+        invalidate_facets()
+    return expired
+
+
+def get_archivable_ads(now=None):
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=getattr(settings, 'AD_ARCHIVE_AFTER_DAYS', 180))
+    return exclude_pending_deletion(Ad.objects.filter(is_active=False, updated_at__lt=cutoff))
+
+
+def serialize_ad(ad):
+    """
+    Return the ad and its dependent rows as a JSON-compatible list. Prefetch
+    `images` and `conversations__messages` when serializing many ads.
+    """
+    conversations = list(ad.conversations.all())
+    messages = [message for conversation in conversations for message in conversation.messages.all()]
+    return serializers.serialize('python', [ad, *ad.images.all(), *conversations, *messages])
+
+
+def archive_ads(batch_size=200, now=None):
+    """Move long-inactive ads to the archive. Returns the number of ads archived."""
+    now = now or timezone.now()
+    archived = 0
+    while True:
+        batch = list(
+            get_archivable_ads(now).order_by('pk')
+            .prefetch_related('images', 'conversations__messages')[:batch_size]
+        )
+        if not batch:
+            break
+        with transaction.atomic():
+            ArchivedAd.objects.bulk_create([
+                ArchivedAd(original_id=ad.pk, user_id=ad.user_id, title=ad.title, data=serialize_ad(ad))
+                for ad in batch
+            ])
+            delete_archived_ads([ad.pk for ad in batch])
+        archived += len(batch)
+    return archived
+
+
+def restore_ad(archived_ad):
+    """
+    Recreate an archived ad with its images, conversations and messages, and
+    reactivate it for another expiry period. Conversations with users that
+    have since been deleted are dropped. Returns the restored ad.
+
+    Raises ValidationError for an ad queued for deletion, and for an event ad
+    whose event is over, which the next expiry run would only deactivate
+    again.
+    """
+    if is_pending_deletion(archived_ad.original_id, archived_ad.user_id):
+        raise ValidationError("This ad has been deleted and cannot be restored.")
+    objects = list(serializers.deserialize('python', archived_ad.data))
+    ad_instance = next(obj.object for obj in objects if isinstance(obj.object, Ad))
+    if ad_instance.event_date and ad_instance.event_date < timezone.localdate():
+        raise ValidationError("The event of this ad is over, so it cannot be restored.")
+    user_ids = set(CustomUser.objects.filter(
+        pk__in={obj.object.buyer_id for obj in objects if isinstance(obj.object, Conversation)}
+    ).values_list('pk', flat=True)) | {archived_ad.user_id}
+    conversation_ids = {
+        obj.object.pk for obj in objects
+        if isinstance(obj.object, Conversation) and obj.object.buyer_id in user_ids
+    }
+    with transaction.atomic():
+        for obj in objects:
+            instance = obj.object
+            if isinstance(instance, Ad):
+                instance.duplicate_of_id = None
+            elif isinstance(instance, Conversation) and instance.pk not in conversation_ids:
+                continue
+            elif isinstance(instance, Message) and instance.conversation_id not in conversation_ids:
+                continue
+            obj.save()
+        ad = Ad.objects.get(pk=archived_ad.original_id)
+        ad.is_active = True
+        ad.expires_at = None
+        ad.save()
+        # The restored images took over the archive's file references, so the
+        # row goes without the post_delete receiver that would release them.
+        ArchivedAd.objects.filter(pk=archived_ad.pk)._raw_delete(using=router.db_for_write(ArchivedAd))
+    return ad
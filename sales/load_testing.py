@@ -0,0 +1,227 @@
+"""
+Simulated marketplace traffic for load testing.
+
+`run_load_test()` spreads simulated users over a pool of processes, each
+user running in its own thread against a server over plain HTTP. A user
+repeatedly picks one of three actions:
+
+* browsing the ad list with a random mix of keyword, category, location and
+  price filters,
+* opening an ad's detail page,
+* starting a conversation about an ad and chatting in it: polling
+  `ConversationMessagesJSONView` every `poll_interval` seconds, as the chat
+  page does, and sometimes sending a message.
+
+Users are ordinary accounts named `loadtest-<n>`, logged in by creating their
+sessions directly, so no external service is needed. Every request is
+recorded as a `Sample`, and `summarize()` turns them into throughput,
+latency percentiles and error rates per endpoint. The `load_test` command
+starts a local server and prints the report.
+"""
+import http.client
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.utils.crypto import get_random_string
+from django.utils.module_loading import import_string
+
+from .models import Ad, Category
+
+USERNAME_PREFIX = 'loadtest-'
+ACTION_WEIGHTS = {'browse': 4, 'detail': 3, 'chat': 3}
+
+Sample = namedtuple('Sample', 'name status latency')
+ScenarioData = namedtuple('ScenarioData', 'ad_ids category_ids locations keywords max_price')
+
+
+def prepare_users(count):
+    """
+    Make sure `count` load test users exist and log each of them in. Returns
+    their session keys.
+    """
+    User = get_user_model()
+    usernames = [f'{USERNAME_PREFIX}{number}' for number in range(count)]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    for username in usernames:
+        if username not in existing:
+            User.objects.create_user(username=username, email=f'{username}@example.com')
+
+    session_store = import_string(settings.SESSION_ENGINE + '.SessionStore')
+    session_keys = []
+    for user in User.objects.filter(username__in=usernames).order_by('pk'):
+        session = session_store()
+        session[auth.SESSION_KEY] = str(user.pk)
+        session[auth.BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[auth.HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        session_keys.append(session.session_key)
+    return session_keys
+
+
+def get_scenario_data():
+    """Collect the ids and values the simulated users pick from."""
+    ads = list(Ad.objects.filter(is_active=True).values_list('pk', 'title', 'location', 'price')[:1000])
+    return ScenarioData(
+        ad_ids=[pk for pk, _, _, _ in ads],
+        category_ids=list(Category.objects.values_list('pk', flat=True)),
+        locations=sorted({location for _, _, location, _ in ads if location}),
+        keywords=sorted({word for _, title, _, _ in ads for word in title.split() if len(word) > 3}),
+        max_price=int(max((price or 0 for _, _, _, price in ads), default=0)),
+    )
+
+
+class SimulatedUser:
+    def __init__(self, base_url, session_key, data, deadline, seed, think_time=1.0, poll_interval=3.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.data = data
+        self.deadline = deadline
+        self.random = random.Random(seed)
+        self.think_time = think_time
+        self.poll_interval = poll_interval
+        self.csrf_token = get_random_string(32)
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+        self.samples = []
+
+    def run(self):
+        actions = list(ACTION_WEIGHTS)
+        weights = list(ACTION_WEIGHTS.values())
+        while time.monotonic() < self.deadline:
+            action = self.random.choices(actions, weights)[0]
+            getattr(self, action)()
+            self._sleep(self.random.uniform(0.5, 1.5) * self.think_time)
+        return self.samples
+
+    def browse(self):
+        params = {}
+        if self.data.keywords and self.random.random() < 0.4:
+            params['keyword_to_search'] = self.random.choice(self.data.keywords)
+        if self.data.category_ids and self.random.random() < 0.4:
+            params['category'] = self.random.choice(self.data.category_ids)
+        if self.data.locations and self.random.random() < 0.2:
+            params['location'] = self.random.choice(self.data.locations)
+        if self.data.max_price and self.random.random() < 0.3:
+            params['maximum_price'] = self.random.randint(1, self.data.max_price)
+        path = '/' + (f'?{urlencode(params)}' if params else '')
+        self._request('ad_list', 'GET', path)
+
+    def detail(self):
+        if self.data.ad_ids:
+            self._request('ad_detail', 'GET', f'/ads/{self.random.choice(self.data.ad_ids)}/')
+
+    def chat(self):
+        if not self.data.ad_ids:
+            return
+        status, headers = self._request(
+            'start_conversation', 'GET', f'/ads/{self.random.choice(self.data.ad_ids)}/message/'
+        )
+        location = headers.get('Location', '')
+        if status != 302 or not location.startswith('/conversations/'):
+            # The user owns the ad, or the request failed.
+            return
+        conversation_path = location.rstrip('/')
+        for _ in range(self.random.randint(2, 5)):
+            if time.monotonic() >= self.deadline:
+                return
+            self._request('poll_messages', 'GET', f'{conversation_path}/messages_json/')
+            if self.random.random() < 0.3:
+                self._request(
+                    'send_message', 'POST', f'{conversation_path}/send/',
+                    {'content': f'Is this still available? ({get_random_string(6)})'},
+                )
+            self._sleep(self.poll_interval)
+
+    def _request(self, name, method, path, data=None):
+        headers = {'Cookie': self.cookie, 'Host': f'{self.host}:{self.port}'}
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = self.csrf_token
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status, response_headers = response.status, dict(response.getheaders())
+        except (OSError, http.client.HTTPException):
+            status, response_headers = 0, {}
+        finally:
+            connection.close()
+        self.samples.append(Sample(name, status, time.perf_counter() - started))
+        return status, response_headers
+
+    def _sleep(self, seconds):
+        time.sleep(max(0, min(seconds, self.deadline - time.monotonic())))
+
+
+def _run_users(base_url, session_keys, data, duration, seed, think_time, poll_interval):
+    deadline = time.monotonic() + duration
+    users = [
+        SimulatedUser(base_url, session_key, data, deadline, seed + index, think_time, poll_interval)
+        for index, session_key in enumerate(session_keys)
+    ]
+    threads = [threading.Thread(target=user.run) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [tuple(sample) for user in users for sample in user.samples]
+
+
+def run_load_test(base_url, session_keys, data, duration, processes=1, seed=0, think_time=1.0, poll_interval=3.0):
+    """Run the simulated users for `duration` seconds and return every sample."""
+    processes = max(1, min(processes, len(session_keys)))
+    # Workers only talk HTTP; they must not inherit open database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [
+            executor.submit(
+                _run_users, base_url, session_keys[index::processes], data, duration,
+                seed + index * len(session_keys), think_time, poll_interval,
+            )
+            for index in range(processes)
+        ]
+        return [Sample(*sample) for future in futures for sample in future.result()]
+
+
+def _percentile(sorted_values, percent):
+    index = max(0, int(round(percent / 100 * len(sorted_values))) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(samples, elapsed):
+    """
+    Return a report row per endpoint, and one for all of them, with request
+    count, throughput, error rate and latency percentiles in milliseconds.
+    """
+    by_name = defaultdict(list)
+    for sample in samples:
+        by_name[sample.name].append(sample)
+        by_name['total'].append(sample)
+
+    rows = []
+    for name, group in sorted(by_name.items(), key=lambda item: (item[0] == 'total', item[0])):
+        latencies = sorted(sample.latency * 1000 for sample in group)
+        errors = sum(1 for sample in group if sample.status == 0 or sample.status >= 400)
+        rows.append({
+            'name': name,
+            'requests': len(group),
+            'throughput': len(group) / elapsed if elapsed else 0,
+            'error_rate': errors / len(group),
+            'p50': _percentile(latencies, 50),
+            'p90': _percentile(latencies, 90),
+            'p99': _percentile(latencies, 99),
+            'max': latencies[-1],
+        })
+    return rows
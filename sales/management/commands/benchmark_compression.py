@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from sales.compression import brotli, brotli_compress, gzip_compress, minify_html
+from sales.models import Ad, Conversation
+
+
+class Command(BaseCommand):
+    help = "Report bytes on the wire and CPU time per request for each response encoding."
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help="Paths to fetch. Defaults to the ad list, an ad page and a chat poll.")
+        parser.add_argument('--iterations', type=int, default=100, help="Times each encoding is repeated.")
+        parser.add_argument('--username', help="Fetch the pages as this user.")
+        parser.add_argument('--host', default='localhost', help="Host header sent with the requests.")
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=options['host'], HTTP_ACCEPT_ENCODING='identity')
+        if options['username']:
+            try:
+                client.force_login(get_user_model().objects.get(username=options['username']))
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named {options['username']!r}.")
+
+        for url in options['urls'] or self._get_default_urls(options['username']):
+            response = client.get(url)
+            if response.status_code != 200:
+                self.stderr.write(f"{url}: status {response.status_code}, skipped.")
+                continue
+            self.stdout.write(url)
+            for label, size, seconds in self._measure(response, options['iterations']):
+                self.stdout.write(f"  {label:<14} {size:>9} bytes {seconds * 1e6:>10.1f} us CPU/request")
+
+    def _get_default_urls(self, username):
+        urls = [reverse('ad_list')]
+        ad = Ad.objects.filter(is_active=True).order_by('pk').first()
+        if ad:
+            urls.append(reverse('ad_detail', args=[ad.pk]))
+        conversation = Conversation.objects.filter(buyer__username=username).order_by('pk').first() if username else None
+        if conversation:
+            urls.append(reverse('conversation_messages_json', args=[conversation.pk]))
+        return urls
+
+    def _measure(self, response, iterations):
+        content = response.content
+        charset = response.charset
+        is_html = response['Content-Type'].startswith('text/html')
+        minify = lambda: minify_html(content.decode(charset)).encode(charset)
+
+        variants = [('identity', lambda: content)]
+        if is_html:
+            variants.append(('minified', minify))
+        variants.append(('gzip', lambda: gzip_compress(content)))
+        if is_html:
+            variants.append(('minified+gzip', lambda: gzip_compress(minify())))
+        if brotli is not None:
+            variants.append(('br', lambda: brotli_compress(content)))
+            if is_html:
+                variants.append(('minified+br', lambda: brotli_compress(minify())))
+
+        for label, encode in variants:
+            started = time.process_time()
+            for _ in range(iterations):
+                body = encode()
+            yield label, len(body), (time.process_time() - started) / iterations
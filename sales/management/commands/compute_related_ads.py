@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from sales.related_ads import compute_related_ads, refresh_related_ads
+
+
+class Command(BaseCommand):
+    help = "Precompute the similar listings shown on ad detail pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Number of ads whose recommendations are written per transaction.")
+        parser.add_argument('--full', action='store_true', help="Recompute every ad instead of only those affected by changes since the last run.")
+
+    def handle(self, *args, **options):
+        if options['full']:
+            processed = compute_related_ads(batch_size=options['batch_size'])
+        else:
+            processed = refresh_related_ads(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Computed related ads for {processed} ads."))
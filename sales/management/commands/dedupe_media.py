@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from sales.storage import dedupe_media
+
+
+class Command(BaseCommand):
+    help = "Move media files uploaded before content-addressed storage into it, storing each content once."
+
+    def handle(self, *args, **options):
+        moved, freed = dedupe_media()
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} files into the blob store, freed {freed} bytes."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from sales.lifecycle import archive_ads, expire_ads
+
+
+class Command(BaseCommand):
+    help = "Deactivate expired ads and move long-inactive ads to the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of ads expired per UPDATE.")
+        parser.add_argument('--archive-batch-size', type=int, default=200, help="Number of ads archived per transaction.")
+        parser.add_argument('--skip-archive', action='store_true', help="Only expire ads, do not archive any.")
+
+    def handle(self, *args, **options):
+        expired = expire_ads(batch_size=options['batch_size'])
+        archived = 0 if options['skip_archive'] else archive_ads(batch_size=options['archive_batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} ads, archived {archived} ads."))
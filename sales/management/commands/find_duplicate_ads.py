@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sales.duplicates import scan_duplicates
+
+
+class Command(BaseCommand):
+    help = "Fingerprint every ad and rebuild the near-duplicate clusters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of ads fingerprinted per transaction.")
+
+    def handle(self, *args, **options):
+        duplicates, clusters = scan_duplicates(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Found {duplicates} duplicate ads in {clusters} clusters."))
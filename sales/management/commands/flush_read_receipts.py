@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sales import read_receipts
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the read receipts buffered in this process. Server workers flush their own buffers "
+        "when idle and on exit; use this at the end of scripts that mark messages read."
+    )
+
+    def handle(self, *args, **options):
+        updated = read_receipts.flush()
+        self.stdout.write(self.style.SUCCESS(f"Marked {updated} messages read."))
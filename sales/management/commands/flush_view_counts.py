@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from sales import view_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the ad views buffered in this process. Server workers flush their own buffers "
+        "when idle and on exit; use this at the end of scripts that record views."
+    )
+
+    def handle(self, *args, **options):
+        written = view_counts.flush()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} ad views."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from sales.models import Ad
+
+
+class Command(BaseCommand):
+    help = "Resolve ad locations to coordinates and geohashes using the offline gazetteer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of ads updated per query.")
+        parser.add_argument('--missing-only', action='store_true', help="Only geocode ads without a geohash.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Ad.objects.order_by('pk').only('pk', 'location', 'latitude', 'longitude', 'geohash')
+        if options['missing_only']:
+            queryset = queryset.filter(geohash='')
+
+        last_pk, updated, resolved = 0, 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for ad in batch:
+                ad.update_coordinates()
+                resolved += bool(ad.geohash)
+            Ad.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Geocoded {resolved} of {updated} ads."))
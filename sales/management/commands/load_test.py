@@ -0,0 +1,77 @@
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.load_testing import get_scenario_data, prepare_users, run_load_test, summarize
+
+
+class Command(BaseCommand):
+    help = "Simulate marketplace users against a local server and report throughput, latency and errors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help="Number of simulated users.")
+        parser.add_argument('--processes', type=int, default=4, help="Number of worker processes the users are spread over.")
+        parser.add_argument('--duration', type=float, default=60, help="Length of the run in seconds.")
+        parser.add_argument('--think-time', type=float, default=1.0, help="Average pause between a user's actions, in seconds.")
+        parser.add_argument('--poll-interval', type=float, default=3.0, help="Seconds between chat polls.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for repeatable runs.")
+        parser.add_argument('--url', help="Base URL of a running server. By default a local server is started.")
+
+    def handle(self, *args, **options):
+        data = get_scenario_data()
+        if not data.ad_ids:
+            raise CommandError("There are no active ads to browse; create some first.")
+        session_keys = prepare_users(options['users'])
+
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server, base_url = self._start_server()
+        try:
+            self.stdout.write(
+                f"Running {len(session_keys)} users in {options['processes']} processes "
+                f"against {base_url} for {options['duration']:g}s..."
+            )
+            started = time.monotonic()
+            samples = run_load_test(
+                base_url, session_keys, data, options['duration'], processes=options['processes'],
+                seed=options['seed'], think_time=options['think_time'], poll_interval=options['poll_interval'],
+            )
+            elapsed = time.monotonic() - started
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+        self.stdout.write(
+            f"{'endpoint':<20}{'requests':>10}{'req/s':>10}{'errors':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        )
+        for row in summarize(samples, elapsed):
+            self.stdout.write(
+                f"{row['name']:<20}{row['requests']:>10}{row['throughput']:>10.1f}{row['error_rate']:>9.1%}"
+                f"{row['p50']:>10.1f}{row['p90']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}"
+            )
+
+    def _start_server(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        server = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'],
+            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server, f'http://127.0.0.1:{port}'
+            except OSError:
+                if server.poll() is not None:
+                    break
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError("The local server did not start.")
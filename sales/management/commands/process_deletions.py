@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from sales.deletion import process_deletions
+
+
+class Command(BaseCommand):
+    help = "Carry out queued ad and user deletions and remove the media files they left behind."
+
+    def handle(self, *args, **options):
+        ads, users, files = process_deletions()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {ads} ads and {users} users, removed {files} files."))
@@ -0,0 +1,36 @@
+import pstats
+
+from django.core.management.base import BaseCommand
+
+from sales.profiling import get_profile_dir, iter_profiles
+
+
+class Command(BaseCommand):
+    help = "Add up the saved request profiles and print the top hotspots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help="Directory holding the profiles. Defaults to PROFILING_DIR.")
+        parser.add_argument('--view', help="Only use profiles of this view name, e.g. ad_list.")
+        parser.add_argument('--limit', type=int, default=25, help="Number of functions to print.")
+        parser.add_argument(
+            '--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'],
+            help="Order of the printed functions.",
+        )
+
+    def handle(self, *args, **options):
+        profiles = list(iter_profiles(options['dir'] or get_profile_dir(), options['view']))
+        if not profiles:
+            self.stdout.write("No profiles found.")
+            return
+
+        durations = [metadata['duration'] for _, metadata in profiles]
+        queries = [metadata['queries'] for _, metadata in profiles]
+        self.stdout.write(
+            f"{len(profiles)} profiles, {sum(durations) / len(durations) * 1000:.1f} ms and "
+            f"{sum(queries) / len(queries):.1f} queries per request on average."
+        )
+        slowest_path, slowest = max(profiles, key=lambda profile: profile[1]['duration'])
+        self.stdout.write(f"Slowest: {slowest['method']} {slowest['url']} ({slowest['duration'] * 1000:.1f} ms)")
+
+        stats = pstats.Stats(*[path for path, _ in profiles], stream=self.stdout)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
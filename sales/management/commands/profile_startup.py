@@ -0,0 +1,81 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker does when it boots: import the WSGI module, which sets Django
+# up and warms the URLconf and templates.
+BOOT_SCRIPT = "import importlib; importlib.import_module({module!r})"
+
+
+def parse_importtime(output):
+    """
+    Parse `python -X importtime` output into (module, self µs, cumulative µs)
+    rows.
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_time, cumulative, module = line[len('import time:'):].split('|')
+            rows.append((module.strip(), int(self_time), int(cumulative)))
+        except ValueError:
+            continue
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Report where worker start-up time goes (-X importtime) and benchmark the boot."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help="Number of modules to list.")
+        parser.add_argument('--runs', type=int, default=5, help="Number of boots timed for the benchmark (0 skips it).")
+
+    def handle(self, *args, **options):
+        module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+        script = BOOT_SCRIPT.format(module=module)
+
+        result = self._boot(script, '-X', 'importtime')
+        rows = parse_importtime(result.stderr)
+        if not rows:
+            raise CommandError(f"Could not read the import times:\n{result.stderr[-2000:]}")
+
+        total = sum(self_time for _, self_time, _ in rows)
+        self.stdout.write(f"Imported {len(rows)} modules in {total / 1000:.1f} ms (sum of self times).")
+        self.stdout.write("\nSlowest modules (self / cumulative ms):")
+        for name, self_time, cumulative in sorted(rows, key=lambda row: -row[1])[:options['limit']]:
+            self.stdout.write(f"  {self_time / 1000:>8.1f} {cumulative / 1000:>8.1f}  {name}")
+
+        by_package = defaultdict(int)
+        for name, self_time, _ in rows:
+            by_package[name.split('.')[0]] += self_time
+        self.stdout.write("\nBy top-level package (ms):")
+        for package, self_time in sorted(by_package.items(), key=lambda item: -item[1])[:options['limit']]:
+            self.stdout.write(f"  {self_time / 1000:>8.1f}  {package}")
+
+        if options['runs'] > 0:
+            timings = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                self._boot(script)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"\nBoot benchmark over {len(timings)} runs: median {statistics.median(timings):.1f} ms, "
+                f"min {min(timings):.1f} ms, max {max(timings):.1f} ms."
+            )
+
+    def _boot(self, script, *flags):
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'myproject.settings'))
+        result = subprocess.run(
+            [sys.executable, *flags, '-c', script], cwd=settings.BASE_DIR, env=environment,
+            capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Booting {script!r} failed:\n{result.stderr[-2000:]}")
+        return result
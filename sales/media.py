@@ -0,0 +1,139 @@
+"""
+Serving uploaded media.
+
+`MediaFileView` serves files under `MEDIA_ROOT` in one of three ways,
+chosen by `MEDIA_SERVE_MODE`:
+
+* ``'python'`` streams the file from Django, honouring single `Range`
+  requests (206 / 416) and `If-Modified-Since`,
+* ``'x-accel'`` answers with an empty response whose `X-Accel-Redirect`
+  header points nginx at `MEDIA_ACCEL_REDIRECT_PREFIX` + path, an
+  ``internal`` location aliased to `MEDIA_ROOT`,
+* ``'sendfile'`` does the same for Apache mod_xsendfile and lighttpd with an
+  `X-Sendfile` header holding the absolute path.
+
+In the last two modes the web server sends the bytes and handles ranges
+itself. Content-addressed blobs (see sales/storage.py) never change, so
+they are sent with far-future immutable cache headers; other media uses
+`MEDIA_MAX_AGE`.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views import View
+from django.views.static import was_modified_since
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive `(start, end)` byte positions of a single-range
+    `Range` header, or None when the whole file should be sent. Raises
+    RangeNotSatisfiable when the range lies outside the file.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        suffix_length = int(end)
+        if suffix_length == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix_length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+class MediaFileView(View):
+    http_method_names = ['get', 'head']
+
+    def get(self, request, path):
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404("Media file not found.")
+        try:
+            stat = os.stat(full_path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise Http404("Media file not found.")
+        if not os.path.isfile(full_path):
+            raise Http404("Media file not found.")
+
+        mode = getattr(settings, 'MEDIA_SERVE_MODE', 'python')
+        if mode == 'x-accel':
+            response = self._build_offload_response(full_path)
+            response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/') + quote(path)
+        elif mode == 'sendfile':
+            response = self._build_offload_response(full_path)
+            response['X-Sendfile'] = full_path
+        elif not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = self._build_file_response(request, full_path, stat.st_size)
+
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = self._get_cache_control(path)
+        return response
+
+    def _build_offload_response(self, full_path):
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
+
+    def _build_file_response(self, request, full_path, size):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(full_path, 'rb'))
+        else:
+            start, end = byte_range
+            content_type, _ = mimetypes.guess_type(full_path)
+            response = StreamingHttpResponse(
+                _read_range(full_path, start, end - start + 1),
+                status=206, content_type=content_type or 'application/octet-stream',
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    def _get_cache_control(self, path):
+        if path.startswith(getattr(settings, 'MEDIA_BLOB_DIR', 'blobs') + '/'):
+            return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        return f"public, max-age={getattr(settings, 'MEDIA_MAX_AGE', 3600)}"
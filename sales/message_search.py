@@ -0,0 +1,30 @@
+"""
+Full-text search over message content.
+
+On SQLite, the `sales_message_fts` FTS5 table (migration 0017) indexes
+`Message.content` and is kept in sync by triggers on `sales_message`, so a
+search looks up words in the FTS index instead of scanning every message
+with `LIKE '%term%'`. `content_condition(term)` matches messages containing
+words that start with each word of the term, in any order.
+
+Other databases have no such index; there the condition matches nothing.
+"""
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .text import tokenize
+
+FTS_TABLE = 'sales_message_fts'
+
+
+def fts_query(term):
+    """Return an FTS5 query for the words of `term`, each as a prefix, or ''."""
+    return ' '.join(f'"{token}"*' for token in tokenize(term))
+
+
+def content_condition(term, using='default'):
+    query = fts_query(term)
+    if not query or connections[using].vendor != 'sqlite':
+        return Q(pk__in=[])
+    return Q(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]))
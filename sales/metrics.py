@@ -0,0 +1,309 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Counters, gauges and fixed-bucket histograms live in a process-local
+registry; recording a sample is a dict update under a lock. When
+`METRICS_MULTIPROC_DIR` is set, each process writes its samples to
+`<dir>/<pid>.json` after a request finishes, at most once every
+`METRICS_FLUSH_INTERVAL` seconds. The `/metrics` endpoint then adds up the
+files of every gunicorn worker, including workers that have exited, so
+counters never go backwards. Clear the directory when the service is
+restarted.
+
+`MetricsMiddleware` times every request to a `sales` or `accounts` view and
+counts its database queries; `record_cache_lookup()` counts hits and misses
+of the application caches.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection
+from django.dispatch import receiver
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+INSTRUMENTED_MODULES = ('sales.', 'accounts.')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, label_names=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._samples = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _check_labels(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes the labels {self.label_names}.")
+        return tuple(str(label) for label in labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: self._copy(value) for labels, value in self._samples.items()}
+
+    def _copy(self, value):
+        return value
+
+    def merge(self, snapshots):
+        """Combine the snapshots of several processes into one."""
+        merged = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot.items():
+                merged[labels] = merged[labels] + value if labels in merged else value
+        return merged
+
+    def render(self, snapshot):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}')
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        labels = self._check_labels(labels)
+        with self._lock:
+            self._samples[labels] = self._samples.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """A gauge. Across processes the values are summed, or the largest is kept."""
+    type = 'gauge'
+
+    def __init__(self, *args, multiprocess_mode='sum', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value, *labels):
+        labels = self._check_labels(labels)
+        with self._lock:
+            self._samples[labels] = value
+
+    def inc(self, *labels, amount=1):
+        labels = self._check_labels(labels)
+        with self._lock:
+            self._samples[labels] = self._samples.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def merge(self, snapshots):
+        if self.multiprocess_mode != 'max':
+            return super().merge(snapshots)
+        merged = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot.items():
+                merged[labels] = max(merged.get(labels, value), value)
+        return merged
+
+
+class Histogram(Metric):
+    """
+    A histogram with fixed upper bounds. Each sample holds the per-bucket
+    counts (the last bucket is +Inf), the sum and the count.
+    """
+    type = 'histogram'
+
+    def __init__(self, *args, buckets=LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        labels = self._check_labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._samples.get(labels)
+            if sample is None:
+                sample = self._samples[labels] = [[0] * len(self.buckets), 0, 0]
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    def _copy(self, value):
+        return [list(value[0]), value[1], value[2]]
+
+    def merge(self, snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for labels, (counts, total, count) in snapshot.items():
+                if labels not in merged:
+                    merged[labels] = [list(counts), total, count]
+                    continue
+                sample = merged[labels]
+                sample[0] = [left + right for left, right in zip(sample[0], counts)]
+                sample[1] += total
+                sample[2] += count
+        return merged
+
+    def render(self, snapshot):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.label_names, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._last_flush = time.monotonic()
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"A metric named {metric.name} is already registered.")
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def flush(self, directory, pid=None):
+        """Write this process's samples to its file in `directory`."""
+        self._last_flush = time.monotonic()
+        data = {
+            name: [[list(labels), value] for labels, value in samples.items()]
+            for name, samples in self.snapshot().items()
+        }
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{pid or os.getpid()}.json')
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(data, file)
+        os.replace(temp_path, path)
+
+    def flush_due(self, directory):
+        if time.monotonic() - self._last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            self.flush(directory)
+
+    def _read_snapshots(self, directory):
+        snapshots = []
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            snapshots.append({
+                name: {tuple(labels): value for labels, value in samples}
+                for name, samples in data.items()
+            })
+        return snapshots
+
+    def render(self, directory=None):
+        """
+        Return every metric in the Prometheus text format, aggregated over the
+        files in `directory` when it is given.
+        """
+        if directory:
+            self.flush(directory)
+            snapshots = self._read_snapshots(directory)
+        else:
+            snapshots = [self.snapshot()]
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.extend(metric.render(metric.merge(snapshot.get(name, {}) for snapshot in snapshots)))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS = Counter(
+    'http_requests_total', "Requests handled by sales and accounts views.", ('view', 'method', 'status')
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', "Time spent handling a request, by view.", ('view',)
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', "Database queries run by a request, by view.", ('view',),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge('http_requests_in_progress', "Requests being handled right now.")
+CACHE_LOOKUPS = Counter('cache_lookups_total', "Application cache lookups.", ('cache', 'result'))
+
+
+def record_cache_lookup(cache_name, hit):
+    CACHE_LOOKUPS.inc(cache_name, 'hit' if hit else 'miss')
+
+
+class MetricsMiddleware:
+    """Record latency, status and query count of sales and accounts views."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_count = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_query):
+                response = self.get_response(request)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+        elapsed = time.perf_counter() - started
+
+        view_name = self._get_view_name(request)
+        if view_name:
+            REQUESTS.inc(view_name, request.method, response.status_code)
+            REQUEST_LATENCY.observe(elapsed, view_name)
+            REQUEST_QUERIES.observe(query_count, view_name)
+        return response
+
+    def _get_view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.func.__module__.startswith(INSTRUMENTED_MODULES):
+            return None
+        return match.view_name
+
+
+@receiver(request_finished, dispatch_uid='sales.metrics.flush_due')
+def flush_due(**kwargs):
+    directory = getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+    if directory:
+        REGISTRY.flush_due(directory)
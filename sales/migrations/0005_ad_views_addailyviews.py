@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_conversation_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='views',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Total number of detail page views, flushed periodically from the view counter buffer.'),
+        ),
+        migrations.CreateModel(
+            name='AdDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='The day the views were counted on.')),
+                ('views', models.PositiveIntegerField(default=0, help_text='Number of detail page views on this day.')),
+                ('ad', models.ForeignKey(help_text='The ad that was viewed.', on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='sales.ad')),
+            ],
+            options={
+                'ordering': ('ad', 'date'),
+                'unique_together': {('ad', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_ad_views_addailyviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, help_text='Latitude resolved from the location via the offline gazetteer.', null=True),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, help_text='Longitude resolved from the location via the offline gazetteer.', null=True),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Geohash of the resolved coordinates, used for radius searches.', max_length=12),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_ad_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, help_text='A label for the search chosen by the user.', max_length=255)),
+                ('params', models.JSONField(default=dict, help_text='The AdFilter query parameters of the search.')),
+                ('anchor_term', models.CharField(blank=True, db_index=True, help_text='The longest word of the keyword search, used to look up candidate searches.', max_length=64)),
+                ('minimum_price', models.DecimalField(blank=True, decimal_places=2, help_text='The minimum price the search is restricted to, if any.', max_digits=10, null=True)),
+                ('maximum_price', models.DecimalField(blank=True, decimal_places=2, help_text='The maximum price the search is restricted to, if any.', max_digits=10, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the search was saved.')),
+                ('category', models.ForeignKey(blank=True, help_text='The category the search is restricted to, if any.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='sales.category')),
+                ('user', models.ForeignKey(help_text='The user who saved this search.', on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('matched_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the match was found.')),
+                ('seen', models.BooleanField(default=False, help_text='Indicates whether the user has seen this match in their feed.')),
+                ('ad', models.ForeignKey(help_text='The ad that matched.', on_delete=django.db.models.deletion.CASCADE, related_name='saved_search_matches', to='sales.ad')),
+                ('saved_search', models.ForeignKey(help_text='The saved search the ad matched.', on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='sales.savedsearch')),
+                ('user', models.ForeignKey(help_text='The owner of the saved search, denormalized for the feed query.', on_delete=django.db.models.deletion.CASCADE, related_name='saved_search_matches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-matched_at',),
+                'indexes': [models.Index(fields=['user', '-matched_at'], name='saved_match_feed_idx')],
+                'unique_together': {('saved_search', 'ad')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0007_savedsearch_savedsearchmatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedAd',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(help_text='Position of the recommendation, starting at 0 for the most similar ad.')),
+                ('score', models.FloatField(help_text='Combined text, category and price similarity.')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, help_text='The date and time the job run that computed the recommendation started.')),
+                ('ad', models.ForeignKey(help_text='The ad the recommendation is shown on.', on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='sales.ad')),
+                ('related', models.ForeignKey(help_text='The recommended ad.', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sales.ad')),
+            ],
+            options={
+                'ordering': ('ad', 'rank'),
+                'unique_together': {('ad', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_relatedad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, editable=False, help_text='The earliest ad this ad was detected as a near-duplicate of.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='sales.ad'),
+        ),
+        migrations.CreateModel(
+            name='AdFingerprint',
+            fields=[
+                ('ad', models.OneToOneField(help_text='The fingerprinted ad.', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='sales.ad')),
+                ('signature', models.JSONField(help_text="MinHash signature of the ad's title and description.")),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AdFingerprintBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(help_text='Index of the band within the signature.')),
+                ('bucket', models.BigIntegerField(help_text='Hash of the signature rows in this band.')),
+                ('ad', models.ForeignKey(help_text='The fingerprinted ad.', on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_bands', to='sales.ad')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'bucket'], name='fingerprint_band_idx')],
+                'unique_together': {('ad', 'band')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:50
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0009_ad_duplicate_of_adfingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the ad is deactivated by the expiry job; set from AD_EXPIRY_DAYS when the ad is created or restored.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['is_active', 'expires_at'], name='ad_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['is_active', 'updated_at'], name='ad_archival_idx'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedAd',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(help_text='The primary key the ad had, and gets back when restored.', unique=True)),
+                ('title', models.CharField(help_text='The title of the ad, kept for listing archived ads.', max_length=255)),
+                ('archived_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the ad was archived.')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='The serialized ad, image, conversation and message rows.')),
+                ('user', models.ForeignKey(help_text='The user who created the ad.', on_delete=django.db.models.deletion.CASCADE, related_name='archived_ads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-archived_at',),
+                'indexes': [models.Index(fields=['user', '-archived_at'], name='archived_ad_user_idx')],
+            },
+        ),
+    ]
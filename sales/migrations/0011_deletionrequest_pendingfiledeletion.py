@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0010_ad_expires_at_archivedad'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ad', 'Ad'), ('user', 'User')], help_text='The kind of object to delete.', max_length=10)),
+                ('object_id', models.BigIntegerField(help_text='The primary key of the ad or user to delete.')),
+                ('requested_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the deletion was requested.')),
+            ],
+            options={
+                'ordering': ('requested_at',),
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PendingFileDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='The storage path of the file.', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the file was queued for removal.')),
+            ],
+        ),
+    ]
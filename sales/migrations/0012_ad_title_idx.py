@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0011_deletionrequest_pendingfiledeletion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['title'], name='ad_title_idx'),
+        ),
+    ]
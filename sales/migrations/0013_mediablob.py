@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0012_ad_title_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(help_text='The BLAKE2b digest of the file content.', max_length=32, unique=True)),
+                ('name', models.CharField(help_text='The storage path of the file.', max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(help_text='The file size in bytes.')),
+                ('reference_count', models.PositiveIntegerField(default=0, help_text='The number of stored references to the file.')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='The date and time the file was first stored.')),
+            ],
+        ),
+    ]
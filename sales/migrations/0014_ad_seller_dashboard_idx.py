@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0013_mediablob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ad',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='ad_seller_dashboard_idx'),
+        ),
+    ]
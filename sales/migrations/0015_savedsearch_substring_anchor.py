@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+from sales.text import keyword_anchor
+
+
+def update_anchors(apps, schema_editor):
+    SavedSearch = apps.get_model('sales', 'SavedSearch')
+    searches = list(SavedSearch.objects.only('pk', 'params', 'anchor_term'))
+    for search in searches:
+        search.anchor_term = keyword_anchor(search.params.get('keyword_to_search', ''), 3)
+    SavedSearch.objects.bulk_update(searches, ['anchor_term'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0014_ad_seller_dashboard_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='savedsearch',
+            name='anchor_term',
+            field=models.CharField(blank=True, db_index=True, help_text='The first characters of the longest word of the keyword search, used to look up candidate searches.', max_length=64),
+        ),
+        migrations.RunPython(update_anchors, migrations.RunPython.noop),
+    ]
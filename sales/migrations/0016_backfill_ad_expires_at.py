@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:10
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import F
+
+
+def backfill_expires_at(apps, schema_editor):
+    # Ads created before expiry existed expire AD_EXPIRY_DAYS after creation,
+    # like new ones.
+    Ad = apps.get_model('sales', 'Ad')
+    days = getattr(settings, 'AD_EXPIRY_DAYS', 60)
+    Ad.objects.filter(expires_at__isnull=True).update(expires_at=F('created_at') + timedelta(days=days))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0015_savedsearch_substring_anchor'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:30
+
+from django.db import migrations
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE sales_message_fts USING fts5(content, content='sales_message', content_rowid='id')",
+    """CREATE TRIGGER sales_message_fts_insert AFTER INSERT ON sales_message BEGIN
+        INSERT INTO sales_message_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER sales_message_fts_delete AFTER DELETE ON sales_message BEGIN
+        INSERT INTO sales_message_fts(sales_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER sales_message_fts_update AFTER UPDATE OF content ON sales_message BEGIN
+        INSERT INTO sales_message_fts(sales_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO sales_message_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    "INSERT INTO sales_message_fts(sales_message_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS sales_message_fts_update",
+    "DROP TRIGGER IF EXISTS sales_message_fts_delete",
+    "DROP TRIGGER IF EXISTS sales_message_fts_insert",
+    "DROP TABLE IF EXISTS sales_message_fts",
+]
+
+
+def run_on_sqlite(statements):
+    # FTS5 and these triggers are SQLite-only; other databases skip them.
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0016_backfill_ad_expires_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -1,8 +1,69 @@
 from django.core.exceptions import PermissionDenied
+from .deletion import exclude_pending_deletion
+from .inbox import get_inbox_page
+from .rate_limiting import rate_limited_response, take_token
+
+class CachedObjectMixin:
+    """
+    Memoize `get_object()` for the lifetime of the view instance (one request),
+    so permission checks in `dispatch` and the generic view handlers share a
+    single fetch.
+    """
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_cached_object'):
+            self._cached_object = super().get_object()
+        return self._cached_object
+
+class AdOwnerRequiredMixin(CachedObjectMixin):
+    def get_queryset(self):
+        # Ads waiting for the deletion job are gone as far as their owner is concerned.
+        return exclude_pending_deletion(super().get_queryset())
 
-class AdOwnerRequiredMixin:
     def dispatch(self, request, *args, **kwargs):
         ad = self.get_object()
-        if ad.user != request.user:
+        if ad.user_id != request.user.pk:
             raise PermissionDenied("You do not have permission to modify this ad.")
         return super().dispatch(request, *args, **kwargs)
+
+class RateLimitMixin:
+    """
+    Answer `429 Too Many Requests` once the user has used up the request
+    budget of `rate_limit_scope` (see `RATE_LIMITS`). Place it after
+    `LoginRequiredMixin`.
+    """
+    rate_limit_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            allowed, retry_after = take_token(self.rate_limit_scope, request.user.pk)
+            if not allowed:
+                return rate_limited_response(self.rate_limit_scope, retry_after)
+        return super().dispatch(request, *args, **kwargs)
+
+class InboxPaginationMixin:
+    """
+    Cursor pagination for conversation inboxes.
+
+    Pages are addressed by the opaque `?cursor=` query parameter instead of a
+    page number, so deep pages cost the same as the first one.
+    """
+    inbox_sides = ('owner', 'buyer')
+    next_cursor = None
+
+    def get_inbox_conversations(self, ad_id=None, unread_only=False):
+        page = get_inbox_page(
+            self.request.user,
+            cursor=self.request.GET.get('cursor'),
+            ad_id=ad_id,
+            unread_only=unread_only,
+            sides=self.inbox_sides,
+        )
+        self.next_cursor = page.next_cursor
+        return page.conversations
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        return context
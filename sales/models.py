@@ -1,7 +1,15 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from ordered_model.models import OrderedModel
 from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from urllib.parse import urlencode
+from datetime import timedelta
+from .geo import geocode, encode_geohash, parse_point, haversine_km, DEFAULT_RADIUS_KM, MAX_RADIUS_KM
+from .text import keyword_anchor
 
 class CustomUser(AbstractUser):
     """
@@ -46,16 +54,103 @@ class Ad(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, help_text="The date and time the ad was created.")
     updated_at = models.DateTimeField(auto_now=True, help_text="The date and time the ad was last updated.")
     is_active = models.BooleanField(default=True, help_text="Indicates whether the ad is currently active and visible.")  
+    views = models.PositiveIntegerField(default=0, editable=False, help_text="Total number of detail page views, flushed periodically from the view counter buffer.")
+    latitude = models.FloatField(blank=True, null=True, editable=False, help_text="Latitude resolved from the location via the offline gazetteer.")
+    longitude = models.FloatField(blank=True, null=True, editable=False, help_text="Longitude resolved from the location via the offline gazetteer.")
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False, help_text="Geohash of the resolved coordinates, used for radius searches.")
+    expires_at = models.DateTimeField(blank=True, null=True, editable=False, help_text="When the ad is deactivated by the expiry job; set from AD_EXPIRY_DAYS when the ad is created or restored.")
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, blank=True, null=True, related_name='duplicates', editable=False, help_text="The earliest ad this ad was detected as a near-duplicate of.")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'expires_at'], name='ad_expiry_idx'),
+            models.Index(fields=['is_active', 'updated_at'], name='ad_archival_idx'),
+            models.Index(fields=['title'], name='ad_title_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='ad_seller_dashboard_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
     def is_visible_to_user(self, user):
-        return self.contact_info_visible or user == self.user
+        return self.contact_info_visible or user.pk == self.user_id
 
     def get_absolute_url(self):
         return reverse('ad_detail', args=[str(self.pk)])
+
+    def update_coordinates(self):
+        point = geocode(self.location)
+        if point is None:
+            self.latitude = self.longitude = None
+            self.geohash = ''
+        else:
+            self.latitude, self.longitude = point
+            self.geohash = encode_geohash(*point)
+
+    def save(self, *args, **kwargs):
+        deferred = self.get_deferred_fields()
+        if 'location' not in deferred:
+            self.update_coordinates()
+        if 'expires_at' not in deferred and self.expires_at is None:
+            self.expires_at = timezone.now() + timedelta(days=getattr(settings, 'AD_EXPIRY_DAYS', 60))
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # `views` is only written by the view count flush; saving a copy
+            # loaded before a flush must not put the old count back. Deferred
+            # fields were never loaded, so they are not written either.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'views' and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
     
+class AdDailyViews(models.Model):
+    """
+    Daily rollup of detail page views for a single ad, used for per-ad trend charts.
+    """
+
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='daily_views', help_text="The ad that was viewed.")
+    date = models.DateField(help_text="The day the views were counted on.")
+    views = models.PositiveIntegerField(default=0, help_text="Number of detail page views on this day.")
+
+    class Meta:
+        unique_together = ('ad', 'date')
+        ordering = ('ad', 'date')
+
+    def __str__(self):
+        return f"Ad({self.ad_id}) {self.date}: {self.views} views"
+
+class AdFingerprint(models.Model):
+    """
+    MinHash signature of an ad's text, used for near-duplicate detection
+    (see sales/duplicates.py).
+    """
+
+    ad = models.OneToOneField(Ad, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint', help_text="The fingerprinted ad.")
+    signature = models.JSONField(help_text="MinHash signature of the ad's title and description.")
+
+    def __str__(self):
+        return f"Fingerprint: Ad({self.ad_id})"
+
+class AdFingerprintBand(models.Model):
+    """
+    One LSH band of an ad's MinHash signature. Ads sharing a (band, bucket)
+    pair are candidate near-duplicates.
+    """
+
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='fingerprint_bands', help_text="The fingerprinted ad.")
+    band = models.PositiveSmallIntegerField(help_text="Index of the band within the signature.")
+    bucket = models.BigIntegerField(help_text="Hash of the signature rows in this band.")
+
+    class Meta:
+        unique_together = ('ad', 'band')
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='fingerprint_band_idx'),
+        ]
+
+    def __str__(self):
+        return f"Ad({self.ad_id}) band {self.band}: {self.bucket}"
+
 class AdImage(OrderedModel):
     """
     A model to store multiple images for a single Ad.
@@ -78,6 +173,36 @@ class AdImage(OrderedModel):
     def __str__(self):
         return f"Image for Ad: {self.ad.title}"
 
+class ConversationQuerySet(models.QuerySet):
+    def for_participant(self, user):
+        """
+        Restrict the queryset to conversations the user takes part in,
+        either as the ad owner or as the buyer.
+        """
+        return self.filter(models.Q(owner=user) | models.Q(buyer=user))
+
+    def get_or_start(self, ad, buyer):
+        """
+        Return the buyer's conversation about the ad, starting it if needed.
+
+        An existing conversation costs one query. Otherwise the row is
+        inserted with `ON CONFLICT DO NOTHING` and read back, so concurrent
+        starts (a double-click, two tabs) all end up with the same
+        conversation instead of failing on the `(ad, buyer)` constraint.
+
+        On SQLite `bulk_create(ignore_conflicts=True)` is `INSERT OR IGNORE`,
+        which hides more than the unique conflict: a row breaking a NOT NULL
+        or CHECK constraint is skipped silently, and a dangling foreign key
+        is not reported here either (SQLite checks Django's deferred foreign
+        keys at commit). The only conflict expected is on `(ad, buyer)`; any
+        other skipped row shows up as `DoesNotExist` from the read-back.
+        """
+        conversation = self.filter(ad=ad, buyer=buyer).first()
+        if conversation is None:
+            self.bulk_create([Conversation(ad=ad, owner_id=ad.user_id, buyer=buyer)], ignore_conflicts=True)
+            conversation = self.get(ad=ad, buyer=buyer)
+        return conversation
+
 class Conversation(models.Model):
     """
     Unique conversation between ad owner and a buyer, per ad.
@@ -88,15 +213,24 @@ class Conversation(models.Model):
     buyer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='buyer_conversations', help_text="The user interested in the ad (not the owner).")
     created_at = models.DateTimeField(auto_now_add=True, help_text="The date and time this conversation was started.")
 
+    objects = ConversationQuerySet.as_manager()
+
     class Meta:
         unique_together = ('ad', 'buyer')
         ordering = ('-created_at',)
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-id'], name='conversation_owner_inbox_idx'),
+            models.Index(fields=['buyer', '-created_at', '-id'], name='conversation_buyer_inbox_idx'),
+        ]
 
     def __str__(self):
         return f"Conversation: Ad({self.ad_id}) owner={self.owner_id} buyer={self.buyer_id}"
 
     def other_user(self, user):
-        return self.buyer if user == self.owner else self.owner
+        return self.buyer if user.pk == self.owner_id else self.owner
+
+    def has_participant(self, user):
+        return user.pk is not None and user.pk in (self.owner_id, self.buyer_id)
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -105,7 +239,7 @@ class Conversation(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.pk:
-            self.owner = self.ad.user
+            self.owner_id = self.ad.user_id
         super().save(*args, **kwargs)
 
     def has_unread_messages_for(self, user):
@@ -128,3 +262,195 @@ class Message(models.Model):
 
     def __str__(self):
         return f"Msg({self.pk}) conv={self.conversation_id} from={self.sender_id}"
+
+# Keywords match as substrings (like AdFilter), so a search is looked up by
+# a short piece of its keyword that every matching ad contains.
+SAVED_SEARCH_ANCHOR_SIZE = 3
+
+class SavedSearch(models.Model):
+    """
+    A set of AdFilter parameters saved by a user. New and updated ads are
+    matched against saved searches and the hits go into the user's feed.
+
+    `anchor_term`, `category`, `minimum_price` and `maximum_price` are derived
+    from `params` on save and indexed, so matching an ad only has to look at
+    saved searches that can possibly match it.
+    """
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='saved_searches', help_text="The user who saved this search.")
+    name = models.CharField(max_length=255, blank=True, help_text="A label for the search chosen by the user.")
+    params = models.JSONField(default=dict, help_text="The AdFilter query parameters of the search.")
+    anchor_term = models.CharField(max_length=64, blank=True, db_index=True, help_text="The first characters of the longest word of the keyword search, used to look up candidate searches.")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True, related_name='saved_searches', help_text="The category the search is restricted to, if any.")
+    minimum_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, help_text="The minimum price the search is restricted to, if any.")
+    maximum_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, help_text="The maximum price the search is restricted to, if any.")
+    created_at = models.DateTimeField(auto_now_add=True, help_text="The date and time the search was saved.")
+
+    class Meta:
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return self.name or self.get_query_string()
+
+    def get_query_string(self):
+        return urlencode(sorted(self.params.items()))
+
+    def save(self, *args, **kwargs):
+        self.update_index_fields()
+        super().save(*args, **kwargs)
+
+    def update_index_fields(self):
+        self.anchor_term = keyword_anchor(self.params.get('keyword_to_search', ''), SAVED_SEARCH_ANCHOR_SIZE)
+        self.category_id = _parse_number(self.params.get('category'), int)
+        self.minimum_price = _parse_number(self.params.get('minimum_price'), Decimal)
+        self.maximum_price = _parse_number(self.params.get('maximum_price'), Decimal)
+
+    def matches_ad(self, ad):
+        """
+        Check every parameter of the search against the ad, with the same
+        semantics as AdFilter.
+        """
+        params = self.params
+        keyword = params.get('keyword_to_search', '').lower()
+        if keyword and keyword not in ad.title.lower() and keyword not in ad.description.lower():
+            return False
+        if self.category_id is not None and ad.category_id != self.category_id:
+            return False
+        if self.minimum_price is not None and (ad.price is None or ad.price < self.minimum_price):
+            return False
+        if self.maximum_price is not None and (ad.price is None or ad.price > self.maximum_price):
+            return False
+        location = params.get('location', '').lower()
+        if location and location not in ad.location.lower():
+            return False
+        event_date = params.get('event_date')
+        if event_date and (ad.event_date is None or ad.event_date.isoformat() != event_date):
+            return False
+        if params.get('near'):
+            return self._matches_radius(ad)
+        return True
+
+    def _matches_radius(self, ad):
+        point = parse_point(self.params['near'])
+        if point is None or ad.latitude is None:
+            return False
+        radius = _parse_number(self.params.get('radius'), float) or DEFAULT_RADIUS_KM
+        distance, = haversine_km(*point, [(ad.latitude, ad.longitude)])
+        return distance <= min(radius, MAX_RADIUS_KM)
+
+def _parse_number(value, number_type):
+    try:
+        return number_type(value) if value not in (None, '') else None
+    except (ValueError, ArithmeticError):
+        return None
+
+class SavedSearchMatch(models.Model):
+    """
+    An ad that matched one of a user's saved searches; together these make up
+    the user's "new for you" feed.
+    """
+
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches', help_text="The saved search the ad matched.")
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='saved_search_matches', help_text="The ad that matched.")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='saved_search_matches', help_text="The owner of the saved search, denormalized for the feed query.")
+    matched_at = models.DateTimeField(auto_now_add=True, help_text="The date and time the match was found.")
+    seen = models.BooleanField(default=False, help_text="Indicates whether the user has seen this match in their feed.")
+
+    class Meta:
+        unique_together = ('saved_search', 'ad')
+        ordering = ('-matched_at',)
+        indexes = [
+            models.Index(fields=['user', '-matched_at'], name='saved_match_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Match: SavedSearch({self.saved_search_id}) Ad({self.ad_id})"
+
+class RelatedAd(models.Model):
+    """
+    A precomputed "similar listing" for an ad, written by the related ads job
+    (see sales/related_ads.py) so the detail page needs a single lookup.
+    """
+
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='related_links', help_text="The ad the recommendation is shown on.")
+    related = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='+', help_text="The recommended ad.")
+    rank = models.PositiveSmallIntegerField(help_text="Position of the recommendation, starting at 0 for the most similar ad.")
+    score = models.FloatField(help_text="Combined text, category and price similarity.")
+    computed_at = models.DateTimeField(default=timezone.now, help_text="The date and time the job run that computed the recommendation started.")
+
+    class Meta:
+        unique_together = ('ad', 'rank')
+        ordering = ('ad', 'rank')
+
+    def __str__(self):
+        return f"Ad({self.ad_id}) -> Ad({self.related_id}) #{self.rank}"
+
+class ArchivedAd(models.Model):
+    """
+    A long-dead ad moved out of the hot tables together with its images,
+    conversations and messages (see sales/lifecycle.py). The serialized rows
+    are restored as they were by `lifecycle.restore_ad()`.
+    """
+
+    original_id = models.BigIntegerField(unique=True, help_text="The primary key the ad had, and gets back when restored.")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_ads', help_text="The user who created the ad.")
+    title = models.CharField(max_length=255, help_text="The title of the ad, kept for listing archived ads.")
+    archived_at = models.DateTimeField(auto_now_add=True, help_text="The date and time the ad was archived.")
+    data = models.JSONField(encoder=DjangoJSONEncoder, help_text="The serialized ad, image, conversation and message rows.")
+
+    class Meta:
+        ordering = ('-archived_at',)
+        indexes = [
+            models.Index(fields=['user', '-archived_at'], name='archived_ad_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived: {self.title} ({self.original_id})"
+
+class DeletionRequest(models.Model):
+    """
+    An ad or user whose deletion was deferred to the background deletion job
+    (see sales/deletion.py).
+    """
+
+    AD = 'ad'
+    USER = 'user'
+    KIND_CHOICES = [(AD, 'Ad'), (USER, 'User')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, help_text="The kind of object to delete.")
+    object_id = models.BigIntegerField(help_text="The primary key of the ad or user to delete.")
+    requested_at = models.DateTimeField(auto_now_add=True, help_text="The date and time the deletion was requested.")
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+        ordering = ('requested_at',)
+
+    def __str__(self):
+        return f"Delete {self.kind} {self.object_id}"
+
+class PendingFileDeletion(models.Model):
+    """
+    A media file whose database row has been deleted; the file itself is
+    removed from storage later by the deletion job.
+    """
+
+    name = models.CharField(max_length=255, help_text="The storage path of the file.")
+    created_at = models.DateTimeField(auto_now_add=True, help_text="The date and time the file was queued for removal.")
+
+    def __str__(self):
+        return self.name
+
+class MediaBlob(models.Model):
+    """
+    One stored media file under the content-addressed storage, shared by
+    every upload with the same content (see sales/storage.py).
+    """
+
+    digest = models.CharField(max_length=32, unique=True, help_text="The BLAKE2b digest of the file content.")
+    name = models.CharField(max_length=255, unique=True, help_text="The storage path of the file.")
+    size = models.PositiveBigIntegerField(help_text="The file size in bytes.")
+    reference_count = models.PositiveIntegerField(default=0, help_text="The number of stored references to the file.")
+    created_at = models.DateTimeField(auto_now_add=True, help_text="The date and time the file was first stored.")
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,107 @@
+"""
+On-demand request profiling.
+
+`ProfilingMiddleware` runs a request under `cProfile` when a staff user asks
+for it with the `X-Profile: 1` header or the `?profile=1` query flag, and
+for one in every `PROFILING_SAMPLE_RATE` requests of any user (0 turns the
+sampling off). Each profile is written to `PROFILING_DIR` as a `pstats`
+file, next to a JSON file holding the URL, view, status, duration and query
+count of the request. Unprofiled requests only pay for a random number and a
+header lookup.
+
+The `profile_hotspots` command adds the saved profiles up and prints the
+functions where the time went.
+"""
+import cProfile
+import json
+import os
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+
+def get_profile_dir():
+    return str(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def iter_profiles(directory=None, view_name=None):
+    """Yield `(pstats path, metadata)` for every saved profile, oldest first."""
+    directory = directory or get_profile_dir()
+    if not os.path.isdir(directory):
+        return
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        stats_path = os.path.join(directory, filename[:-len('.json')] + '.prof')
+        try:
+            with open(os.path.join(directory, filename)) as file:
+                metadata = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if os.path.exists(stats_path) and view_name in (None, metadata.get('view')):
+            yield stats_path, metadata
+
+
+class ProfilingMiddleware:
+    """Profile requests flagged by staff users and a random sample of the rest."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+
+        query_count = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this thread.
+            return self.get_response(request)
+        try:
+            with connection.execute_wrapper(count_query):
+                response = self.get_response(request)
+        finally:
+            profile.disable()
+        elapsed = time.perf_counter() - started
+
+        self._save(profile, request, response, elapsed, query_count)
+        return response
+
+    def _should_profile(self, request):
+        sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        if sample_rate and random.randrange(sample_rate) == 0:
+            return True
+        flagged = request.headers.get('X-Profile') == '1' or request.GET.get('profile') == '1'
+        return flagged and request.user.is_staff
+
+    def _save(self, profile, request, response, elapsed, query_count):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        directory = get_profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        basename = '{}-{}-{}'.format(
+            timezone.now().strftime('%Y%m%dT%H%M%S%f'), (view_name or 'unresolved').replace(':', '.'), os.getpid()
+        )
+        profile.dump_stats(os.path.join(directory, basename + '.prof'))
+        with open(os.path.join(directory, basename + '.json'), 'w') as file:
+            json.dump({
+                'url': request.get_full_path(),
+                'method': request.method,
+                'view': view_name,
+                'status': response.status_code,
+                'duration': elapsed,
+                'queries': query_count,
+                'profiled_at': timezone.now().isoformat(),
+            }, file)
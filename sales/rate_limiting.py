@@ -0,0 +1,122 @@
+"""
+Per-user rate limiting and load shedding.
+
+`take_token()` is a token bucket kept in the local cache: each user gets
+`burst` requests up front for a scope, refilled at `rate` requests per minute
+as configured in `RATE_LIMITS`. Views opt in with `RateLimitMixin` and a
+`rate_limit_scope`; a user who has run out of tokens gets a `429` with a
+`Retry-After` header instead of a database round-trip. The buckets live in
+the process-local cache, so each worker process enforces the budget on its
+own.
+
+`ConcurrencyLimitMiddleware` counts the requests a worker process is handling
+at once. Past `LOAD_SHED_THRESHOLD` of `MAX_CONCURRENT_REQUESTS` it turns
+away the low-priority views in `LOW_PRIORITY_VIEWS` (chat polling, which the
+client simply retries), and at `MAX_CONCURRENT_REQUESTS` every request, with
+a `503` and `Retry-After`. `MAX_CONCURRENT_REQUESTS = None` disables it.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from django.urls import Resolver404, resolve
+
+from .metrics import Counter
+
+REJECTED_REQUESTS = Counter(
+    'http_requests_rejected_total', "Requests turned away by rate limiting or load shedding.", ('reason', 'scope'),
+)
+
+_bucket_lock = threading.Lock()
+
+
+def _cache_key(scope, key):
+    return f"rate-limit:{scope}:{key}"
+
+
+def take_token(scope, key):
+    """
+    Take a token from `key`'s bucket for `scope`. Returns `(allowed,
+    retry_after)`, where `retry_after` is the number of seconds until a token
+    is available again. Scopes missing from `RATE_LIMITS` are not limited.
+    """
+    limit = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+    if not limit:
+        return True, 0
+    per_minute, burst = limit
+    rate = per_minute / 60
+    cache = caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+    cache_key = _cache_key(scope, key)
+
+    with _bucket_lock:
+        now = time.time()
+        tokens, updated = cache.get(cache_key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # A bucket left alone until it is full again is the same as no bucket.
+        cache.set(cache_key, (tokens, now), math.ceil((burst - tokens) / rate) + 1)
+
+    if allowed:
+        return True, 0
+    return False, (1 - tokens) / rate
+
+
+def rate_limited_response(scope, retry_after):
+    REJECTED_REQUESTS.inc('rate_limit', scope)
+    seconds = max(1, math.ceil(retry_after))
+    response = JsonResponse(
+        {'error': f"Too many requests. Try again in {seconds} second{'s' if seconds != 1 else ''}."},
+        status=429,
+    )
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+class ConcurrencyLimitMiddleware:
+    """Shed low-priority requests first when the worker is close to saturated."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        limit = getattr(settings, 'MAX_CONCURRENT_REQUESTS', None)
+        if not limit:
+            return self.get_response(request)
+
+        view_name = self._view_name(request)
+        low_priority = view_name in getattr(settings, 'LOW_PRIORITY_VIEWS', ())
+        threshold = limit * getattr(settings, 'LOAD_SHED_THRESHOLD', 0.75) if low_priority else limit
+        with self.lock:
+            shed = self.in_flight >= threshold
+            if not shed:
+                self.in_flight += 1
+        if shed:
+            return self._overloaded_response(view_name, low_priority)
+
+        try:
+            return self.get_response(request)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _view_name(self, request):
+        try:
+            return resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+
+    def _overloaded_response(self, view_name, low_priority):
+        REJECTED_REQUESTS.inc('overload', view_name or 'unresolved')
+        if low_priority:
+            response = JsonResponse({'error': "The server is busy. Try again shortly."}, status=503)
+        else:
+            response = HttpResponse("The server is busy. Try again shortly.", status=503, content_type='text/plain')
+        response['Retry-After'] = str(getattr(settings, 'LOAD_SHED_RETRY_AFTER', 5))
+        return response
@@ -0,0 +1,84 @@
+"""
+Buffered read receipts.
+
+Opening a conversation (or polling its messages) records a "read up to
+message id" watermark per (conversation, user) in process memory instead of
+issuing an UPDATE on the GET path. Watermarks for the same pair are
+coalesced, and pending watermarks are written in batched UPDATEs:
+
+* after a request finishes, once `READ_RECEIPT_FLUSH_INTERVAL` seconds have
+  passed since the last flush or `READ_RECEIPT_MAX_PENDING` pairs are waiting;
+* before the next write to the same conversation (see `SendMessageView`);
+* before a view reads unread state for a user (`flush(user_id=...)`);
+* from an idle worker's flush thread, and when the worker exits (see
+  sales/buffers.py).
+"""
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.models import Q
+from django.dispatch import receiver
+
+from . import buffers
+from .models import Message
+
+_buffer = buffers.WriteBuffer(combine=max)
+
+
+def mark_read(conversation_id, user_id, up_to_message_id):
+    """
+    Record that the user has read every message in the conversation up to
+    and including `up_to_message_id`. Nothing is written to the database.
+    """
+    if not up_to_message_id:
+        return
+    _buffer.add((conversation_id, user_id), up_to_message_id)
+
+
+def pending_watermark(conversation_id, user_id):
+    return _buffer.get((conversation_id, user_id))
+
+
+def clear():
+    """Drop every pending watermark without writing it."""
+    _buffer.clear()
+
+
+def flush(conversation_id=None, user_id=None):
+    """
+    Write pending watermarks to the database, optionally only those for one
+    conversation and/or one user. Returns the number of messages marked read.
+    """
+    predicate = None
+    if conversation_id is not None or user_id is not None:
+        def predicate(key):
+            return (conversation_id is None or key[0] == conversation_id) and (user_id is None or key[1] == user_id)
+    watermarks = list(_buffer.drain(predicate).items())
+
+    batch_size = getattr(settings, 'READ_RECEIPT_BATCH_SIZE', 100)
+    updated = 0
+    for start in range(0, len(watermarks), batch_size):
+        updated += _apply_watermarks(watermarks[start:start + batch_size])
+    return updated
+
+
+def _apply_watermarks(watermarks):
+    condition = Q()
+    for (conversation_id, user_id), up_to_message_id in watermarks:
+        condition |= Q(conversation_id=conversation_id, pk__lte=up_to_message_id) & ~Q(sender_id=user_id)
+    return Message.objects.filter(condition, read=False).update(read=True)
+
+
+@receiver(request_finished, dispatch_uid='sales.read_receipts.flush_due')
+def flush_due(**kwargs):
+    """
+    Flush all pending watermarks once the flush interval has elapsed or the
+    buffer has grown past its limit. Runs after each request and from the
+    worker's flush thread.
+    """
+    if _buffer.is_due(
+        getattr(settings, 'READ_RECEIPT_FLUSH_INTERVAL', 2), getattr(settings, 'READ_RECEIPT_MAX_PENDING', 500)
+    ):
+        flush()
+
+
+buffers.register(flush, flush_due)
@@ -0,0 +1,149 @@
+"""
+Precomputed "similar listings" for the ad detail page.
+
+Every active ad is turned into a sparse TF-IDF vector over the words of its
+title (weighted `TITLE_WEIGHT` times) and description. Candidate neighbours
+come from an inverted index over those vectors, so an ad is only compared
+with ads that share at least one informative word. Candidates are ranked by
+text cosine similarity plus a bonus for the same category and for a similar
+(log-scaled) price, and the top `RELATED_ADS_COUNT` are stored as `RelatedAd`
+rows.
+
+The job runs offline through the `compute_related_ads` management command:
+either over every ad, or incrementally over the ads changed since the last
+run and the ads whose recommendations they affect.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Ad, RelatedAd
+from .text import tokenize
+
+TITLE_WEIGHT = 2
+TEXT_WEIGHT = 0.7
+CATEGORY_WEIGHT = 0.2
+PRICE_WEIGHT = 0.1
+# Words used by more than this share of ads add almost nothing to the cosine
+# under TF-IDF but would make every ad a candidate for every other one; they
+# are left out of the inverted index once the corpus is large enough.
+MAX_DOCUMENT_RATIO = 0.5
+MIN_PRUNED_DOCUMENT_FREQUENCY = 100
+
+
+class AdCorpus:
+    """TF-IDF vectors of the active ads and an inverted index over them."""
+
+    def __init__(self, rows):
+        term_counts = {}
+        document_frequency = Counter()
+        self.features = {}
+        for pk, title, description, category_id, price in rows:
+            counts = Counter(tokenize(description))
+            for term in tokenize(title):
+                counts[term] += TITLE_WEIGHT
+            term_counts[pk] = counts
+            document_frequency.update(counts.keys())
+            self.features[pk] = (category_id, math.log1p(float(price)) if price is not None else None)
+
+        total = len(term_counts)
+        max_frequency = max(MAX_DOCUMENT_RATIO * total, MIN_PRUNED_DOCUMENT_FREQUENCY)
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        for pk, counts in term_counts.items():
+            vector = {
+                term: (1 + math.log(count)) * (math.log((1 + total) / (1 + document_frequency[term])) + 1)
+                for term, count in counts.items()
+            }
+            norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+            self.vectors[pk] = vector = {term: weight / norm for term, weight in vector.items()}
+            for term, weight in vector.items():
+                if document_frequency[term] <= max_frequency:
+                    self.postings[term].append((pk, weight))
+
+    def __contains__(self, pk):
+        return pk in self.vectors
+
+    def neighbours(self, pk, count):
+        """Return up to `count` (score, ad id) pairs, most similar first."""
+        cosines = defaultdict(float)
+        for term, weight in self.vectors[pk].items():
+            for other, other_weight in self.postings.get(term, ()):
+                cosines[other] += weight * other_weight
+        cosines.pop(pk, None)
+        return heapq.nlargest(
+            count, ((self._score(pk, other, cosine), other) for other, cosine in cosines.items())
+        )
+
+    def _score(self, pk, other, cosine):
+        category_id, log_price = self.features[pk]
+        other_category_id, other_log_price = self.features[other]
+        score = TEXT_WEIGHT * cosine
+        if category_id == other_category_id:
+            score += CATEGORY_WEIGHT
+        if log_price is not None and other_log_price is not None:
+            score += PRICE_WEIGHT / (1 + abs(log_price - other_log_price))
+        return score
+
+
+def load_corpus():
+    rows = Ad.objects.filter(is_active=True).values_list('pk', 'title', 'description', 'category_id', 'price')
+    return AdCorpus(rows.iterator(chunk_size=2000))
+
+
+def compute_related_ads(ad_ids=None, batch_size=500, corpus=None):
+    """
+    Recompute and store the related ads of the given ads, or of every active
+    ad when `ad_ids` is None. Returns the number of ads processed.
+    """
+    started_at = timezone.now()
+    corpus = corpus or load_corpus()
+    count = getattr(settings, 'RELATED_ADS_COUNT', 6)
+    if ad_ids is None:
+        targets = sorted(corpus.vectors)
+        RelatedAd.objects.exclude(ad_id__in=Ad.objects.filter(is_active=True).values('pk')).delete()
+    else:
+        ad_ids = set(ad_ids)
+        targets = sorted(pk for pk in ad_ids if pk in corpus)
+        RelatedAd.objects.filter(ad_id__in=ad_ids - set(targets)).delete()
+
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        links = [
+            RelatedAd(ad_id=pk, related_id=other, rank=rank, score=score, computed_at=started_at)
+            for pk in batch
+            for rank, (score, other) in enumerate(corpus.neighbours(pk, count))
+        ]
+        with transaction.atomic():
+            RelatedAd.objects.filter(ad_id__in=batch).delete()
+            RelatedAd.objects.bulk_create(links, batch_size=batch_size)
+    return len(targets)
+
+
+def refresh_related_ads(batch_size=500):
+    """
+    Recompute the related ads affected by changes since the last run: the
+    changed ads themselves, the ads currently recommending them, and the ads
+    they are now similar to. Falls back to a full run when nothing has been
+    computed yet. Returns the number of ads processed.
+    """
+    last_run = RelatedAd.objects.aggregate(last_run=Max('computed_at'))['last_run']
+    if last_run is None:
+        return compute_related_ads(batch_size=batch_size)
+
+    changed = set(Ad.objects.filter(updated_at__gte=last_run).values_list('pk', flat=True))
+    if not changed:
+        return 0
+    corpus = load_corpus()
+    count = getattr(settings, 'RELATED_ADS_COUNT', 6)
+    affected = set(changed)
+    affected.update(RelatedAd.objects.filter(related_id__in=changed).values_list('ad_id', flat=True))
+    for pk in changed:
+        if pk in corpus:
+            affected.update(other for _, other in corpus.neighbours(pk, count))
+    return compute_related_ads(affected, batch_size, corpus)
@@ -0,0 +1,113 @@
+"""
+Incremental matching of ads against saved searches (a percolator).
+
+Instead of re-running every saved search when an ad changes, the ad is
+turned into a handful of indexed lookups over the saved searches:
+
+* `anchor_term` is empty or one of the up to three character pieces of the
+  words in the ad's title/description (keywords match as substrings, so
+  "book" must find "MacBook"),
+* `category` is empty or the ad's category,
+* `minimum_price`/`maximum_price` are empty or bracket the ad's price.
+
+Only the saved searches returned by that single query are checked in full
+with `SavedSearch.matches_ad()`; hits are stored as `SavedSearchMatch` rows.
+`percolate_ads()` does the same for a batch of ads with one candidate query,
+for bulk changes that bypass `save()`.
+"""
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import SAVED_SEARCH_ANCHOR_SIZE, Ad, SavedSearch, SavedSearchMatch
+from .text import ngrams
+
+# Saving an ad with update_fields outside this set cannot change which
+# searches it matches.
+MATCHED_FIELDS = {'title', 'description', 'price', 'category', 'location', 'latitude', 'longitude', 'event_date', 'is_active'}
+
+# Ads with more word pieces than this first look up which of them are
+# anchors, in chunks, to keep each query under the parameter limit.
+ANCHOR_CHUNK_SIZE = 900
+
+
+def get_candidate_searches(ad):
+    """
+    Return the saved searches that could match the ad, using only indexed
+    columns.
+    """
+    anchors = sorted(ngrams(ad.title, SAVED_SEARCH_ANCHOR_SIZE) | ngrams(ad.description, SAVED_SEARCH_ANCHOR_SIZE))
+    if len(anchors) > ANCHOR_CHUNK_SIZE:
+        anchors = _find_anchors(anchors)
+    condition = (
+        (Q(anchor_term='') | Q(anchor_term__in=anchors))
+        & (Q(category__isnull=True) | Q(category_id=ad.category_id))
+    )
+    if ad.price is None:
+        condition &= Q(minimum_price__isnull=True, maximum_price__isnull=True)
+    else:
+        condition &= Q(minimum_price__isnull=True) | Q(minimum_price__lte=ad.price)
+        condition &= Q(maximum_price__isnull=True) | Q(maximum_price__gte=ad.price)
+    return SavedSearch.objects.filter(condition).exclude(user_id=ad.user_id)
+
+
+def _find_anchors(grams):
+    found = set()
+    for start in range(0, len(grams), ANCHOR_CHUNK_SIZE):
+        found.update(
+            SavedSearch.objects.filter(anchor_term__in=grams[start:start + ANCHOR_CHUNK_SIZE])
+            .values_list('anchor_term', flat=True).distinct()
+        )
+    return found
+
+
+def percolate(ad):
+    """
+    Match the ad against all saved searches and record new hits. Returns the
+    list of saved searches that matched.
+    """
+    if not ad.is_active:
+        return []
+    matched = [search for search in get_candidate_searches(ad) if search.matches_ad(ad)]
+    SavedSearchMatch.objects.bulk_create(
+        [SavedSearchMatch(saved_search=search, ad=ad, user_id=search.user_id) for search in matched],
+        ignore_conflicts=True,
+    )
+    return matched
+
+
+def percolate_ads(ads):
+    """
+    Match a batch of ads against the saved searches with one candidate query
+    and one insert. Returns the number of matches found.
+    """
+    ads = [ad for ad in ads if ad.is_active]
+    if not ads:
+        return 0
+    grams = {
+        ad.pk: ngrams(ad.title, SAVED_SEARCH_ANCHOR_SIZE) | ngrams(ad.description, SAVED_SEARCH_ANCHOR_SIZE)
+        for ad in ads
+    }
+    anchors = sorted(set().union(*grams.values()))
+    if len(anchors) > ANCHOR_CHUNK_SIZE:
+        anchors = _find_anchors(anchors)
+    candidates = list(SavedSearch.objects.filter(
+        (Q(anchor_term='') | Q(anchor_term__in=anchors))
+        & (Q(category__isnull=True) | Q(category_id__in={ad.category_id for ad in ads}))
+    ))
+    matches = [
+        SavedSearchMatch(saved_search=search, ad=ad, user_id=search.user_id)
+        for ad in ads for search in candidates
+        if search.user_id != ad.user_id
+        and (not search.anchor_term or search.anchor_term in grams[ad.pk])
+        and search.matches_ad(ad)
+    ]
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
+
+
+@receiver(post_save, sender=Ad, dispatch_uid='sales.saved_searches.percolate_on_save')
+def percolate_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not MATCHED_FIELDS & set(update_fields)):
+        return
+    percolate(instance)
@@ -0,0 +1,35 @@
+"""
+Per-ad statistics for the seller's "My Ads" dashboard.
+
+`annotate_seller_stats()` adds each ad's conversation count, unread message
+count, image count, last inquiry time and cover image to an ad queryset as
+correlated subqueries. A dashboard page is then one query however many ads
+the seller has: the subqueries only run for the rows of the page, and each
+is an index lookup on the ad's conversations or images.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import AdImage, Conversation, Message
+
+
+def _count(queryset, group_by):
+    counts = queryset.order_by().values(group_by).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def annotate_seller_stats(queryset, seller):
+    """
+    Annotate the seller's ads with `conversation_count`, `unread_count`
+    (messages from buyers the seller has not read), `image_count`,
+    `last_inquiry_at` (when a buyer last wrote) and `cover_image` (the file
+    name of the first image, or None).
+    """
+    buyer_messages = Message.objects.filter(conversation__ad=OuterRef('pk')).exclude(sender=seller)
+    return queryset.annotate(
+        conversation_count=_count(Conversation.objects.filter(ad=OuterRef('pk')), 'ad'),
+        unread_count=_count(buyer_messages.filter(read=False), 'conversation__ad'),
+        image_count=_count(AdImage.objects.filter(ad=OuterRef('pk')), 'ad'),
+        last_inquiry_at=Subquery(buyer_messages.order_by('-sent_at').values('sent_at')[:1]),
+        cover_image=Subquery(AdImage.objects.filter(ad=OuterRef('pk')).order_by('order').values('image')[:1]),
+    )
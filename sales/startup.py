@@ -0,0 +1,38 @@
+"""
+Process start-up work done ahead of the first request.
+
+`warm_up()` is called by `myproject/wsgi.py` and `myproject/asgi.py` right
+after Django is set up. It loads the URLconf, importing every view module
+and with them django-filter, the admin and the forms, and compiles the
+templates in `STARTUP_TEMPLATES` into the cached template loader. It then
+closes any database connection it opened. Under `gunicorn --preload` (see
+gunicorn.conf.py) this runs once in the master process, and every forked
+worker starts with the modules and templates already in memory instead of
+loading them on its first request.
+
+Pillow is not imported here. Django imports it only when an uploaded image
+is validated.
+
+The `profile_startup` command measures the boot of a worker process.
+"""
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+DEFAULT_STARTUP_TEMPLATES = (
+    'base.html', 'welcome.html', 'ad_list_view.html', 'ad_detail_view.html', 'dashboard.html',
+    'conversations/list.html', 'conversations/detail.html',
+)
+
+
+def warm_up():
+    get_resolver().url_patterns
+    for template_name in getattr(settings, 'STARTUP_TEMPLATES', DEFAULT_STARTUP_TEMPLATES):
+        try:
+            get_template(template_name)
+        except TemplateDoesNotExist:
+            continue
+    # Connections must not be shared with the forked workers.
+    connections.close_all()
@@ -0,0 +1,151 @@
+"""
+Content-addressed media storage.
+
+`ContentAddressedStorage` is a `FileSystemStorage` that stores each distinct
+file content once. An upload is hashed while it is streamed to a temporary
+file; if a `MediaBlob` with the same digest already exists, the upload is
+discarded and the existing path is returned, otherwise the file is moved to
+`MEDIA_BLOB_DIR/<xx>/<digest>/<filename>`. The first upload's filename is
+kept so URLs stay readable and served content types stay right.
+
+Every save adds a reference to the blob and every `delete()` drops one; the
+file is removed with its last reference. Any file saved through the storage,
+including derived variants of an image, is addressed the same way.
+
+It is used as the default storage, so `ImageField` and `FileField` need no
+changes. The `dedupe_media` command moves files uploaded before it into the
+store.
+"""
+import hashlib
+import os
+import tempfile
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import F
+
+from .models import MediaBlob
+
+DIGEST_SIZE = 16
+# Longest kept filename stem, so blob paths fit a default 100 character FileField.
+MAX_STEM_LENGTH = 40
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """A file system storage keeping one reference-counted copy per content."""
+
+    def get_available_name(self, name, max_length=None):
+        # Names are chosen by `_save()` from the content digest.
+        return name
+
+    def _save(self, name, content):
+        digest, size, temp_path = self._stream_to_temp_file(content)
+        try:
+            blob_name = self._get_blob_name(digest, name)
+            with transaction.atomic():
+                MediaBlob.objects.bulk_create(
+                    [MediaBlob(digest=digest, name=blob_name, size=size)], ignore_conflicts=True
+                )
+                MediaBlob.objects.filter(digest=digest).update(reference_count=F('reference_count') + 1)
+                stored_name = MediaBlob.objects.filter(digest=digest).values_list('name', flat=True).get()
+            full_path = self.path(stored_name)
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(temp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return stored_name
+
+    def delete(self, name):
+        with transaction.atomic():
+            blobs = MediaBlob.objects.filter(name=name)
+            if blobs.filter(reference_count__gt=1).update(reference_count=F('reference_count') - 1):
+                return
+            blobs.delete()
+        super().delete(name)
+
+    def add_references(self, name, count):
+        """Record `count` more references to the blob stored as `name`."""
+        MediaBlob.objects.filter(name=name).update(reference_count=F('reference_count') + count)
+
+    def _stream_to_temp_file(self, content):
+        """
+        Write the content to a temporary file inside the storage, hashing each
+        chunk on the way. Returns the digest, size and temporary path.
+        """
+        temp_dir = self.path(getattr(settings, 'MEDIA_BLOB_DIR', 'blobs'))
+        os.makedirs(temp_dir, exist_ok=True)
+        hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        size = 0
+        descriptor, temp_path = tempfile.mkstemp(dir=temp_dir, suffix='.upload')
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    hasher.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return hasher.hexdigest(), size, temp_path
+
+    def _get_blob_name(self, digest, name):
+        stem, extension = os.path.splitext(os.path.basename(name))
+        filename = stem[:MAX_STEM_LENGTH] + extension.lower()
+        return '/'.join([getattr(settings, 'MEDIA_BLOB_DIR', 'blobs'), digest[:2], digest, filename])
+
+
+def _content_addressed_fields():
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field
+
+
+def dedupe_media():
+    """
+    Move files stored before the content-addressed storage into it, pointing
+    every row that referenced a file at its shared blob. Returns the number of
+    files moved and the number of bytes freed.
+    """
+    references = defaultdict(list)
+    for model, field in _content_addressed_fields():
+        names = (
+            model._base_manager.exclude(**{f'{field.name}__isnull': True}).exclude(**{field.name: ''})
+            .values_list(field.name, flat=True).distinct()
+        )
+        for name in names:
+            references[name].append((model, field))
+    blob_names = set(MediaBlob.objects.values_list('name', flat=True))
+
+    moved = freed = 0
+    for name, fields in references.items():
+        storage = fields[0][1].storage
+        if name in blob_names or not storage.exists(name):
+            continue
+        size = storage.size(name)
+        with storage.open(name) as legacy_file:
+            blob_name = storage.save(name, legacy_file)
+        if MediaBlob.objects.filter(name=blob_name, reference_count__gt=1).exists():
+            freed += size
+        with transaction.atomic():
+            updated = sum(
+                model._base_manager.filter(**{field.name: name}).update(**{field.name: blob_name})
+                for model, field in fields
+            )
+            if updated:
+                storage.add_references(blob_name, updated - 1)
+        if not updated:
+            storage.delete(blob_name)
+        storage.delete(name)
+        blob_names.add(blob_name)
+        moved += 1
+    return moved, freed
@@ -0,0 +1,104 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.models import Ad, AdImage, Category
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name):
+    buffer = BytesIO()
+    Image.new('RGB', (2, 2)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, AD_IMAGE_UPLOAD_LIMIT=3)
+class AdImageApiTests(BufferResetTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user(username='owner', password='password')
+        self.other = User.objects.create_user(username='other', password='password')
+        category = Category.objects.create(name='Vehicles')
+        self.ad, self.other_ad = [
+            Ad.objects.create(
+                title=title, description=title, user=self.owner, category=category,
+                location='Chennai', price=100, contact_info='o@example.com'
+            )
+            for title in ('Bike', 'Car')
+        ]
+        self.images = [AdImage.objects.create(ad=self.ad, image=make_image(f'bike{n}.png')) for n in range(3)]
+        self.other_image = AdImage.objects.create(ad=self.other_ad, image=make_image('car.png'))
+        self.client.force_login(self.owner)
+
+    def _reorder(self, ad, order):
+        return self.client.post(
+            reverse('ad_image_reorder', args=[ad.pk]), json.dumps({'order': order}),
+            content_type='application/json'
+        )
+
+    def test_reorder_in_one_update(self):
+        new_order = [self.images[2].pk, self.images[0].pk, self.images[1].pk]
+        with CaptureQueriesContext(connection) as context:
+            response = self._reorder(self.ad, new_order)
+        self.assertEqual(response.json(), {'order': new_order})
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in context.captured_queries), 1)
+        self.assertEqual(list(self.ad.images.values_list('pk', flat=True)), new_order)
+        self.other_image.refresh_from_db()
+        self.assertEqual(self.other_image.order, 3)
+
+    def test_reorder_rejects_incomplete_or_foreign_ids(self):
+        ids = [image.pk for image in self.images]
+        for order in (ids[:2], ids[:2] + [self.other_image.pk], ids + ids[:1], 'nope'):
+            self.assertEqual(self._reorder(self.ad, order).status_code, 400)
+        response = self.client.post(
+            reverse('ad_image_reorder', args=[self.ad.pk]), 'not json', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_owner_may_change_images(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self._reorder(self.ad, [image.pk for image in self.images]).status_code, 403)
+        response = self.client.post(reverse('ad_image_upload', args=[self.ad.pk]), {'images': [make_image('x.png')]})
+        self.assertEqual(response.status_code, 403)
+
+    def test_batch_upload(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                reverse('ad_image_upload', args=[self.ad.pk]),
+                {'images': [make_image('a.png'), make_image('b.png')]}
+            )
+        self.assertEqual(response.status_code, 201)
+        uploaded = response.json()['images']
+        self.assertEqual([image['order'] for image in uploaded], [4, 5])
+        self.assertEqual(
+            sum(query['sql'].startswith('INSERT INTO "sales_adimage"') for query in context.captured_queries), 1
+        )
+        self.assertEqual(
+            list(self.ad.images.values_list('pk', flat=True)),
+            [image.pk for image in self.images] + [image['id'] for image in uploaded]
+        )
+
+    def test_batch_upload_validates_every_file(self):
+        url = reverse('ad_image_upload', args=[self.ad.pk])
+        response = self.client.post(url, {'images': [make_image('a.png'), SimpleUploadedFile('b.png', b'text')]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('b.png', response.json()['errors'])
+        self.assertEqual(self.client.post(url, {}).status_code, 400)
+        response = self.client.post(url, {'images': [make_image(f'{n}.png') for n in range(4)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AdImage.objects.count(), 4)
@@ -0,0 +1,171 @@
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.admin_performance import EstimatedCountPaginator
+from sales.autocomplete import ad_autocomplete
+from sales.models import Ad, Category, Conversation, DeletionRequest, Message, SavedSearch
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+
+
+@override_settings(ADMIN_PERFORMANCE_MODE=True)
+class AdminPerformanceModeTests(BufferResetTestCase):
+    def setUp(self):
+        super().setUp()
+        ad_autocomplete.reset()
+        self.addCleanup(ad_autocomplete.reset)
+        self.admin = User.objects.create_superuser(username='admin', password='password', email='a@example.com')
+        self.seller = User.objects.create_user(username='seller', password='password')
+        self.buyer = User.objects.create_user(username='buyer', password='password')
+        self.client.force_login(self.admin)
+        category = Category.objects.create(name='Vehicles')
+        self.bike, self.car, self.bicycle = [
+            Ad.objects.create(
+                title=title, description=f'{title} in great shape', user=self.seller, category=category,
+                location='Chennai', price=100, contact_info='s@example.com'
+            )
+            for title in ('Bike for sale', 'Car for sale', 'bicycle, kids size')
+        ]
+
+    def _changelist(self, model_name, **params):
+        return self.client.get(reverse(f'admin:sales_{model_name}_changelist'), params)
+
+    def _result_list(self, response):
+        return list(response.context['cl'].result_list)
+
+    def test_changelist_options(self):
+        response = self._changelist('ad')
+        changelist = response.context['cl']
+        self.assertFalse(changelist.show_full_result_count)
+        self.assertIsInstance(changelist.paginator, EstimatedCountPaginator)
+        self.assertIsNone(changelist.date_hierarchy)
+        self.assertEqual(changelist.search_help_text, site._registry[Ad].indexed_search_help_text)
+        self.assertNotIn('delete_selected', dict(response.context['action_form'].fields['action'].choices))
+
+    def test_options_follow_the_setting_per_request(self):
+        with override_settings(ADMIN_PERFORMANCE_MODE=False):
+            response = self._changelist('ad')
+        changelist = response.context['cl']
+        self.assertTrue(changelist.show_full_result_count)
+        self.assertNotIsInstance(changelist.paginator, EstimatedCountPaginator)
+        self.assertEqual(changelist.date_hierarchy, 'created_at')
+        self.assertIsNone(changelist.search_help_text)
+        self.assertIn('delete_selected', dict(response.context['action_form'].fields['action'].choices))
+        self.assertIsNone(self._changelist('ad').context['cl'].date_hierarchy)
+
+    def test_ad_search_is_index_backed(self):
+        self.assertEqual(set(self._result_list(self._changelist('ad', q='bi'))), {self.bike, self.bicycle})
+        self.assertEqual(self._result_list(self._changelist('ad', q='Car')), [self.car])
+        self.assertEqual(len(self._result_list(self._changelist('ad', q='seller'))), 3)
+        self.assertEqual(self._result_list(self._changelist('ad', q=str(self.car.pk))), [self.car])
+        # No substring matches on the description.
+        self.assertEqual(self._result_list(self._changelist('ad', q='great')), [])
+
+    def test_message_search_and_list_queries(self):
+        conversation = Conversation.objects.create(ad=self.car, buyer=self.buyer)
+        Message.objects.create(conversation=conversation, sender=self.buyer, content='Is it available?')
+
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self._changelist('message')
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        changelist_queries()  # Warm up per-process caches such as content types.
+        queries = changelist_queries()
+        for number in range(4):
+            Message.objects.create(conversation=conversation, sender=self.seller, content=f'Reply {number}')
+        self.assertEqual(changelist_queries(), queries)
+
+        self.assertEqual(len(self._result_list(self._changelist('message', q='buyer'))), 1)
+        self.assertEqual(len(self._result_list(self._changelist('message', q='Car'))), 5)
+        self.assertEqual(len(self._result_list(self._changelist('message', q=str(conversation.pk)))), 5)
+
+    def test_message_content_search_uses_fulltext_index(self):
+        conversation = Conversation.objects.create(ad=self.car, buyer=self.buyer)
+        question = Message.objects.create(conversation=conversation, sender=self.buyer, content='Is it available?')
+        reply = Message.objects.create(conversation=conversation, sender=self.seller, content='Yes, still for SALE.')
+
+        self.assertEqual(self._result_list(self._changelist('message', q='avail')), [question])
+        self.assertEqual(self._result_list(self._changelist('message', q='sale still')), [reply])
+        with CaptureQueriesContext(connection) as context:
+            self._changelist('message', q='available')
+        self.assertTrue(any('sales_message_fts' in query['sql'] for query in context.captured_queries))
+        self.assertFalse(any('LIKE' in query['sql'] for query in context.captured_queries))
+
+        reply.content = 'Sold, sorry.'
+        reply.save()
+        self.assertEqual(self._result_list(self._changelist('message', q='sale')), [])
+        self.assertEqual(self._result_list(self._changelist('message', q='sold')), [reply])
+        question.delete()
+        self.assertEqual(self._result_list(self._changelist('message', q='available')), [])
+        self.assertEqual(self._result_list(self._changelist('message', q='?')), [])
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_count_is_capped(self):
+        response = self._changelist('ad')
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertEqual(EstimatedCountPaginator(Ad.objects.all(), 10).count, 2)
+        self.assertEqual(EstimatedCountPaginator(Ad.objects.filter(title__startswith='Car'), 10).count, 1)
+
+    def _assert_bulk_update_queries(self, context):
+        # One UPDATE for the whole selection; the rest is the changelist, the
+        # batch percolation and the autocomplete rebuild after the request.
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(sum(sql.startswith('UPDATE "sales_ad"') for sql in queries), 1)
+        self.assertLessEqual(len(queries), 8)
+
+    def test_bulk_activation_runs_save_receivers(self):
+        changelist = reverse('admin:sales_ad_changelist')
+        ad_ids = [self.bike.pk, self.car.pk, self.bicycle.pk]
+        search = SavedSearch.objects.create(user=self.buyer, params={'keyword_to_search': 'bike'})
+        self.assertEqual(ad_autocomplete.suggest('bi', 'title'), ['bicycle', 'bike'])
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(changelist, {'action': 'deactivate_ads', '_selected_action': ad_ids})
+        self._assert_bulk_update_queries(context)
+        self.assertFalse(Ad.objects.filter(is_active=True).exists())
+        self.assertEqual(ad_autocomplete.suggest('bi', 'title'), [])
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(changelist, {'action': 'activate_ads', '_selected_action': ad_ids[:2]})
+        self._assert_bulk_update_queries(context)
+        self.assertEqual(Ad.objects.filter(is_active=True).count(), 2)
+        self.assertEqual(ad_autocomplete.suggest('bi', 'title'), ['bike'])
+        self.assertEqual(list(search.matches.values_list('ad_id', flat=True)), [self.bike.pk])
+
+        Ad.objects.filter(pk=self.car.pk).update(duplicate_of=self.bike)
+        self.client.post(changelist, {'action': 'deactivate_duplicates', '_selected_action': ad_ids})
+        self.assertEqual(list(Ad.objects.filter(is_active=True)), [self.bike])
+        self.assertEqual(ad_autocomplete.suggest('car', 'title'), [])
+
+    def test_background_deletion_is_a_single_insert(self):
+        changelist = reverse('admin:sales_ad_changelist')
+        ad_ids = [self.bike.pk, self.car.pk, self.bicycle.pk]
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(changelist, {'action': 'delete_in_background', '_selected_action': ad_ids})
+        self.assertEqual(sum(query['sql'].startswith('INSERT') for query in context.captured_queries), 1)
+        self.assertEqual(DeletionRequest.objects.count(), 3)
+
+        self.client.post(changelist, {'action': 'activate_ads', '_selected_action': ad_ids})
+        self.assertFalse(Ad.objects.filter(is_active=True).exists())
+
+    def test_message_actions(self):
+        conversation = Conversation.objects.create(ad=self.car, buyer=self.buyer)
+        messages = [
+            Message.objects.create(conversation=conversation, sender=self.buyer, content=f'Hi {number}')
+            for number in range(3)
+        ]
+        changelist = reverse('admin:sales_message_changelist')
+        self.client.post(changelist, {'action': 'mark_read', '_selected_action': [m.pk for m in messages]})
+        self.assertFalse(Message.objects.filter(read=False).exists())
+        self.client.post(changelist, {'action': 'delete_messages', '_selected_action': [messages[0].pk]})
+        self.assertEqual(Message.objects.count(), 2)
+
+    @override_settings(ADMIN_PERFORMANCE_MODE=False)
+    def test_substring_search_without_performance_mode(self):
+        self.assertEqual(len(self._result_list(self._changelist('ad', q='great'))), 3)
@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.auth_cache import _cache_key
+from sales.checks import check_shared_caches
+from sales.deletion import schedule_user_deletion
+from sales.models import Ad, Category, Conversation, Message
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+
+
+class AuthCacheTests(BufferResetTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='password', email='s@example.com')
+        self.buyer = User.objects.create_user(username='buyer', password='password', email='b@example.com')
+        ad = Ad.objects.create(
+            title='Bike', description='Bike', user=self.seller, category=Category.objects.create(name='Vehicles'),
+            location='Chennai', price=100, contact_info='s@example.com'
+        )
+        self.conversation = Conversation.objects.create(ad=ad, buyer=self.buyer)
+        Message.objects.create(conversation=self.conversation, sender=self.buyer, content='Hi')
+        self.client.login(username='buyer', password='password')
+        self.poll_url = reverse('conversation_messages_json', args=[self.conversation.pk])
+
+    def _auth_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "django_session"' in query['sql'] or 'FROM "sales_customuser"' in query['sql']
+        ]
+        return response, queries
+
+    def test_polling_runs_no_auth_queries(self):
+        self.client.get(self.poll_url)
+        response, queries = self._auth_queries(self.poll_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_profile_update_refreshes_cached_user(self):
+        self.client.get(self.poll_url)
+        self.client.post(reverse('profile'), {
+            'username': 'buyer', 'email': 'new@example.com', 'phone_number': '', 'contact_info_visibility': 'on',
+        })
+        response, queries = self._auth_queries(reverse('dashboard'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.context['user'].email, 'new@example.com')
+
+    def test_password_change_logs_out_other_sessions(self):
+        self.client.get(self.poll_url)
+        self.buyer.set_password('new password')
+        self.buyer.save()
+        response = self.client.get(self.poll_url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_deactivated_user_is_logged_out(self):
+        self.client.get(self.poll_url)
+        schedule_user_deletion(self.buyer)
+        response = self.client.get(self.poll_url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_cached_user_that_cannot_authenticate_is_not_served(self):
+        self.client.get(self.poll_url)
+        session_hash, user = cache.get(_cache_key(self.buyer.pk))
+        # A copy cached by a worker that missed the deactivation.
+        user.is_active = False
+        cache.set(_cache_key(self.buyer.pk), (session_hash, user))
+        User.objects.filter(pk=self.buyer.pk).update(is_active=False)
+        response = self.client.get(self.poll_url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_drops_cached_user(self):
+        self.client.get(self.poll_url)
+        self.assertIsNotNone(cache.get(_cache_key(self.buyer.pk)))
+        self.client.post(reverse('logout'))
+        self.assertIsNone(cache.get(_cache_key(self.buyer.pk)))
+
+    def test_per_process_cache_is_reported(self):
+        self.assertEqual([error.id for error in check_shared_caches(None)], ['sales.W001'])
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'},
+        }):
+            self.assertEqual(check_shared_caches(None), [])
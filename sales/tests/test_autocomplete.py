@@ -0,0 +1,129 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.autocomplete import PrefixIndex, ad_autocomplete
+from sales.models import Ad, Category
+
+User = get_user_model()
+
+
+class PrefixIndexTests(TestCase):
+    def test_search_orders_by_popularity(self):
+        index = PrefixIndex(max_terms=100)
+        index.add('Chennai')
+        index.add('Chandigarh')
+        index.add('Chandigarh')
+        index.add('Mumbai')
+        self.assertEqual(index.search('ch', 5), ['Chandigarh', 'Chennai'])
+        self.assertEqual(index.search('CHE', 5), ['Chennai'])
+        self.assertEqual(index.search('x', 5), [])
+
+    def test_remove_drops_term_when_unused(self):
+        index = PrefixIndex(max_terms=100)
+        index.add('bike')
+        index.add('bike')
+        index.remove('bike')
+        self.assertEqual(index.search('bi', 5), ['bike'])
+        index.remove('bike')
+        self.assertEqual(index.search('bi', 5), [])
+        self.assertEqual(len(index), 0)
+
+    def test_memory_is_bounded(self):
+        index = PrefixIndex(max_terms=10)
+        index.add('popular', count=5)
+        for number in range(20):
+            index.add(f'term{number:02d}')
+        self.assertLessEqual(len(index), 10)
+        self.assertEqual(index.search('pop', 5), ['popular'])
+
+
+class AutocompleteViewTests(TestCase):
+    def setUp(self):
+        ad_autocomplete.reset()
+        self.addCleanup(ad_autocomplete.reset)
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.category = Category.objects.create(name='Vehicles')
+        self.ad = self._create_ad('Mountain bike', 'Chennai')
+        self._create_ad('Road bike', 'Chennai')
+        self._create_ad('Hidden bicycle', 'Bangalore', is_active=False)
+        self.client.force_login(self.user)
+
+    def _create_ad(self, title, location, is_active=True):
+        return Ad.objects.create(
+            title=title, description=title, user=self.user, category=self.category,
+            location=location, price=100, contact_info='t@example.com', is_active=is_active
+        )
+
+    def _suggest(self, q, field='title'):
+        response = self.client.get(reverse('ad_autocomplete'), {'q': q, 'field': field})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['suggestions']
+
+    def test_suggests_title_terms_and_locations(self):
+        self.assertEqual(self._suggest('bi'), ['bike'])
+        self.assertEqual(self._suggest('mou'), ['mountain'])
+        self.assertEqual(self._suggest('ch', field='location'), ['Chennai'])
+        self.assertEqual(self._suggest('ba', field='location'), [])
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('ad_autocomplete'), {'q': 'bi'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_short_prefix_and_unknown_field(self):
+        self.assertEqual(self._suggest('b'), [])
+        response = self.client.get(reverse('ad_autocomplete'), {'q': 'bi', 'field': 'price'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_follows_ad_changes_without_queries(self):
+        self._suggest('bi')
+        self.ad.title = 'Mountain scooter'
+        self.ad.location = 'Coimbatore'
+        self.ad.save()
+        self._create_ad('Vintage scooter', 'Delhi')
+        Ad.objects.get(title='Road bike').delete()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ad_autocomplete.suggest('sc', 'title'), ['scooter'])
+            self.assertEqual(ad_autocomplete.suggest('bi', 'title'), [])
+            self.assertEqual(ad_autocomplete.suggest('co', 'location'), ['Coimbatore'])
+            self.assertEqual(ad_autocomplete.suggest('ch', 'location'), [])
+
+    def test_deactivating_an_ad_removes_its_terms(self):
+        self._suggest('bi')
+        self.ad.is_active = False
+        self.ad.save()
+        self.assertEqual(ad_autocomplete.suggest('mou', 'title'), [])
+        self.assertEqual(ad_autocomplete.suggest('bi', 'title'), ['bike'])
+        self.assertEqual(ad_autocomplete.suggest('ch', 'location'), ['Chennai'])
+
+    def _stored_state_reads(self, **save_kwargs):
+        with CaptureQueriesContext(connection) as context:
+            self.ad.save(**save_kwargs)
+        return sum(query['sql'].startswith('SELECT "sales_ad"."title"') for query in context.captured_queries)
+
+    def test_stored_row_is_read_only_when_indexed_fields_may_change(self):
+        self.assertEqual(self._stored_state_reads(update_fields=['location']), 0)  # index not built yet
+        self._suggest('bi')
+        self.assertEqual(self._stored_state_reads(update_fields=['contact_info']), 0)
+        self.assertEqual(self._stored_state_reads(update_fields=['location']), 1)
+        self.assertEqual(self._stored_state_reads(), 1)
+
+    def test_stale_index_is_served_and_rebuilt_after_the_request(self):
+        self._suggest('bi')
+        Ad.objects.filter(pk=self.ad.pk).update(title='Electric unicycle')
+        with override_settings(AUTOCOMPLETE_REBUILD_INTERVAL=0):
+            with self.assertNumQueries(0):
+                self.assertEqual(ad_autocomplete.suggest('uni', 'title'), [])
+            # The stale index answers the request; the rebuild runs once it has finished.
+            self.assertEqual(self._suggest('uni'), [])
+            self.assertEqual(ad_autocomplete.suggest('uni', 'title'), ['unicycle'])
+
+    def test_mark_stale_rebuilds_on_next_check(self):
+        self._suggest('bi')
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False)
+        ad_autocomplete.mark_stale()
+        ad_autocomplete.rebuild_if_stale()
+        self.assertEqual(ad_autocomplete.suggest('mou', 'title'), [])
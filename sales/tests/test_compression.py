@@ -0,0 +1,113 @@
+import gzip
+import json
+from unittest import skipUnless
+from io import StringIO
+from django.core.management import call_command
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales import compression
+from sales.compression import CompressionMiddleware, HTMLMinifyMiddleware, minify_html
+from sales.models import Ad, Category, Conversation, Message
+
+User = get_user_model()
+
+PAGE = """<html>
+    <body>
+        <p>Bike   for sale</p>
+        <pre>
+  keep
+    this</pre>
+        <script>
+    var x = 1;
+        </script>
+    </body>
+</html>"""
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100, HTML_MINIFY=True)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.payload = {'messages': [{'content': 'Is the bike still available?'}] * 50}
+
+    def _process(self, response, accept_encoding='gzip'):
+        request = self.factory.get('/', headers={'accept-encoding': accept_encoding})
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_minify_html(self):
+        minified = minify_html(PAGE)
+        self.assertIn('<html>\n<body>\n<p>Bike   for sale</p>\n<pre>\n  keep\n    this</pre>', minified)
+        self.assertIn('<script>\n    var x = 1;\n        </script>', minified)
+
+    def test_minify_middleware(self):
+        request = self.factory.get('/')
+        response = HTMLMinifyMiddleware(lambda request: HttpResponse(PAGE))(request)
+        self.assertEqual(response.content.decode(), minify_html(PAGE))
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        with self.settings(HTML_MINIFY=False):
+            response = HTMLMinifyMiddleware(lambda request: HttpResponse(PAGE))(request)
+        self.assertEqual(response.content.decode(), PAGE)
+
+    def test_gzip_json(self):
+        response = self._process(JsonResponse(self.payload))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.payload)
+
+    def test_skipped_responses(self):
+        self.assertFalse(self._process(JsonResponse({'messages': []})).has_header('Content-Encoding'))
+        self.assertFalse(self._process(JsonResponse(self.payload), 'identity').has_header('Content-Encoding'))
+        image = HttpResponse(b'x' * 1000, content_type='image/jpeg')
+        self.assertFalse(self._process(image).has_header('Content-Encoding'))
+
+    def test_streaming_response(self):
+        response = self._process(StreamingHttpResponse(iter([b'line\n'] * 100), content_type='text/plain'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'line\n' * 100)
+
+    @skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli_streaming_response_is_flushed_per_chunk(self):
+        def lines():
+            yield b'first line\n' * 20
+            self.fail("The first chunk must be sent before the next one is produced.")
+
+        response = self._process(StreamingHttpResponse(lines(), content_type='text/plain'), 'br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        first_chunk = next(iter(response.streaming_content))
+        self.assertEqual(compression.brotli.Decompressor().process(first_chunk), b'first line\n' * 20)
+
+    def test_brotli_only_when_installed(self):
+        response = self._process(JsonResponse(self.payload), 'br, gzip')
+        self.assertEqual(response['Content-Encoding'], 'br' if compression.brotli else 'gzip')
+
+
+class CompressionIntegrationTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(username='buyer', password='password')
+        seller = User.objects.create_user(username='seller', password='password')
+        ad = Ad.objects.create(
+            title='Bike', description='Bike', user=seller, category=Category.objects.create(name='Vehicles'),
+            location='Chennai', price=100, contact_info='s@example.com'
+        )
+        self.conversation = Conversation.objects.create(ad=ad, buyer=self.buyer)
+        for number in range(30):
+            Message.objects.create(conversation=self.conversation, sender=self.buyer, content=f'Message {number}')
+
+    def test_chat_poll_is_compressed(self):
+        self.client.force_login(self.buyer)
+        response = self.client.get(
+            reverse('conversation_messages_json', args=[self.conversation.pk]), headers={'accept-encoding': 'gzip'}
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))['messages']), 30)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_compression', '--iterations', '2', '--username', 'buyer', '--host', 'testserver', stdout=out)
+        output = out.getvalue()
+        self.assertIn(reverse('conversation_messages_json', args=[self.conversation.pk]), output)
+        self.assertIn('gzip', output)
+        self.assertIn('minified', output)
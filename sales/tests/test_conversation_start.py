@@ -0,0 +1,101 @@
+import threading
+import time
+
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.models import Ad, Category, Conversation
+
+User = get_user_model()
+
+
+def _create_ad(seller):
+    return Ad.objects.create(
+        title='Bike', description='Bike', user=seller, category=Category.objects.create(name='Vehicles'),
+        location='Chennai', price=100, contact_info='s@example.com'
+    )
+
+
+class ConversationStartTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password', email='s@example.com')
+        self.buyer = User.objects.create_user(username='buyer', password='password', email='b@example.com')
+        self.ad = _create_ad(self.seller)
+
+    def _conversation_queries(self, ad):
+        with CaptureQueriesContext(connection) as context:
+            conversation = Conversation.objects.get_or_start(ad, self.buyer)
+        return conversation, [query['sql'] for query in context.captured_queries]
+
+    def test_existing_conversation_takes_one_query(self):
+        existing = Conversation.objects.create(ad=self.ad, buyer=self.buyer)
+        conversation, queries = self._conversation_queries(self.ad)
+        self.assertEqual(conversation, existing)
+        self.assertEqual(len(queries), 1)
+
+    def test_new_conversation_skips_owner_lookup(self):
+        ad = Ad.objects.get(pk=self.ad.pk)
+        conversation, queries = self._conversation_queries(ad)
+        self.assertEqual(conversation.owner_id, self.seller.pk)
+        self.assertFalse(any('FROM "sales_customuser"' in sql for sql in queries))
+        self.assertEqual(len(queries), 3)
+
+    def test_save_skips_owner_lookup(self):
+        ad = Ad.objects.get(pk=self.ad.pk)
+        with CaptureQueriesContext(connection) as context:
+            conversation = Conversation.objects.create(ad=ad, buyer=self.buyer)
+        self.assertEqual(conversation.owner_id, self.seller.pk)
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_repeated_starts_reuse_the_conversation(self):
+        self.client.login(username='buyer', password='password')
+        url = reverse('start_conversation', args=[self.ad.pk])
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertEqual(first['Location'], second['Location'])
+        self.assertEqual(Conversation.objects.count(), 1)
+
+
+def _retry_if_locked(function, attempts=50):
+    """
+    Call `function`, retrying while SQLite reports a lock. The in-memory test
+    database uses a shared cache, whose table locks fail at once with
+    "database table is locked" instead of waiting out a busy timeout.
+    """
+    for attempt in range(attempts):
+        try:
+            return function()
+        except OperationalError as error:
+            if 'locked' not in str(error) or attempt == attempts - 1:
+                raise
+            time.sleep(0.01)
+
+
+class ConcurrentConversationStartTests(TransactionTestCase):
+    def test_concurrent_starts_share_one_conversation(self):
+        seller = User.objects.create_user(username='seller', password='password', email='s@example.com')
+        buyer = User.objects.create_user(username='buyer', password='password', email='b@example.com')
+        ad = _create_ad(seller)
+        barrier = threading.Barrier(8)
+        results, errors = [], []
+
+        def start():
+            try:
+                barrier.wait()
+                results.append(_retry_if_locked(lambda: Conversation.objects.get_or_start(ad, buyer)).pk)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=start) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(Conversation.objects.filter(ad=ad, buyer=buyer).count(), 1)
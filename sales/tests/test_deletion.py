@@ -0,0 +1,115 @@
+import shutil
+import tempfile
+from io import StringIO
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.deletion import process_deletions, schedule_user_deletion
+from sales.models import (
+    Ad, AdImage, Category, Conversation, DeletionRequest, Message, PendingFileDeletion
+)
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BULK_DELETE_CHUNK_SIZE=2)
+class BulkDeletionTests(BufferResetTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user(username='owner', password='password')
+        self.buyers = [User.objects.create_user(username=f'buyer{number}', password='password') for number in range(3)]
+        category = Category.objects.create(name='Vehicles')
+        self.ad = Ad.objects.create(
+            title='Bike', description='Bike', user=self.owner, category=category,
+            location='Chennai', price=100, contact_info='o@example.com'
+        )
+        self.other_ad = Ad.objects.create(
+            title='Car', description='Car', user=self.buyers[0], category=category,
+            location='Chennai', price=1000, contact_info='b@example.com'
+        )
+        for buyer in self.buyers:
+            conversation = Conversation.objects.create(ad=self.ad, buyer=buyer)
+            for number in range(3):
+                Message.objects.create(conversation=conversation, sender=buyer, content=f'Hi {number}')
+        self.images = [
+            AdImage.objects.create(ad=self.ad, image=SimpleUploadedFile(f'bike{number}.jpg', b'image'))
+            for number in range(3)
+        ]
+
+    def test_delete_view_hides_ad_and_defers_the_work(self):
+        self.client.force_login(self.owner)
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('ad_delete', args=[self.ad.pk]))
+        self.assertRedirects(response, reverse('ad_list'))
+        self.ad.refresh_from_db()
+        self.assertFalse(self.ad.is_active)
+        self.assertEqual(Message.objects.count(), 9)
+        self.assertTrue(DeletionRequest.objects.filter(kind=DeletionRequest.AD, object_id=self.ad.pk).exists())
+
+    def test_owner_cannot_edit_ad_pending_deletion(self):
+        self.client.force_login(self.owner)
+        self.client.post(reverse('ad_delete', args=[self.ad.pk]))
+        self.assertEqual(self.client.get(reverse('ad_update', args=[self.ad.pk])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('ad_image_upload', args=[self.ad.pk])).status_code, 404)
+        self.assertEqual(self.client.post(
+            reverse('ad_image_reorder', args=[self.ad.pk]), '{"order": []}', content_type='application/json'
+        ).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('seller_ad_dashboard')), 'Bike')
+
+    def test_process_deletions_removes_ad_dependents_and_files(self):
+        self.client.force_login(self.owner)
+        self.client.post(reverse('ad_delete', args=[self.ad.pk]))
+        names = [image.image.name for image in self.images]
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+
+        self.assertEqual(process_deletions(), (1, 0, 3))
+        self.assertFalse(Ad.objects.filter(pk=self.ad.pk).exists())
+        self.assertFalse(Conversation.objects.exists())
+        self.assertFalse(Message.objects.exists())
+        self.assertFalse(AdImage.objects.exists())
+        self.assertFalse(PendingFileDeletion.objects.exists())
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+        self.assertTrue(Ad.objects.filter(pk=self.other_ad.pk).exists())
+
+    def test_user_deletion(self):
+        buyer = self.buyers[0]
+        conversation = Conversation.objects.create(ad=self.other_ad, buyer=self.buyers[1])
+        schedule_user_deletion(buyer)
+        buyer.refresh_from_db()
+        self.other_ad.refresh_from_db()
+        self.assertFalse(buyer.is_active)
+        self.assertFalse(self.other_ad.is_active)
+
+        out = StringIO()
+        call_command('process_deletions', stdout=out)
+        self.assertIn('Deleted 0 ads and 1 users, removed 0 files.', out.getvalue())
+        self.assertFalse(User.objects.filter(pk=buyer.pk).exists())
+        self.assertFalse(Ad.objects.filter(pk=self.other_ad.pk).exists())
+        self.assertFalse(Conversation.objects.filter(pk=conversation.pk).exists())
+        self.assertEqual(Conversation.objects.filter(ad=self.ad).count(), 2)
+        self.assertEqual(Message.objects.count(), 6)
+        self.assertEqual(AdImage.objects.count(), 3)
+
+    def test_admin_actions_schedule_deletion(self):
+        admin = User.objects.create_superuser(username='admin', password='password', email='a@example.com')
+        self.client.force_login(admin)
+        self.client.post(reverse('admin:sales_ad_changelist'), {
+            'action': 'delete_in_background', '_selected_action': [self.ad.pk],
+        })
+        self.client.post(reverse('admin:sales_customuser_changelist'), {
+            'action': 'delete_in_background', '_selected_action': [self.buyers[2].pk],
+        })
+        self.assertEqual(
+            set(DeletionRequest.objects.values_list('kind', 'object_id')),
+            {(DeletionRequest.AD, self.ad.pk), (DeletionRequest.USER, self.buyers[2].pk)},
+        )
@@ -0,0 +1,112 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.duplicates import get_signature, estimate_similarity, scan_duplicates
+from sales.models import Ad, AdFingerprint, AdFingerprintBand, Category
+
+User = get_user_model()
+
+DESCRIPTION = (
+    "Well maintained Honda Activa scooter, single owner, all service records available, "
+    "new tyres fitted last month, insurance valid until next year, no accidents"
+)
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='password')
+        self.category = Category.objects.create(name='Vehicles')
+        self.original = self._create_ad('Honda Activa for sale', DESCRIPTION)
+
+    def _create_ad(self, title, description):
+        return Ad.objects.create(
+            title=title, description=description, user=self.user, category=self.category,
+            location='Chennai', price=30000, contact_info='s@example.com'
+        )
+
+    def test_similarity_estimate(self):
+        signature = get_signature('Honda Activa for sale', DESCRIPTION)
+        self.assertEqual(estimate_similarity(signature, signature), 1.0)
+        reworded = get_signature('Honda Activa for sale', DESCRIPTION + ', urgent sale')
+        self.assertGreater(estimate_similarity(signature, reworded), 0.7)
+        unrelated = get_signature('Gaming laptop', 'Fast laptop with a big screen and backlit keyboard')
+        self.assertLess(estimate_similarity(signature, unrelated), 0.2)
+
+    def test_new_ads_are_fingerprinted_and_checked(self):
+        self.assertTrue(AdFingerprint.objects.filter(ad=self.original).exists())
+        self.assertEqual(AdFingerprintBand.objects.filter(ad=self.original).count(), 16)
+
+        repost = self._create_ad('Honda Activa for sale', DESCRIPTION + ', urgent sale')
+        repost.refresh_from_db()
+        self.assertEqual(repost.duplicate_of, self.original)
+
+        other = self._create_ad('Gaming laptop', 'Fast laptop with a big screen and backlit keyboard')
+        other.refresh_from_db()
+        self.assertIsNone(other.duplicate_of)
+
+    def test_reposts_of_reposts_point_at_the_oldest_ad(self):
+        first_repost = self._create_ad('Honda Activa for sale', DESCRIPTION + ', urgent sale')
+        second_repost = self._create_ad('Honda Activa for sale', DESCRIPTION + ', urgent sale, call now')
+        second_repost.refresh_from_db()
+        self.assertEqual(second_repost.duplicate_of_id, self.original.pk)
+        self.assertEqual(set(self.original.duplicates.all()), {first_repost, second_repost})
+
+    def test_editing_away_the_duplicate_text_clears_the_flag(self):
+        repost = self._create_ad('Honda Activa for sale', DESCRIPTION)
+        repost.title = 'Mountain bike'
+        repost.description = 'Hardtail mountain bike with disc brakes'
+        repost.save()
+        repost.refresh_from_db()
+        self.assertIsNone(repost.duplicate_of)
+
+    def test_full_scan_rebuilds_clusters(self):
+        repost = self._create_ad('Honda Activa for sale', DESCRIPTION)
+        Ad.objects.update(duplicate_of=None)
+        AdFingerprint.objects.all().delete()
+        AdFingerprintBand.objects.all().delete()
+        self._create_ad('Gaming laptop', 'Fast laptop with a big screen and backlit keyboard')
+
+        out = StringIO()
+        call_command('find_duplicate_ads', '--batch-size', '2', stdout=out)
+        self.assertIn('Found 1 duplicate ads in 1 clusters.', out.getvalue())
+        repost.refresh_from_db()
+        self.assertEqual(repost.duplicate_of, self.original)
+        self.assertEqual(AdFingerprint.objects.count(), 3)
+        self.assertEqual(scan_duplicates(), (1, 1))
+
+
+class DuplicateAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='password', email='a@example.com')
+        self.client.force_login(self.admin)
+        category = Category.objects.create(name='Vehicles')
+        self.original, self.repost = [
+            Ad.objects.create(
+                title='Honda Activa for sale', description=DESCRIPTION, user=self.admin, category=category,
+                location='Chennai', price=30000, contact_info='a@example.com'
+            )
+            for _ in range(2)
+        ]
+
+    def test_review_and_deactivate_duplicates(self):
+        changelist = reverse('admin:sales_ad_changelist')
+        response = self.client.post(changelist, {
+            'action': 'review_duplicate_clusters', '_selected_action': [self.repost.pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['clusters'], [[self.original, self.repost]])
+
+        response = self.client.post(changelist, {
+            'action': 'deactivate_duplicates', '_selected_action': [self.original.pk, self.repost.pk],
+        })
+        self.assertRedirects(response, changelist)
+        self.original.refresh_from_db()
+        self.repost.refresh_from_db()
+        self.assertTrue(self.original.is_active)
+        self.assertFalse(self.repost.is_active)
+
+    def test_duplicate_filter(self):
+        response = self.client.get(reverse('admin:sales_ad_changelist'), {'duplicates': 'duplicate'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.repost])
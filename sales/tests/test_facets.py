@@ -0,0 +1,79 @@
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.facets import get_facets, get_filter_signature
+from sales.filters import get_filter_params
+from sales.models import Ad, Category
+
+User = get_user_model()
+
+
+class AdFacetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.electronics = Category.objects.create(name='Electronics')
+        self.vehicles = Category.objects.create(name='Vehicles')
+        self.empty = Category.objects.create(name='Books')
+        for title, category, location, price in [
+            ('MacBook', self.electronics, 'New York', 1500),
+            ('iPhone', self.electronics, 'Los Angeles', 700),
+            ('Cable', self.electronics, 'New York', 100),
+            ('Honda Civic', self.vehicles, 'New York', 22000),
+        ]:
+            Ad.objects.create(
+                title=title, description=title, user=self.user, category=category,
+                location=location, price=price, contact_info='t@example.com'
+            )
+        Ad.objects.create(
+            title='Inactive', description='Inactive', user=self.user, category=self.vehicles,
+            location='Chicago', price=50, contact_info='t@example.com', is_active=False
+        )
+
+    def _category_counts(self, facets):
+        return {category['name']: category['count'] for category in facets['categories']}
+
+    def test_unfiltered_facets(self):
+        facets = get_facets(QueryDict())
+        self.assertEqual(self._category_counts(facets), {'Electronics': 3, 'Vehicles': 1, 'Books': 0})
+        self.assertEqual(facets['locations'][0], {'location': 'New York', 'count': 3})
+        buckets = {(b['minimum'], b['maximum']): b['count'] for b in facets['price_ranges']}
+        self.assertEqual(buckets[(100, 500)], 1)
+        self.assertEqual(buckets[(500, 1000)], 1)
+        self.assertEqual(buckets[(1000, 5000)], 1)
+        self.assertEqual(buckets[(10000, None)], 1)
+
+    def test_facet_ignores_its_own_filter(self):
+        facets = get_facets(QueryDict(f'category={self.electronics.pk}&location=New York'))
+        # Category counts respect the location filter but not the category filter.
+        self.assertEqual(self._category_counts(facets), {'Electronics': 2, 'Vehicles': 1, 'Books': 0})
+        # Location counts respect the category filter but not the location filter.
+        self.assertEqual(
+            {row['location']: row['count'] for row in facets['locations']},
+            {'New York': 2, 'Los Angeles': 1}
+        )
+
+    def test_facets_are_cached_by_signature(self):
+        data = QueryDict('location=New York&page=2')
+        get_facets(data)
+        with self.assertNumQueries(0):
+            get_facets(QueryDict('page=3&location=New York'))
+
+    def test_saving_an_ad_invalidates_cached_facets(self):
+        get_facets(QueryDict())
+        Ad.objects.create(
+            title='Book', description='Book', user=self.user, category=self.empty,
+            location='Boston', price=10, contact_info='t@example.com'
+        )
+        self.assertEqual(self._category_counts(get_facets(QueryDict()))['Books'], 1)
+
+    def test_filter_params_ignore_unrelated_and_empty_values(self):
+        params = get_filter_params(QueryDict('page=2&location=&category=3'))
+        self.assertEqual(params, {'category': '3'})
+        self.assertEqual(get_filter_signature(params), get_filter_signature({'category': '3'}))
+
+    def test_ad_list_shows_facet_counts(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('ad_list'))
+        self.assertContains(response, 'Electronics (3)')
+        self.assertContains(response, 'New York (3)')
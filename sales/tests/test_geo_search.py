@@ -0,0 +1,110 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.geo import (
+    geocode, encode_geohash, bounding_box, covering_geohashes, haversine_km, parse_point
+)
+from sales.models import Ad, Category
+
+User = get_user_model()
+
+CHENNAI = (13.0827, 80.2707)
+
+
+class GeoHelperTests(TestCase):
+    def test_geocode_matches_names_and_aliases(self):
+        self.assertEqual(geocode('Chennai'), CHENNAI)
+        self.assertEqual(geocode('  madras '), CHENNAI)
+        self.assertEqual(geocode('Chennai, Tamil Nadu'), CHENNAI)
+        self.assertIsNone(geocode('Atlantis'))
+        self.assertIsNone(geocode(''))
+
+    def test_encode_geohash(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(encode_geohash(57.64911, 10.40744, precision=5), 'u4pru')
+
+    def test_haversine(self):
+        bengaluru = geocode('Bengaluru')
+        distance, = haversine_km(*CHENNAI, [bengaluru])
+        self.assertAlmostEqual(distance, 290, delta=5)
+
+    def test_covering_geohashes_cover_the_bounding_box(self):
+        box = bounding_box(*CHENNAI, 25)
+        prefixes = covering_geohashes(*box)
+        self.assertLessEqual(len(prefixes), 16)
+        min_lat, max_lat, min_lon, max_lon = box
+        for i in range(11):
+            for j in range(11):
+                latitude = min_lat + (max_lat - min_lat) * i / 10
+                longitude = min_lon + (max_lon - min_lon) * j / 10
+                geohash = encode_geohash(latitude, longitude)
+                self.assertTrue(any(geohash.startswith(prefix) for prefix in prefixes))
+
+    def test_parse_point(self):
+        self.assertEqual(parse_point('13.08,80.27'), (13.08, 80.27))
+        self.assertIsNone(parse_point('13.08'))
+        self.assertIsNone(parse_point('north,south'))
+        self.assertIsNone(parse_point('95,80'))
+
+
+class RadiusSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='password')
+        self.category = Category.objects.create(name='General')
+        self.ads = {
+            location: Ad.objects.create(
+                title=f'Ad in {location}', description='...', user=self.user, category=self.category,
+                location=location, contact_info='t@example.com'
+            )
+            for location in ['Chennai', 'Tambaram', 'Kanchipuram', 'Bengaluru', 'Somewhere Else']
+        }
+        self.client.force_login(self.user)
+
+    def _search(self, **params):
+        response = self.client.get(reverse('ad_list'), params)
+        return [ad.location for ad in response.context['ads']]
+
+    def test_ads_are_geocoded_on_save(self):
+        ad = self.ads['Chennai']
+        self.assertEqual((ad.latitude, ad.longitude), CHENNAI)
+        self.assertEqual(ad.geohash, encode_geohash(*CHENNAI))
+        self.assertEqual(self.ads['Somewhere Else'].geohash, '')
+
+        ad.location = 'Bengaluru'
+        ad.save()
+        self.assertEqual(ad.geohash, encode_geohash(*geocode('Bengaluru')))
+
+    def test_near_returns_ads_within_radius_sorted_by_distance(self):
+        self.assertEqual(self._search(near='13.0827,80.2707', radius=30), ['Chennai', 'Tambaram'])
+        self.assertEqual(
+            self._search(near='13.0827,80.2707', radius=100),
+            ['Chennai', 'Tambaram', 'Kanchipuram']
+        )
+
+    def test_near_uses_default_radius(self):
+        self.assertEqual(self._search(near='13.0827,80.2707'), ['Chennai'])
+
+    def test_near_annotates_distance(self):
+        response = self.client.get(reverse('ad_list'), {'near': '12.9249,80.1000', 'radius': 50})
+        distances = {ad.location: ad.distance_km for ad in response.context['ads']}
+        self.assertEqual(distances['Tambaram'], 0.0)
+        self.assertAlmostEqual(distances['Chennai'], 25, delta=2)
+        self.assertContains(response, 'km away')
+
+    def test_near_combines_with_other_filters(self):
+        self.assertEqual(
+            self._search(near='13.0827,80.2707', radius=100, keyword_to_search='Tambaram'),
+            ['Tambaram']
+        )
+
+    def test_invalid_near_returns_no_ads(self):
+        self.assertEqual(self._search(near='not-a-point'), [])
+
+    def test_geocode_ads_command(self):
+        Ad.objects.update(latitude=None, longitude=None, geohash='')
+        out = StringIO()
+        call_command('geocode_ads', batch_size=2, stdout=out)
+        self.assertIn('Geocoded 4 of 5 ads.', out.getvalue())
+        self.assertEqual(Ad.objects.get(pk=self.ads['Chennai'].pk).geohash, encode_geohash(*CHENNAI))
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from sales.models import Ad, Category, Conversation, Message
+from sales.inbox import get_inbox_page, encode_cursor, decode_cursor
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+
+
+class InboxPaginationTests(BufferResetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = User.objects.create_user(username="seller", password="pass123")
+        self.category = Category.objects.create(name="Test Category")
+        self.own_ad = Ad.objects.create(
+            title="Seller Ad", user=self.seller, category=self.category,
+            description="Own ad", location="X", contact_info="s@example.com"
+        )
+        self.other_ad = Ad.objects.create(
+            title="Other Ad", user=self.seller, category=self.category,
+            description="Second ad", location="X", contact_info="s@example.com"
+        )
+
+        now = timezone.now()
+        self.conversations = []
+        for i in range(5):
+            buyer = User.objects.create_user(username=f"buyer{i}", password="pass123")
+            ad = self.own_ad if i % 2 == 0 else self.other_ad
+            conversation = Conversation.objects.create(ad=ad, buyer=buyer)
+            Conversation.objects.filter(pk=conversation.pk).update(created_at=now - timedelta(minutes=i))
+            self.conversations.append(conversation)
+
+        # The seller is also a buyer on somebody else's ad.
+        self.other_seller = User.objects.create_user(username="other_seller", password="pass123")
+        foreign_ad = Ad.objects.create(
+            title="Foreign Ad", user=self.other_seller, category=self.category,
+            description="Foreign", location="Y", contact_info="o@example.com"
+        )
+        self.buying_conversation = Conversation.objects.create(ad=foreign_ad, buyer=self.seller)
+        Conversation.objects.filter(pk=self.buying_conversation.pk).update(created_at=now - timedelta(minutes=2, seconds=30))
+
+    def _collect_all_pages(self, **kwargs):
+        seen, cursor = [], None
+        while True:
+            page = get_inbox_page(self.seller, cursor=cursor, page_size=2, **kwargs)
+            seen.extend(conversation.pk for conversation in page.conversations)
+            if not page.next_cursor:
+                return seen
+            cursor = page.next_cursor
+
+    def test_pages_cover_both_sides_in_order_without_duplicates(self):
+        expected = [c.pk for c in Conversation.objects.filter(pk__in=[
+            *(c.pk for c in self.conversations), self.buying_conversation.pk
+        ]).order_by('-created_at', '-pk')]
+        self.assertEqual(self._collect_all_pages(), expected)
+
+    def test_ad_id_filter(self):
+        pks = self._collect_all_pages(ad_id=self.own_ad.pk)
+        self.assertEqual(set(pks), {c.pk for c in self.conversations if c.ad_id == self.own_ad.pk})
+
+    def test_unread_only(self):
+        Message.objects.create(conversation=self.conversations[3], sender=self.conversations[3].buyer, content="Hi")
+        Message.objects.create(conversation=self.conversations[1], sender=self.seller, content="Mine")
+        self.assertEqual(self._collect_all_pages(unread_only=True), [self.conversations[3].pk])
+
+    def test_page_annotations(self):
+        Message.objects.create(conversation=self.conversations[0], sender=self.seller, content="Latest reply")
+        page = get_inbox_page(self.seller, page_size=1)
+        conversation = page.conversations[0]
+        self.assertEqual(conversation.other_username, "buyer0")
+        self.assertEqual(conversation.last_message_content, "Latest reply")
+
+    def test_cursor_round_trip_and_malformed_cursor(self):
+        conversation = self.conversations[0]
+        conversation.refresh_from_db()
+        self.assertEqual(decode_cursor(encode_cursor(conversation)), (conversation.created_at, conversation.pk))
+        self.assertIsNone(decode_cursor("not-a-cursor"))
+        page = get_inbox_page(self.seller, cursor="not-a-cursor", page_size=2)
+        self.assertEqual(page.conversations[0].pk, self.conversations[0].pk)
+
+    def test_list_view_paginates_with_constant_queries(self):
+        self.client.force_login(self.seller)
+        response = self.client.get(reverse("conversation_list"))
+        # The session and user come from the cache after the first request.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("conversation_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context["next_cursor"])
+        self.assertEqual(len(response.context["conversations"]), 6)
+
+    def test_ad_conversation_list_only_shows_owner_side(self):
+        self.client.force_login(self.seller)
+        response = self.client.get(reverse("conversation_list_for_ad", args=[self.own_ad.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {c.pk for c in response.context["conversations"]},
+            {c.pk for c in self.conversations if c.ad_id == self.own_ad.pk}
+        )
+
+    def test_ad_conversation_list_hidden_from_non_owner(self):
+        self.client.force_login(self.other_seller)
+        response = self.client.get(reverse("conversation_list_for_ad", args=[self.own_ad.pk]))
+        self.assertEqual(len(response.context["conversations"]), 0)
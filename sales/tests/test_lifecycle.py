@@ -0,0 +1,172 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from sales.deletion import schedule_ad_deletion, schedule_user_deletion
+from sales.lifecycle import archive_ads, expire_ads, restore_ad
+from sales.models import Ad, ArchivedAd, Category, Conversation, Message
+
+User = get_user_model()
+
+
+@override_settings(AD_EXPIRY_DAYS=30, AD_ARCHIVE_AFTER_DAYS=90)
+class AdLifecycleTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='password')
+        self.buyer = User.objects.create_user(username='buyer', password='password')
+        self.category = Category.objects.create(name='Events')
+        self.ad = self._create_ad('Old bike')
+        self.fresh_ad = self._create_ad('New bike')
+        self.now = timezone.now()
+
+    def _create_ad(self, title, **kwargs):
+        return Ad.objects.create(
+            title=title, description=title, user=self.owner, category=self.category,
+            location='Chennai', price=100, contact_info='o@example.com', **kwargs
+        )
+
+    def test_new_ads_get_an_expiry(self):
+        self.assertAlmostEqual(self.ad.expires_at, timezone.now() + timedelta(days=30), delta=timedelta(minutes=1))
+
+    def test_expire_ads_in_batches(self):
+        Ad.objects.filter(pk=self.ad.pk).update(expires_at=self.now - timedelta(days=1))
+        event = self._create_ad('Concert', event_date=timezone.localdate() - timedelta(days=1))
+        more = [self._create_ad(f'Stale {number}') for number in range(3)]
+        Ad.objects.filter(pk__in=[ad.pk for ad in more]).update(expires_at=self.now - timedelta(hours=1))
+
+        self.assertEqual(expire_ads(batch_size=2, now=self.now), 5)
+        self.assertEqual(
+            set(Ad.objects.filter(is_active=True).values_list('pk', flat=True)), {self.fresh_ad.pk}
+        )
+        event.refresh_from_db()
+        self.assertEqual(event.updated_at, self.now)
+        self.assertEqual(expire_ads(now=self.now), 0)
+
+    def test_archive_and_restore_keep_conversations(self):
+        conversation = Conversation.objects.create(ad=self.ad, buyer=self.buyer)
+        message = Message.objects.create(conversation=conversation, sender=self.buyer, content='Still available?')
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False, updated_at=self.now - timedelta(days=91))
+
+        self.assertEqual(archive_ads(now=self.now), 1)
+        self.assertFalse(Ad.objects.filter(pk=self.ad.pk).exists())
+        self.assertFalse(Message.objects.filter(pk=message.pk).exists())
+        archived_ad = ArchivedAd.objects.get()
+        self.assertEqual((archived_ad.original_id, archived_ad.title), (self.ad.pk, 'Old bike'))
+
+        restored = restore_ad(archived_ad)
+        self.assertEqual(restored.pk, self.ad.pk)
+        self.assertTrue(restored.is_active)
+        self.assertGreater(restored.expires_at, self.now)
+        # The JSON archive keeps timestamps to the millisecond.
+        self.assertAlmostEqual(
+            Ad.objects.get(pk=self.ad.pk).created_at, self.ad.created_at, delta=timedelta(milliseconds=1)
+        )
+        restored_message = Message.objects.get(pk=message.pk)
+        self.assertEqual(restored_message.conversation_id, conversation.pk)
+        self.assertEqual(restored_message.content, 'Still available?')
+        self.assertFalse(ArchivedAd.objects.exists())
+
+    def test_archive_queries_do_not_grow_with_batch(self):
+        def archive_queries(count):
+            ads = [self._create_ad(f'Dead {number}') for number in range(count)]
+            for ad in ads:
+                conversation = Conversation.objects.create(ad=ad, buyer=self.buyer)
+                Message.objects.create(conversation=conversation, sender=self.buyer, content='Hi')
+            Ad.objects.filter(pk__in=[ad.pk for ad in ads]).update(
+                is_active=False, updated_at=self.now - timedelta(days=91)
+            )
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(archive_ads(now=self.now), count)
+            return len(context.captured_queries)
+
+        self.assertEqual(archive_queries(1), archive_queries(3))
+
+    @override_settings(BULK_DELETE_CHUNK_SIZE=2)
+    def test_archive_deletes_dependents_in_chunks(self):
+        conversation = Conversation.objects.create(ad=self.ad, buyer=self.buyer)
+        for number in range(5):
+            Message.objects.create(conversation=conversation, sender=self.buyer, content=f'Hi {number}')
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False, updated_at=self.now - timedelta(days=91))
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(archive_ads(now=self.now), 1)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertEqual(sum(sql.startswith('DELETE FROM "sales_message"') for sql in queries), 3)
+        self.assertFalse(Message.objects.exists())
+        self.assertEqual(len(restore_ad(ArchivedAd.objects.get()).conversations.get().messages.all()), 5)
+
+    def test_recently_inactive_ads_are_not_archived(self):
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False, updated_at=self.now - timedelta(days=10))
+        self.assertEqual(archive_ads(now=self.now), 0)
+
+    def test_restore_drops_conversations_of_deleted_users(self):
+        Conversation.objects.create(ad=self.ad, buyer=self.buyer)
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False, updated_at=self.now - timedelta(days=91))
+        archive_ads(now=self.now)
+        self.buyer.delete()
+        restore_ad(ArchivedAd.objects.get())
+        self.assertFalse(Conversation.objects.exists())
+
+    def test_owner_can_list_and_restore_archived_ads(self):
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False, updated_at=self.now - timedelta(days=91))
+        archive_ads(now=self.now)
+        archived_ad = ArchivedAd.objects.get()
+
+        self.client.force_login(self.buyer)
+        response = self.client.post(reverse('archived_ad_restore', args=[archived_ad.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('archived_ad_list'))
+        self.assertContains(response, 'Old bike')
+        response = self.client.post(reverse('archived_ad_restore', args=[archived_ad.pk]))
+        self.assertRedirects(response, reverse('ad_detail', args=[self.ad.pk]))
+
+    def test_past_event_ad_is_not_restored(self):
+        event = self._create_ad('Concert', event_date=timezone.localdate() - timedelta(days=1))
+        Ad.objects.filter(pk=event.pk).update(is_active=False, updated_at=self.now - timedelta(days=91))
+        archive_ads(now=self.now)
+        archived_ad = ArchivedAd.objects.get()
+
+        with self.assertRaises(ValidationError):
+            restore_ad(archived_ad)
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('archived_ad_restore', args=[archived_ad.pk]), follow=True)
+        self.assertRedirects(response, reverse('archived_ad_list'))
+        self.assertContains(response, 'event of this ad is over')
+        self.assertFalse(Ad.objects.filter(pk=event.pk).exists())
+        self.assertTrue(ArchivedAd.objects.filter(pk=archived_ad.pk).exists())
+
+    def test_ads_pending_deletion_are_not_archived_or_restored(self):
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False, updated_at=self.now - timedelta(days=91))
+        schedule_ad_deletion(self.ad)
+        self.assertEqual(archive_ads(now=self.now), 0)
+
+        Ad.objects.filter(pk=self.fresh_ad.pk).update(is_active=False, updated_at=self.now - timedelta(days=91))
+        archive_ads(now=self.now)
+        schedule_user_deletion(self.owner)
+        with self.assertRaises(ValidationError):
+            restore_ad(ArchivedAd.objects.get())
+        self.assertFalse(Ad.objects.filter(pk=self.fresh_ad.pk).exists())
+
+    def test_migration_backfills_expiry_from_creation(self):
+        Ad.objects.filter(pk=self.ad.pk).update(expires_at=None, created_at=self.now - timedelta(days=40))
+        migration = import_module('sales.migrations.0016_backfill_ad_expires_at')
+        migration.backfill_expires_at(apps, None)
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.expires_at, self.now - timedelta(days=10))
+        self.assertEqual(expire_ads(now=self.now), 1)
+
+    def test_management_command(self):
+        Ad.objects.filter(pk=self.ad.pk).update(expires_at=timezone.now() - timedelta(days=1))
+        out = StringIO()
+        call_command('expire_ads', stdout=out)
+        self.assertIn('Expired 1 ads, archived 0 ads.', out.getvalue())
@@ -0,0 +1,56 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+from django.contrib.auth import get_user_model
+from sales.load_testing import Sample, get_scenario_data, prepare_users, summarize
+from sales.models import Ad, Category, Conversation
+
+User = get_user_model()
+
+
+class SummarizeTests(SimpleTestCase):
+    def test_summarize(self):
+        samples = [Sample('ad_list', 200, latency / 1000) for latency in range(1, 101)]
+        samples += [Sample('poll_messages', 500, 0.01), Sample('poll_messages', 0, 0.02)]
+        rows = {row['name']: row for row in summarize(samples, elapsed=10)}
+        self.assertEqual(rows['ad_list']['requests'], 100)
+        self.assertEqual(rows['ad_list']['throughput'], 10)
+        self.assertEqual(rows['ad_list']['error_rate'], 0)
+        self.assertAlmostEqual(rows['ad_list']['p50'], 50)
+        self.assertAlmostEqual(rows['ad_list']['p99'], 99)
+        self.assertEqual(rows['poll_messages']['error_rate'], 1)
+        self.assertEqual(rows['total']['requests'], 102)
+
+
+# The simulated users poll far faster than the chat page's rate limit allows.
+@override_settings(RATE_LIMITS={})
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        seller = User.objects.create_user(username='seller', password='password')
+        category = Category.objects.create(name='Vehicles')
+        for title in ('Mountain bike', 'Road bicycle', 'Family car'):
+            Ad.objects.create(
+                title=title, description=title, user=seller, category=category,
+                location='Chennai', price=100, contact_info='s@example.com'
+            )
+
+    def test_prepare_users_is_idempotent(self):
+        self.assertEqual(len(prepare_users(3)), 3)
+        self.assertEqual(len(prepare_users(3)), 3)
+        self.assertEqual(User.objects.filter(username__startswith='loadtest-').count(), 3)
+        data = get_scenario_data()
+        self.assertEqual(len(data.ad_ids), 3)
+        self.assertIn('Mountain', data.keywords)
+
+    def test_load_test_against_live_server(self):
+        out = StringIO()
+        call_command(
+            'load_test', '--users', '3', '--processes', '2', '--duration', '2', '--think-time', '0.05',
+            '--poll-interval', '0.1', '--url', self.live_server_url, stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('Running 3 users in 2 processes', output)
+        total = next(line for line in output.splitlines() if line.startswith('total'))
+        self.assertGreater(int(total.split()[1]), 0)
+        self.assertIn(' 0.0%', total)
+        self.assertTrue(Conversation.objects.exists())
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sales.media import RangeNotSatisfiable, parse_range
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SERVE_MODE='python')
+class MediaServingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('ad_images/photo.jpg', 'blobs/ab/abcd/photo.jpg'):
+            os.makedirs(os.path.join(MEDIA_ROOT, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(MEDIA_ROOT, name), 'wb') as file:
+                file.write(b'0123456789')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def _get(self, path, **headers):
+        return self.client.get(reverse('media', args=[path]), headers=headers)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=2-4', 10), (2, 4))
+        self.assertEqual(parse_range('bytes=5-', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=8-100', 10), (8, 9))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range(None, 10))
+        for header in ('bytes=10-', 'bytes=4-2', 'bytes=-0'):
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 10)
+
+    def test_full_and_partial_responses(self):
+        response = self._get('ad_images/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+        response = self._get('ad_images/photo.jpg', range='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(response['Content-Length'], '3')
+
+        response = self._get('ad_images/photo.jpg', range='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+        response = self._get('ad_images/photo.jpg', if_modified_since=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_blobs_are_immutable(self):
+        response = self._get('blobs/ab/abcd/photo.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self._get('ad_images/missing.jpg').status_code, 404)
+        self.assertEqual(self._get('ad_images').status_code, 404)
+        self.assertEqual(self._get('../etc/passwd').status_code, 404)
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel', MEDIA_ACCEL_REDIRECT_PREFIX='/internal-media/')
+    def test_x_accel_redirect(self):
+        response = self._get('ad_images/photo.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/internal-media/ad_images/photo.jpg')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SERVE_MODE='sendfile')
+    def test_sendfile(self):
+        response = self._get('ad_images/photo.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(MEDIA_ROOT, 'ad_images', 'photo.jpg'))
+        self.assertEqual(response.content, b'')
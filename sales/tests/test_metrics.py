@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.metrics import Counter, Gauge, Histogram, Registry
+
+User = get_user_model()
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.requests = Counter('requests_total', "Requests.", ('view',), registry=self.registry)
+        self.latency = Histogram('latency_seconds', "Latency.", buckets=(0.1, 1), registry=self.registry)
+        self.workers = Gauge('busy_workers', "Busy workers.", registry=self.registry)
+        self.peak = Gauge('peak', "Peak.", multiprocess_mode='max', registry=self.registry)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_render(self):
+        self.requests.inc('ad_list')
+        self.requests.inc('ad_list', amount=2)
+        self.requests.inc('say "hi"')
+        for value in (0.05, 0.5, 3):
+            self.latency.observe(value)
+        output = self.registry.render()
+        self.assertIn('# TYPE requests_total counter', output)
+        self.assertIn('requests_total{view="ad_list"} 3', output)
+        self.assertIn('requests_total{view="say \\"hi\\""} 1', output)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', output)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', output)
+        self.assertIn('latency_seconds_sum 3.55', output)
+        self.assertIn('latency_seconds_count 3', output)
+        with self.assertRaises(ValueError):
+            self.requests.inc()
+
+    def test_multiprocess_aggregation(self):
+        self.requests.inc('ad_list')
+        self.latency.observe(0.5)
+        self.workers.set(2)
+        self.peak.set(5)
+        self.registry.flush(self.directory, pid=1)
+
+        self.requests.clear()
+        self.latency.clear()
+        self.requests.inc('ad_list', amount=4)
+        self.latency.observe(0.01)
+        self.workers.set(1)
+        self.peak.set(3)
+        output = self.registry.render(self.directory)
+
+        self.assertIn('requests_total{view="ad_list"} 5', output)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('latency_seconds_count 2', output)
+        self.assertIn('busy_workers 3', output)
+        self.assertIn('peak 5', output)
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.user = User.objects.create_user(username='user', password='password')
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    def test_views_are_instrumented(self):
+        self.client.get(reverse('login'))
+        self.client.force_login(self.staff)
+        self.client.get(reverse('ad_list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="ad_list",method="GET",status="200"}', body)
+        self.assertIn('http_requests_total{view="login",method="GET",status="200"}', body)
+        self.assertIn('http_request_duration_seconds_count{view="ad_list"}', body)
+        self.assertIn('http_request_db_queries_bucket{view="ad_list",le="+Inf"}', body)
+        self.assertNotIn('http_request_db_queries_sum{view="ad_list"} 0\n', body)
+        self.assertIn('cache_lookups_total{cache="facets",result=', body)
+
+    def test_endpoint_reads_multiprocess_directory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.client.force_login(self.staff)
+        with override_settings(METRICS_MULTIPROC_DIR=directory):
+            response = self.client.get(reverse('metrics'))
+        self.assertContains(response, '# TYPE http_requests_total counter')
+        self.assertEqual(os.listdir(directory), [f'{os.getpid()}.json'])
@@ -0,0 +1,88 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.models import Ad, Category, Conversation, Message
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+
+
+class ObjectFetchTests(BufferResetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user(username="owner", password="pass123")
+        self.buyer = User.objects.create_user(username="buyer", password="pass123")
+        self.stranger = User.objects.create_user(username="stranger", password="pass123")
+        self.category = Category.objects.create(name="Test Category")
+        self.ad = Ad.objects.create(
+            title="Test Ad", user=self.owner, category=self.category,
+            description="Description", location="X", contact_info="o@example.com"
+        )
+        self.conversation = Conversation.objects.create(ad=self.ad, buyer=self.buyer)
+        Message.objects.create(conversation=self.conversation, sender=self.buyer, content="Hello")
+
+    def _count_table_queries(self, table, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data or {})
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        ]
+        return response, len(selects)
+
+    def test_conversation_detail_fetches_conversation_once(self):
+        self.client.force_login(self.owner)
+        response, count = self._count_table_queries(
+            'sales_conversation', 'get', reverse('conversation_detail', args=[self.conversation.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count, 1)
+
+    def test_conversation_detail_does_not_load_participants_lazily(self):
+        self.client.force_login(self.buyer)
+        response, count = self._count_table_queries(
+            'sales_customuser', 'get', reverse('conversation_detail', args=[self.conversation.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count, 1)  # the authenticated user only
+        self.assertEqual(response.context['other_user'], self.owner)
+
+    def test_conversation_detail_forbidden_for_non_participant(self):
+        self.client.force_login(self.stranger)
+        response = self.client.get(reverse('conversation_detail', args=[self.conversation.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_ad_update_fetches_ad_once(self):
+        self.client.force_login(self.owner)
+        response, count = self._count_table_queries(
+            'sales_ad', 'get', reverse('ad_update', args=[self.ad.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count, 1)
+
+    def test_ad_delete_fetches_ad_once(self):
+        self.client.force_login(self.owner)
+        response, count = self._count_table_queries(
+            'sales_ad', 'get', reverse('ad_delete', args=[self.ad.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count, 1)
+
+    def test_ad_update_forbidden_for_non_owner(self):
+        self.client.force_login(self.stranger)
+        response = self.client.get(reverse('ad_update', args=[self.ad.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_messages_json_checks_participant_by_id(self):
+        self.client.force_login(self.buyer)
+        response, count = self._count_table_queries(
+            'sales_customuser', 'get', reverse('conversation_messages_json', args=[self.conversation.pk])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count, 1)
+
+    def test_for_participant_queryset(self):
+        self.assertEqual(list(Conversation.objects.for_participant(self.owner)), [self.conversation])
+        self.assertEqual(list(Conversation.objects.for_participant(self.buyer)), [self.conversation])
+        self.assertEqual(list(Conversation.objects.for_participant(self.stranger)), [])
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.profiling import iter_profiles
+
+User = get_user_model()
+PROFILING_DIR = tempfile.mkdtemp()
+
+
+@override_settings(PROFILING_DIR=PROFILING_DIR, PROFILING_SAMPLE_RATE=0)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = PROFILING_DIR
+        self.addCleanup(shutil.rmtree, PROFILING_DIR, True)
+        self.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+        self.user = User.objects.create_user(username='user', password='password')
+
+    def test_staff_can_profile_a_request(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('dashboard'), {'profile': '1'})
+        self.client.get(reverse('ad_list'), headers={'x-profile': '1'})
+        self.client.get(reverse('ad_list'))
+
+        profiles = list(iter_profiles(self.directory))
+        self.assertEqual([metadata['view'] for _, metadata in profiles], ['dashboard', 'ad_list'])
+        _, metadata = profiles[0]
+        self.assertEqual(metadata['url'], '/dashboard/?profile=1')
+        self.assertEqual(metadata['status'], 200)
+        self.assertGreater(metadata['queries'], 0)
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+    def test_flag_is_ignored_for_other_users(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'), {'profile': '1'})
+        self.assertEqual(list(iter_profiles(self.directory)), [])
+
+    def test_random_sampling(self):
+        self.client.force_login(self.user)
+        with self.settings(PROFILING_SAMPLE_RATE=1):
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(len(list(iter_profiles(self.directory))), 1)
+
+    def test_hotspots_command(self):
+        self.client.force_login(self.staff)
+        for _ in range(2):
+            self.client.get(reverse('dashboard'), {'profile': '1'})
+        self.client.get(reverse('ad_list'), {'profile': '1'})
+
+        out = StringIO()
+        call_command('profile_hotspots', '--view', 'dashboard', '--limit', '5', stdout=out)
+        output = out.getvalue()
+        self.assertIn('2 profiles', output)
+        self.assertIn('Slowest: GET /dashboard/?profile=1', output)
+        self.assertIn('cumulative', output)
+
+        out = StringIO()
+        call_command('profile_hotspots', '--view', 'missing', stdout=out)
+        self.assertIn('No profiles found.', out.getvalue())
@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.models import Ad, Category, Conversation, Message
+from sales.rate_limiting import ConcurrencyLimitMiddleware, take_token
+
+User = get_user_model()
+
+
+@override_settings(RATE_LIMITS={'send_message': (60, 2), 'poll_messages': (60, 3)})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user(username='seller', password='password', email='s@example.com')
+        self.buyer = User.objects.create_user(username='buyer', password='password', email='b@example.com')
+        ad = Ad.objects.create(
+            title='Bike', description='Bike', user=self.seller, category=Category.objects.create(name='Vehicles'),
+            location='Chennai', price=100, contact_info='s@example.com'
+        )
+        self.conversation = Conversation.objects.create(ad=ad, buyer=self.buyer)
+        Message.objects.create(conversation=self.conversation, sender=self.buyer, content='Hi')
+        self.poll_url = reverse('conversation_messages_json', args=[self.conversation.pk])
+        self.send_url = reverse('send_message', args=[self.conversation.pk])
+        self.client.login(username='buyer', password='password')
+
+    def test_polling_past_the_burst_is_rejected(self):
+        statuses = [self.client.get(self.poll_url).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_rejection_carries_retry_after(self):
+        for _ in range(3):
+            self.client.get(self.poll_url)
+        response = self.client.get(self.poll_url)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertIn('error', response.json())
+
+    def test_sending_is_limited_separately_from_polling(self):
+        for _ in range(3):
+            self.client.get(self.poll_url)
+        statuses = [self.client.post(self.send_url, {'content': 'Still there?'}).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(self.conversation.messages.count(), 3)
+
+    def test_budgets_are_per_user(self):
+        for _ in range(4):
+            self.client.get(self.poll_url)
+        self.client.login(username='seller', password='password')
+        self.assertEqual(self.client.get(self.poll_url).status_code, 200)
+
+    def test_bucket_refills_over_time(self):
+        with mock.patch('sales.rate_limiting.time.time', return_value=1000.0):
+            results = [take_token('poll_messages', self.buyer.pk) for _ in range(4)]
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertAlmostEqual(results[-1][1], 1.0)
+        with mock.patch('sales.rate_limiting.time.time', return_value=1001.5):
+            self.assertTrue(take_token('poll_messages', self.buyer.pk)[0])
+            self.assertFalse(take_token('poll_messages', self.buyer.pk)[0])
+
+    def test_unconfigured_scope_is_not_limited(self):
+        self.assertTrue(all(take_token('unknown', self.buyer.pk)[0] for _ in range(100)))
+
+
+class ConcurrencyLimitMiddlewareTests(TestCase):
+    def setUp(self):
+        self.middleware = ConcurrencyLimitMiddleware(lambda request: HttpResponse('ok'))
+        self.factory = RequestFactory()
+        self.poll = self.factory.get(reverse('conversation_messages_json', args=[1]))
+        self.page = self.factory.get(reverse('ad_list'))
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=None)
+    def test_disabled_by_default(self):
+        self.middleware.in_flight = 100
+        self.assertEqual(self.middleware(self.poll).status_code, 200)
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=4, LOAD_SHED_THRESHOLD=0.75, LOAD_SHED_RETRY_AFTER=3)
+    def test_polling_is_shed_first(self):
+        self.middleware.in_flight = 3
+        response = self.middleware(self.poll)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertEqual(self.middleware(self.page).status_code, 200)
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=4, LOAD_SHED_THRESHOLD=0.75)
+    def test_everything_is_shed_at_the_limit(self):
+        self.middleware.in_flight = 4
+        self.assertEqual(self.middleware(self.page).status_code, 503)
+
+    @override_settings(MAX_CONCURRENT_REQUESTS=4)
+    def test_in_flight_count_is_released(self):
+        self.middleware(self.page)
+        self.assertEqual(self.middleware.in_flight, 0)
@@ -0,0 +1,102 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales import buffers, read_receipts
+from sales.models import Ad, Category, Conversation, Message
+
+User = get_user_model()
+
+
+@override_settings(READ_RECEIPT_FLUSH_INTERVAL=60, READ_RECEIPT_MAX_PENDING=500)
+class ReadReceiptTests(TestCase):
+    def setUp(self):
+        read_receipts.clear()
+        self.owner = User.objects.create_user(username="owner", password="pass123")
+        self.buyer = User.objects.create_user(username="buyer", password="pass123")
+        self.category = Category.objects.create(name="Test Category")
+        self.ad = Ad.objects.create(
+            title="Test Ad", user=self.owner, category=self.category,
+            description="Description", location="X", contact_info="o@example.com"
+        )
+        self.conversation = Conversation.objects.create(ad=self.ad, buyer=self.buyer)
+        self.first = Message.objects.create(conversation=self.conversation, sender=self.buyer, content="Hi")
+        self.reply = Message.objects.create(conversation=self.conversation, sender=self.owner, content="Hello")
+        self.second = Message.objects.create(conversation=self.conversation, sender=self.buyer, content="Still there?")
+
+    def tearDown(self):
+        read_receipts.clear()
+
+    def test_conversation_page_load_does_not_write(self):
+        self.client.force_login(self.owner)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('conversation_detail', args=[self.conversation.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(q['sql'].startswith('UPDATE "sales_message"') for q in context.captured_queries))
+        self.assertEqual(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk), self.second.pk)
+        self.assertEqual(Message.objects.filter(read=False).count(), 3)
+
+    def test_watermarks_are_coalesced(self):
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.second.pk)
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.first.pk)
+        self.assertEqual(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk), self.second.pk)
+
+    def test_flush_marks_other_senders_messages_up_to_watermark(self):
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.first.pk)
+        self.assertEqual(read_receipts.flush(), 1)
+        self.assertEqual(
+            set(Message.objects.filter(read=True).values_list('pk', flat=True)),
+            {self.first.pk}
+        )
+        self.assertIsNone(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk))
+
+    @override_settings(READ_RECEIPT_BATCH_SIZE=1)
+    def test_flush_in_batches(self):
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.second.pk)
+        read_receipts.mark_read(self.conversation.pk, self.buyer.pk, self.second.pk)
+        with self.assertNumQueries(2):
+            self.assertEqual(read_receipts.flush(), 3)
+
+    def test_flush_for_one_user_leaves_others_pending(self):
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.second.pk)
+        read_receipts.mark_read(self.conversation.pk, self.buyer.pk, self.second.pk)
+        read_receipts.flush(user_id=self.buyer.pk)
+        self.assertTrue(Message.objects.get(pk=self.reply.pk).read)
+        self.assertFalse(Message.objects.get(pk=self.first.pk).read)
+        self.assertEqual(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk), self.second.pk)
+
+    def test_next_write_flushes_conversation(self):
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.second.pk)
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('send_message', args=[self.conversation.pk]), {'content': 'Yes'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Message.objects.filter(sender=self.buyer, read=False).exists())
+
+    def test_json_poll_records_watermark(self):
+        self.client.force_login(self.owner)
+        self.client.get(reverse('conversation_messages_json', args=[self.conversation.pk]))
+        self.assertEqual(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk), self.second.pk)
+
+    def test_request_finished_flushes_once_interval_elapsed(self):
+        self.client.force_login(self.owner)
+        with override_settings(READ_RECEIPT_FLUSH_INTERVAL=0):
+            self.client.get(reverse('conversation_detail', args=[self.conversation.pk]))
+        self.assertIsNone(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk))
+        self.assertFalse(Message.objects.filter(sender=self.buyer, read=False).exists())
+
+    def test_idle_worker_flushes_due_watermarks(self):
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.second.pk)
+        buffers.flush_due_all()
+        self.assertIsNotNone(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk))
+        with override_settings(READ_RECEIPT_FLUSH_INTERVAL=0):
+            buffers.flush_due_all()
+        self.assertIsNone(read_receipts.pending_watermark(self.conversation.pk, self.owner.pk))
+        self.assertFalse(Message.objects.filter(sender=self.buyer, read=False).exists())
+
+    def test_flush_read_receipts_command(self):
+        read_receipts.mark_read(self.conversation.pk, self.owner.pk, self.second.pk)
+        call_command('flush_read_receipts', stdout=StringIO())
+        self.assertFalse(Message.objects.filter(sender=self.buyer, read=False).exists())
@@ -0,0 +1,80 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from sales.models import Ad, Category, RelatedAd
+from sales.related_ads import compute_related_ads, refresh_related_ads
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+
+
+@override_settings(RELATED_ADS_COUNT=2)
+class RelatedAdsTests(BufferResetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='seller', password='password')
+        self.viewer = User.objects.create_user(username='viewer', password='password')
+        self.vehicles = Category.objects.create(name='Vehicles')
+        self.electronics = Category.objects.create(name='Electronics')
+        self.mountain_bike = self._create_ad('Mountain bike', 'Hardtail mountain bike with disc brakes', self.vehicles, 500)
+        self.road_bike = self._create_ad('Road bike', 'Lightweight road bike, disc brakes', self.vehicles, 700)
+        self.cheap_bike = self._create_ad('Kids bike', 'Small bike for kids', self.vehicles, 20)
+        self.laptop = self._create_ad('Gaming laptop', 'Fast gaming laptop, big screen', self.electronics, 900)
+
+    def _create_ad(self, title, description, category, price):
+        return Ad.objects.create(
+            title=title, description=description, user=self.user, category=category,
+            location='Chennai', price=price, contact_info='s@example.com'
+        )
+
+    def _related_ids(self, ad):
+        return list(RelatedAd.objects.filter(ad=ad).values_list('related_id', flat=True))
+
+    def test_ranks_by_text_category_and_price(self):
+        self.assertEqual(compute_related_ads(), 4)
+        self.assertEqual(self._related_ids(self.mountain_bike), [self.road_bike.pk, self.cheap_bike.pk])
+        # No shared words with any other ad, so nothing is recommended.
+        self.assertEqual(self._related_ids(self.laptop), [])
+
+    def test_detail_view_shows_related_ads_with_one_query(self):
+        compute_related_ads()
+        self.client.force_login(self.viewer)
+        response = self.client.get(self.mountain_bike.get_absolute_url())
+        self.assertEqual(response.context['related_ads'], [self.road_bike, self.cheap_bike])
+        self.assertContains(response, 'Similar listings')
+
+        self.road_bike.is_active = False
+        self.road_bike.save()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.mountain_bike.get_absolute_url())
+        self.assertEqual(response.context['related_ads'], [self.cheap_bike])
+        related_queries = [query for query in context.captured_queries if '"sales_relatedad"' in query['sql']]
+        self.assertEqual(len(related_queries), 1)
+
+    def test_refresh_only_recomputes_affected_ads(self):
+        compute_related_ads()
+        self.assertEqual(refresh_related_ads(), 0)
+
+        new_bike = self._create_ad('Mountain bike frame', 'Mountain bike frame, disc brakes', self.vehicles, 450)
+        processed = refresh_related_ads()
+        self.assertLess(processed, 5)
+        self.assertEqual(self._related_ids(self.mountain_bike)[0], new_bike.pk)
+        self.assertEqual(self._related_ids(new_bike)[0], self.mountain_bike.pk)
+        self.assertEqual(self._related_ids(self.laptop), [])
+
+    def test_deactivated_ads_lose_their_recommendations(self):
+        compute_related_ads()
+        self.mountain_bike.is_active = False
+        self.mountain_bike.save()
+        refresh_related_ads()
+        self.assertEqual(self._related_ids(self.mountain_bike), [])
+        self.assertNotIn(self.mountain_bike.pk, self._related_ids(self.road_bike))
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('compute_related_ads', '--full', stdout=out)
+        self.assertIn('Computed related ads for 4 ads.', out.getvalue())
+        self.assertTrue(RelatedAd.objects.filter(ad=self.road_bike).exists())
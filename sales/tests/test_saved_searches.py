@@ -0,0 +1,146 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.filters import AdFilter
+from sales.models import Ad, Category, SavedSearch, SavedSearchMatch
+from sales.saved_searches import get_candidate_searches, percolate
+
+User = get_user_model()
+
+
+class SavedSearchMatchingTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password')
+        self.buyer = User.objects.create_user(username='buyer', password='password')
+        self.electronics = Category.objects.create(name='Electronics')
+        self.vehicles = Category.objects.create(name='Vehicles')
+
+    def _save_search(self, **params):
+        return SavedSearch.objects.create(user=self.buyer, params=params)
+
+    def _create_ad(self, **kwargs):
+        defaults = dict(
+            title='MacBook Pro 2023', description='Like new laptop.', user=self.seller,
+            category=self.electronics, location='Chennai', price=1500, contact_info='s@example.com'
+        )
+        defaults.update(kwargs)
+        return Ad.objects.create(**defaults)
+
+    def test_index_fields_are_derived_from_params(self):
+        search = self._save_search(
+            keyword_to_search='macbook pro', category=str(self.electronics.pk),
+            minimum_price='1000', maximum_price='2000'
+        )
+        self.assertEqual(search.anchor_term, 'mac')
+        self.assertEqual(search.category_id, self.electronics.pk)
+        self.assertEqual((search.minimum_price, search.maximum_price), (1000, 2000))
+
+    def test_new_ad_is_matched_into_feed(self):
+        matching = self._save_search(keyword_to_search='macbook', maximum_price='2000')
+        self._save_search(keyword_to_search='honda')
+        self._save_search(category=str(self.vehicles.pk))
+        self._save_search(minimum_price='5000')
+        self._save_search(location='Mumbai')
+
+        ad = self._create_ad()
+        self.assertEqual(
+            list(SavedSearchMatch.objects.values_list('saved_search_id', 'ad_id', 'user_id')),
+            [(matching.pk, ad.pk, self.buyer.pk)]
+        )
+
+    def test_candidates_come_from_indexed_columns_only(self):
+        self._save_search(keyword_to_search='honda')
+        self._save_search(category=str(self.vehicles.pk))
+        in_range = self._save_search(maximum_price='2000')
+        location_only = self._save_search(location='Mumbai')
+        ad = self._create_ad()
+        self.assertEqual(set(get_candidate_searches(ad)), {in_range, location_only})
+
+    def test_keyword_matches_inside_words_like_the_filter(self):
+        search = self._save_search(keyword_to_search='book')
+        short = self._save_search(keyword_to_search='Ma')
+        ad = self._create_ad()
+        filtered = AdFilter({'keyword_to_search': 'book'}, queryset=Ad.objects.all()).qs
+        self.assertEqual(list(filtered), [ad])
+        self.assertEqual(
+            set(SavedSearchMatch.objects.filter(ad=ad).values_list('saved_search_id', flat=True)), {search.pk, short.pk}
+        )
+
+    def test_long_description_is_matched_in_chunks(self):
+        search = self._save_search(keyword_to_search='zebra')
+        words = ' '.join(f'w{number}x{number * 7}' for number in range(2000))
+        ad = self._create_ad(description=f'{words} zebra')
+        self.assertEqual(list(SavedSearchMatch.objects.filter(ad=ad).values_list('saved_search_id', flat=True)), [search.pk])
+
+    def test_keyword_uses_filter_semantics(self):
+        phrase = self._save_search(keyword_to_search='pro 2023')
+        other_phrase = self._save_search(keyword_to_search='pro 2024')
+        self._create_ad()
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('saved_search_id', flat=True)), [phrase.pk])
+        self.assertFalse(other_phrase.matches_ad(Ad.objects.get()))
+
+    def test_radius_search_matches_nearby_ads(self):
+        search = self._save_search(near='12.9249,80.1000', radius='50')
+        self._create_ad(location='Bengaluru')
+        nearby = self._create_ad(location='Chennai')
+        self.assertEqual(list(search.matches.values_list('ad_id', flat=True)), [nearby.pk])
+
+    def test_own_ads_and_inactive_ads_are_not_matched(self):
+        SavedSearch.objects.create(user=self.seller, params={'keyword_to_search': 'macbook'})
+        self._save_search(keyword_to_search='macbook')
+        ad = self._create_ad(is_active=False)
+        self.assertFalse(SavedSearchMatch.objects.exists())
+        ad.is_active = True
+        ad.save()
+        self.assertEqual(list(SavedSearchMatch.objects.values_list('user_id', flat=True)), [self.buyer.pk])
+
+    def test_percolating_twice_does_not_duplicate_matches(self):
+        self._save_search(keyword_to_search='macbook')
+        ad = self._create_ad()
+        percolate(ad)
+        self.assertEqual(SavedSearchMatch.objects.count(), 1)
+
+
+class SavedSearchViewTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', password='password')
+        self.buyer = User.objects.create_user(username='buyer', password='password')
+        self.category = Category.objects.create(name='Electronics')
+        self.client.force_login(self.buyer)
+
+    def test_save_search_from_filter_params(self):
+        response = self.client.post(reverse('saved_search_create'), {'keyword_to_search': 'iphone', 'page': '2'})
+        self.assertRedirects(response, reverse('ad_list') + '?keyword_to_search=iphone')
+        self.assertEqual(SavedSearch.objects.get().params, {'keyword_to_search': 'iphone'})
+
+    def test_empty_or_invalid_search_is_not_saved(self):
+        self.client.post(reverse('saved_search_create'), {})
+        self.client.post(reverse('saved_search_create'), {'minimum_price': 'cheap'})
+        self.assertFalse(SavedSearch.objects.exists())
+
+    def test_ad_list_offers_to_save_filtered_search(self):
+        response = self.client.get(reverse('ad_list'), {'keyword_to_search': 'iphone'})
+        self.assertContains(response, 'Save this search')
+        response = self.client.get(reverse('ad_list'))
+        self.assertNotContains(response, 'Save this search')
+
+    def test_feed_lists_matches_and_marks_them_seen(self):
+        SavedSearch.objects.create(user=self.buyer, params={'keyword_to_search': 'iphone'})
+        Ad.objects.create(
+            title='iPhone 14', description='Used', user=self.seller, category=self.category,
+            location='Chennai', contact_info='s@example.com'
+        )
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['new_matches_count'], 1)
+
+        response = self.client.get(reverse('saved_search_feed'))
+        self.assertContains(response, 'iPhone 14')
+        self.assertContains(response, 'New</span>')
+        self.assertFalse(SavedSearchMatch.objects.filter(seen=False).exists())
+
+    def test_delete_only_own_search(self):
+        own = SavedSearch.objects.create(user=self.buyer, params={'location': 'Chennai'})
+        other = SavedSearch.objects.create(user=self.seller, params={'location': 'Chennai'})
+        self.assertEqual(self.client.post(reverse('saved_search_delete', args=[other.pk])).status_code, 404)
+        self.assertRedirects(self.client.post(reverse('saved_search_delete', args=[own.pk])), reverse('saved_search_list'))
+        self.assertEqual(list(SavedSearch.objects.all()), [other])
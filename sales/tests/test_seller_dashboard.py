@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from sales.models import Ad, AdImage, Category, Conversation, Message
+from sales.tests.utils import BufferResetTestCase
+
+User = get_user_model()
+
+
+class SellerAdDashboardTests(BufferResetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.seller = User.objects.create_user(username='seller', password='password', email='s@example.com')
+        self.buyers = [
+            User.objects.create_user(username=f'buyer{n}', password='password', email=f'b{n}@example.com')
+            for n in range(2)
+        ]
+        self.category = Category.objects.create(name='Vehicles')
+        self.bike = self._create_ad('Bike')
+        self.car = self._create_ad('Car', is_active=False)
+        self._create_ad('Van', user=self.buyers[0])
+
+        AdImage.objects.create(ad=self.bike, image='ad_images/bike-front.png')
+        AdImage.objects.create(ad=self.bike, image='ad_images/bike-side.png')
+        for buyer in self.buyers:
+            conversation = Conversation.objects.create(ad=self.bike, buyer=buyer)
+            Message.objects.create(conversation=conversation, sender=buyer, content='Still available?')
+            Message.objects.create(conversation=conversation, sender=self.seller, content='Yes')
+        self.last_inquiry = Message.objects.create(conversation=conversation, sender=buyer, content='Can I see it?')
+        Message.objects.filter(sender=self.buyers[0]).update(read=True)
+        self.client.login(username='seller', password='password')
+
+    def _create_ad(self, title, user=None, is_active=True):
+        return Ad.objects.create(
+            title=title, description=title, user=user or self.seller, category=self.category,
+            location='Chennai', price=100, contact_info='s@example.com', is_active=is_active
+        )
+
+    def test_lists_only_the_sellers_ads_including_inactive(self):
+        response = self.client.get(reverse('seller_ad_dashboard'))
+        self.assertEqual([ad.title for ad in response.context['ads']], ['Car', 'Bike'])
+        self.assertContains(response, 'Inactive')
+
+    def test_per_ad_stats(self):
+        response = self.client.get(reverse('seller_ad_dashboard'))
+        bike = next(ad for ad in response.context['ads'] if ad.pk == self.bike.pk)
+        self.assertEqual(bike.conversation_count, 2)
+        self.assertEqual(bike.unread_count, 2)
+        self.assertEqual(bike.image_count, 2)
+        self.assertEqual(bike.last_inquiry_at, self.last_inquiry.sent_at)
+        self.assertTrue(bike.cover_image_url.endswith('bike-front.png'))
+
+    def test_ad_without_activity(self):
+        response = self.client.get(reverse('seller_ad_dashboard'))
+        car = next(ad for ad in response.context['ads'] if ad.pk == self.car.pk)
+        self.assertEqual((car.conversation_count, car.unread_count, car.image_count), (0, 0, 0))
+        self.assertIsNone(car.last_inquiry_at)
+        self.assertIsNone(car.cover_image_url)
+
+    def _ad_queries(self):
+        self.client.get(reverse('seller_ad_dashboard'))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('seller_ad_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries if 'FROM "sales_ad"' in query['sql']]
+
+    def test_query_count_does_not_grow_with_ads(self):
+        few = self._ad_queries()
+        for n in range(30):
+            ad = self._create_ad(f'Ad {n}')
+            Conversation.objects.create(ad=ad, buyer=self.buyers[n % 2])
+        many = self._ad_queries()
+        self.assertEqual(len(few), 2)
+        self.assertEqual(len(many), 2)
+
+    def test_dashboard_links_to_my_ads(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, reverse('seller_ad_dashboard'))
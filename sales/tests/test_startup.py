@@ -0,0 +1,30 @@
+from io import StringIO
+from django.core.management import call_command
+from django.template import engines
+from django.test import SimpleTestCase
+from sales.management.commands.profile_startup import parse_importtime
+from sales.startup import warm_up
+
+
+class StartupTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   _io\n"
+            "import time:      3136 |      19544 | myproject.urls\n"
+            "not an import line\n"
+        )
+        self.assertEqual(parse_importtime(output), [('_io', 120, 120), ('myproject.urls', 3136, 19544)])
+
+    def test_warm_up_compiles_templates(self):
+        warm_up()
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertTrue(any('ad_list_view.html' in str(key) for key in getattr(loader, 'get_template_cache', {})))
+
+    def test_profile_startup_command(self):
+        out = StringIO()
+        call_command('profile_startup', '--limit', '3', '--runs', '1', stdout=out)
+        output = out.getvalue()
+        self.assertIn('Slowest modules', output)
+        self.assertIn('django', output)
+        self.assertIn('Boot benchmark over 1 runs', output)
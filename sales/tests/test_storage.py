@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from sales.deletion import delete_pending_files
+from sales.lifecycle import archive_ads, restore_ad
+from sales.models import Ad, AdImage, ArchivedAd, Category, MediaBlob
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seller', password='password')
+        self.ad = Ad.objects.create(
+            title='Bike', description='Bike', user=self.user, category=Category.objects.create(name='Vehicles'),
+            location='Chennai', price=100, contact_info='s@example.com'
+        )
+
+    def _add_image(self, name, content):
+        return AdImage.objects.create(ad=self.ad, image=SimpleUploadedFile(name, content))
+
+    def test_same_content_is_stored_once(self):
+        first = self._add_image('bike.jpg', b'same photo')
+        second = self._add_image('copy.jpg', b'same photo')
+        other = self._add_image('other.jpg', b'another photo')
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('blobs/'))
+        self.assertEqual(os.path.basename(first.image.name), 'bike.jpg')
+        self.assertNotEqual(other.image.name, first.image.name)
+        self.assertEqual(len(os.listdir(os.path.dirname(first.image.path))), 1)
+        blob = MediaBlob.objects.get(name=first.image.name)
+        self.assertEqual((blob.size, blob.reference_count), (10, 2))
+
+    def test_file_is_removed_with_its_last_reference(self):
+        name = self._add_image('bike.jpg', b'same photo').image.name
+        self._add_image('bike.jpg', b'same photo')
+
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).reference_count, 1)
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+        # A removed blob is stored again on the next upload of its content.
+        self.assertTrue(default_storage.exists(self._add_image('bike.jpg', b'same photo').image.name))
+
+    def test_cascade_deletes_release_references(self):
+        shared = self._add_image('bike.jpg', b'same photo').image.name
+        archived_ad = Ad.objects.create(
+            title='Old bike', description='Old bike', user=self.user, category=self.ad.category,
+            location='Chennai', price=100, contact_info='s@example.com'
+        )
+        AdImage.objects.create(ad=archived_ad, image=SimpleUploadedFile('old.jpg', b'same photo'))
+        archived_only = AdImage.objects.create(ad=archived_ad, image=SimpleUploadedFile('old.jpg', b'old photo'))
+        Ad.objects.filter(pk=archived_ad.pk).update(is_active=False, updated_at=timezone.now() - timedelta(days=365))
+        archive_ads()
+        self.assertEqual(MediaBlob.objects.get(name=shared).reference_count, 2)
+
+        # Deleting the user cascades to their ads, images and archived ads.
+        self.user.delete()
+        self.assertEqual(delete_pending_files(), 3)
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(default_storage.exists(shared))
+        self.assertFalse(default_storage.exists(archived_only.image.name))
+
+    def test_restore_keeps_archived_references(self):
+        name = self._add_image('bike.jpg', b'photo').image.name
+        Ad.objects.filter(pk=self.ad.pk).update(is_active=False, updated_at=timezone.now() - timedelta(days=365))
+        archive_ads()
+        restore_ad(ArchivedAd.objects.get())
+        self.assertEqual(delete_pending_files(), 0)
+        self.assertEqual(MediaBlob.objects.get(name=name).reference_count, 1)
+        self.assertEqual(AdImage.objects.get().image.name, name)
+
+    def test_dedupe_media_command(self):
+        legacy_storage = FileSystemStorage(location=MEDIA_ROOT)
+        legacy_names = [
+            legacy_storage.save(name, ContentFile(content))
+            for name, content in (('ad_images/a.jpg', b'photo'), ('ad_images/b.jpg', b'photo'), ('ad_images/c.jpg', b'other'))
+        ]
+        images = [AdImage.objects.create(ad=self.ad, image=name) for name in legacy_names]
+        self.user.profile_picture = legacy_names[0]
+        self.user.save()
+
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('Moved 3 files into the blob store, freed 5 bytes.', out.getvalue())
+
+        for image in images:
+            image.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(images[0].image.name, images[1].image.name)
+        self.assertEqual(self.user.profile_picture.name, images[0].image.name)
+        self.assertEqual(MediaBlob.objects.get(name=images[0].image.name).reference_count, 3)
+        self.assertEqual(images[2].image.read(), b'other')
+        self.assertFalse(any(legacy_storage.exists(name) for name in legacy_names))
+
+        call_command('dedupe_media', stdout=out)
+        self.assertIn('Moved 0 files into the blob store, freed 0 bytes.', out.getvalue())
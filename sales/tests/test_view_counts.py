@@ -0,0 +1,142 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from sales import buffers, view_counts
+from sales.models import Ad, AdDailyViews, Category
+
+User = get_user_model()
+
+
+@override_settings(AD_VIEW_FLUSH_INTERVAL=60, AD_VIEW_MAX_PENDING=1000)
+class AdViewCountTests(TestCase):
+    def setUp(self):
+        view_counts.clear()
+        self.owner = User.objects.create_user(username="owner", password="pass123")
+        self.visitor = User.objects.create_user(username="visitor", password="pass123")
+        self.category = Category.objects.create(name="Test Category")
+        self.ad = Ad.objects.create(
+            title="Test Ad", user=self.owner, category=self.category,
+            description="Description", location="X", contact_info="o@example.com"
+        )
+        self.other_ad = Ad.objects.create(
+            title="Other Ad", user=self.owner, category=self.category,
+            description="Description", location="X", contact_info="o@example.com"
+        )
+
+    def tearDown(self):
+        view_counts.clear()
+
+    def test_detail_view_does_not_write(self):
+        self.client.force_login(self.visitor)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.ad.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(q['sql'].startswith('UPDATE') for q in context.captured_queries))
+        self.assertEqual(view_counts.pending_views(self.ad.pk), 1)
+
+    def test_owner_views_are_not_counted(self):
+        self.client.force_login(self.owner)
+        self.client.get(self.ad.get_absolute_url())
+        self.assertEqual(view_counts.pending_views(self.ad.pk), 0)
+
+    def test_flush_updates_totals_and_daily_rollup(self):
+        for _ in range(3):
+            view_counts.record_view(self.ad.pk)
+        view_counts.record_view(self.other_ad.pk)
+        self.assertEqual(view_counts.flush(), 4)
+
+        self.ad.refresh_from_db()
+        self.other_ad.refresh_from_db()
+        self.assertEqual((self.ad.views, self.other_ad.views), (3, 1))
+        daily = AdDailyViews.objects.get(ad=self.ad, date=timezone.localdate())
+        self.assertEqual(daily.views, 3)
+
+        view_counts.record_view(self.ad.pk)
+        view_counts.flush()
+        daily.refresh_from_db()
+        self.assertEqual(daily.views, 4)
+
+    @override_settings(AD_VIEW_BATCH_SIZE=100)
+    def test_flush_uses_bulk_statements(self):
+        for ad in (self.ad, self.other_ad):
+            view_counts.record_view(ad.pk)
+        with CaptureQueriesContext(connection) as context:
+            view_counts.flush()
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn('CASE', updates[0])
+
+    def test_flush_skips_deleted_ads(self):
+        view_counts.record_view(self.other_ad.pk)
+        self.other_ad.delete()
+        self.assertEqual(view_counts.flush(), 0)
+        self.assertFalse(AdDailyViews.objects.exists())
+
+    def test_owner_sees_view_count_including_pending(self):
+        Ad.objects.filter(pk=self.ad.pk).update(views=5)
+        view_counts.record_view(self.ad.pk)
+        self.client.force_login(self.owner)
+        response = self.client.get(self.ad.get_absolute_url())
+        self.assertEqual(response.context['view_count'], 6)
+        self.assertContains(response, 'Views:')
+
+    def test_visitor_does_not_see_view_count(self):
+        self.client.force_login(self.visitor)
+        response = self.client.get(self.ad.get_absolute_url())
+        self.assertNotIn('view_count', response.context)
+
+    @override_settings(AD_VIEW_MAX_PENDING=2)
+    def test_request_finished_flushes_when_buffer_full(self):
+        self.client.force_login(self.visitor)
+        self.client.get(self.ad.get_absolute_url())
+        self.client.get(self.ad.get_absolute_url())
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.views, 2)
+        self.assertEqual(view_counts.pending_views(self.ad.pk), 0)
+
+    def test_saving_a_stale_copy_keeps_flushed_views(self):
+        stale = Ad.objects.get(pk=self.ad.pk)
+        view_counts.record_view(self.ad.pk)
+        view_counts.flush()
+        stale.title = "Renamed"
+        stale.save()
+        self.ad.refresh_from_db()
+        self.assertEqual((self.ad.title, self.ad.views), ("Renamed", 1))
+
+    def test_saving_a_partial_copy_writes_only_loaded_fields(self):
+        Ad.objects.filter(pk=self.ad.pk).update(views=3)
+        partial = Ad.objects.only('title').get(pk=self.ad.pk)
+        Ad.objects.filter(pk=self.ad.pk).update(description="Changed elsewhere")
+        partial.title = "Renamed"
+        with CaptureQueriesContext(connection) as context:
+            partial.save()
+        queries = [query['sql'] for query in context.captured_queries]
+        # The save itself is a single UPDATE of the loaded field, without
+        # refreshing the deferred ones first; the receivers run afterwards.
+        self.assertEqual(queries[0], f'UPDATE "sales_ad" SET "title" = \'Renamed\' WHERE "sales_ad"."id" = {self.ad.pk}')
+        self.assertEqual(sum(sql.startswith('UPDATE "sales_ad"') for sql in queries), 1)
+        expires_at = self.ad.expires_at
+        self.ad.refresh_from_db()
+        self.assertEqual(
+            (self.ad.title, self.ad.views, self.ad.description, self.ad.expires_at),
+            ("Renamed", 3, "Changed elsewhere", expires_at),
+        )
+
+    def test_idle_worker_flushes_due_views(self):
+        view_counts.record_view(self.ad.pk)
+        with override_settings(AD_VIEW_FLUSH_INTERVAL=0):
+            buffers.flush_due_all()
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.views, 1)
+
+    def test_flush_view_counts_command(self):
+        view_counts.record_view(self.ad.pk)
+        call_command('flush_view_counts', stdout=StringIO())
+        self.ad.refresh_from_db()
+        self.assertEqual(self.ad.views, 1)
+        self.assertEqual(view_counts.pending_views(self.ad.pk), 0)
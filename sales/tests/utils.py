@@ -0,0 +1,16 @@
+from django.test import TestCase
+
+from sales import read_receipts, view_counts
+
+
+class BufferResetTestCase(TestCase):
+    """
+    A TestCase that empties the in-process write buffers before each test, so
+    views and read watermarks buffered by earlier tests are not flushed into
+    the queries a test counts.
+    """
+
+    def setUp(self):
+        super().setUp()
+        view_counts.clear()
+        read_receipts.clear()
@@ -0,0 +1,27 @@
+import re
+
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return WORD_RE.findall(text.lower()) if text else []
+
+
+def ngrams(text, max_size):
+    """Return the set of substrings of up to `max_size` characters of the words in text."""
+    grams = set()
+    for token in set(tokenize(text)):
+        for size in range(1, max_size + 1):
+            grams.update(token[start:start + size] for start in range(len(token) - size + 1))
+    return grams
+
+
+def keyword_anchor(keyword, size):
+    """
+    Return a lowercase string of at most `size` word characters that occurs
+    in every text containing `keyword` (compared case-insensitively), or ''
+    when the keyword has no word characters.
+    """
+    terms = tokenize(keyword)
+    return max(terms, key=len)[:size] if terms else ''
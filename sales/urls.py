@@ -1,11 +1,27 @@
 from django.urls import path
-from .views import AdListView, AdDetailView, AdCreateView, AdUpdateView, AdDeleteView, DashboardView
+from .views import (
+    AdListView, AdDetailView, AdCreateView, AdUpdateView, AdDeleteView, DashboardView,
+    SavedSearchCreateView, SavedSearchListView, SavedSearchDeleteView, SavedSearchFeedView,
+    AutocompleteView, ArchivedAdListView, ArchivedAdRestoreView, AdImageReorderView, AdImageUploadView,
+    MetricsView, SellerAdDashboardView
+)
 
 urlpatterns = [
     path('', AdListView.as_view(), name='ad_list'),
     path('ads/<int:pk>/', AdDetailView.as_view(), name='ad_detail'),
     path('ad/new/', AdCreateView.as_view(), name='ad_create'),
     path('ad/<int:ad_id>/update/', AdUpdateView.as_view(), name='ad_update'),
+    path('ad/<int:ad_id>/images/reorder/', AdImageReorderView.as_view(), name='ad_image_reorder'),
+    path('ad/<int:ad_id>/images/upload/', AdImageUploadView.as_view(), name='ad_image_upload'),
     path('ad/<int:ad_id>/delete/', AdDeleteView.as_view(), name='ad_delete'),
+    path('ads/archived/', ArchivedAdListView.as_view(), name='archived_ad_list'),
+    path('ads/archived/<int:archived_ad_id>/restore/', ArchivedAdRestoreView.as_view(), name='archived_ad_restore'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('dashboard/ads/', SellerAdDashboardView.as_view(), name='seller_ad_dashboard'),
+    path('searches/', SavedSearchListView.as_view(), name='saved_search_list'),
+    path('searches/save/', SavedSearchCreateView.as_view(), name='saved_search_create'),
+    path('searches/<int:search_id>/delete/', SavedSearchDeleteView.as_view(), name='saved_search_delete'),
+    path('autocomplete/', AutocompleteView.as_view(), name='ad_autocomplete'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('feed/', SavedSearchFeedView.as_view(), name='saved_search_feed'),
 ]
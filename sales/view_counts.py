@@ -0,0 +1,106 @@
+"""
+Buffered ad view counters.
+
+`AdDetailView` calls `record_view()`, which only bumps an in-memory counter
+keyed by (ad id, day). Pending counts are written in bulk by `flush()`: one
+`UPDATE ... SET views = views + CASE ...` per batch of ads for `Ad.views`,
+and the same for the `AdDailyViews` rollup rows of each day.
+
+Flushing happens after a request finishes and from an idle worker's flush
+thread, once `AD_VIEW_FLUSH_INTERVAL` seconds have passed or
+`AD_VIEW_MAX_PENDING` views are buffered, and when the worker exits (see
+sales/buffers.py), so a crashed worker loses at most that many views.
+"""
+import operator
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models import Case, When, Value, F
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import buffers
+from .models import Ad, AdDailyViews
+
+_buffer = buffers.WriteBuffer(combine=operator.add, size=lambda pending: sum(pending.values()))
+
+
+def record_view(ad_id):
+    """
+    Count one detail page view for the ad. Nothing is written to the database.
+    """
+    _buffer.add((ad_id, timezone.localdate()), 1)
+
+
+def pending_views(ad_id):
+    return sum(_buffer.values_for(lambda key: key[0] == ad_id))
+
+
+def clear():
+    """Drop every buffered view without writing it."""
+    _buffer.clear()
+
+
+def flush():
+    """
+    Write every buffered view to `Ad.views` and the daily rollup table.
+    Returns the number of views written.
+    """
+    counts = _buffer.drain()
+    if not counts:
+        return 0
+
+    existing_ad_ids = set(
+        Ad.objects.filter(pk__in={ad_id for ad_id, _ in counts}).values_list('pk', flat=True)
+    )
+    counts = {key: count for key, count in counts.items() if key[0] in existing_ad_ids}
+
+    totals_by_ad = defaultdict(int)
+    counts_by_day = defaultdict(dict)
+    for (ad_id, day), count in counts.items():
+        totals_by_ad[ad_id] += count
+        counts_by_day[day][ad_id] = count
+
+    batch_size = getattr(settings, 'AD_VIEW_BATCH_SIZE', 200)
+    with transaction.atomic():
+        for batch in _batched(totals_by_ad, batch_size):
+            Ad.objects.filter(pk__in=batch).update(views=F('views') + _increment_case(batch))
+        for day, day_counts in counts_by_day.items():
+            AdDailyViews.objects.bulk_create(
+                [AdDailyViews(ad_id=ad_id, date=day) for ad_id in day_counts],
+                ignore_conflicts=True,
+            )
+            for batch in _batched(day_counts, batch_size):
+                AdDailyViews.objects.filter(date=day, ad_id__in=batch).update(
+                    views=F('views') + _increment_case(batch, field='ad_id')
+                )
+    return sum(counts.values())
+
+
+def _batched(counts, batch_size):
+    items = list(counts.items())
+    for start in range(0, len(items), batch_size):
+        yield dict(items[start:start + batch_size])
+
+
+def _increment_case(counts, field='pk'):
+    return Case(
+        *[When(**{field: key}, then=Value(count)) for key, count in counts.items()],
+        default=Value(0),
+    )
+
+
+@receiver(request_finished, dispatch_uid='sales.view_counts.flush_due')
+def flush_due(**kwargs):
+    """
+    Flush buffered views once the flush interval has elapsed or the buffer
+    has grown past its limit. Runs after each request and from the worker's
+    flush thread.
+    """
+    if _buffer.is_due(getattr(settings, 'AD_VIEW_FLUSH_INTERVAL', 30), getattr(settings, 'AD_VIEW_MAX_PENDING', 1000)):
+        flush()
+
+
+buffers.register(flush, flush_due)
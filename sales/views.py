@@ -1,20 +1,39 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView
-from .models import Ad, Conversation, Message, Category
+from django.views.generic.detail import SingleObjectMixin
+from .models import Ad, AdImage, ArchivedAd, Conversation, Message, SavedSearch, SavedSearchMatch
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from urllib.parse import urlencode
 from django.contrib import messages
-from .forms import AdForm, AdImageFormSet, MessageForm
-from .mixins import AdOwnerRequiredMixin
-from django.http import JsonResponse, HttpResponseForbidden
+from .forms import AdForm, AdImageForm, AdImageFormSet, MessageForm
+from .mixins import AdOwnerRequiredMixin, CachedObjectMixin, InboxPaginationMixin, RateLimitMixin
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
 from django.utils import timezone
-from django.db.models import Q, Case, When, F, Exists, OuterRef
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q, Case, When, F, Max
 from django.utils.dateparse import parse_datetime, parse_date
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView
 from django_filters.views import FilterView
-from .filters import AdFilter
+from .filters import AdFilter, get_filter_params
+from .geo import DEFAULT_RADIUS_KM
+from .facets import get_facets
+from .autocomplete import ad_autocomplete
+from .seller_stats import annotate_seller_stats
+from . import metrics
+from . import deletion, lifecycle, read_receipts, view_counts
+from datetime import timedelta
+import json
+
+DAILY_VIEWS_DAYS = 14
+RADIUS_CHOICES_KM = (5, 10, 25, 50, 100)
+AUTOCOMPLETE_FIELDS = ('title', 'location')
+AUTOCOMPLETE_LIMIT = 8
 
 class AdListView(FilterView):
     model = Ad
@@ -39,8 +58,11 @@ class AdListView(FilterView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['facets'] = get_facets(self.request.GET)
+        context['radius_choices'] = RADIUS_CHOICES_KM
+        context['default_radius'] = DEFAULT_RADIUS_KM
         context['current_filters'] = self.request.GET.urlencode()
+        context['filter_params'] = get_filter_params(self.request.GET)
         return context
 
 class AdDetailView(LoginRequiredMixin ,DetailView):
@@ -61,6 +83,18 @@ class AdDetailView(LoginRequiredMixin ,DetailView):
         context['show_user_contact_info'] = ad_owner.contact_info_visibility
         context['user_phone_number'] = ad_owner.phone_number if ad_owner.contact_info_visibility else None
         context['images'] = ad.images.all()
+        context['related_ads'] = [
+            link.related for link in
+            ad.related_links.filter(related__is_active=True).select_related('related', 'related__category')
+        ]
+
+        if ad.user_id == user.pk:
+            context['view_count'] = ad.views + view_counts.pending_views(ad.pk)
+            context['daily_views'] = ad.daily_views.filter(
+                date__gte=timezone.localdate() - timedelta(days=DAILY_VIEWS_DAYS - 1)
+            )
+        else:
+            view_counts.record_view(ad.pk)
 
         return context
 
@@ -103,112 +137,177 @@ class AdUpdateView(LoginRequiredMixin, AdOwnerRequiredMixin, AdImageFormsetMixin
     pk_url_kwarg = 'ad_id'
     success_message = "Ad updated successfully!"
 
+@method_decorator(require_http_methods(["POST"]), name='dispatch')
+class AdImageReorderView(LoginRequiredMixin, AdOwnerRequiredMixin, SingleObjectMixin, View):
+    """
+    Apply a complete new ordering of an ad's images, given as a JSON list of
+    image ids, with a single bulk UPDATE.
+    """
+    model = Ad
+    pk_url_kwarg = 'ad_id'
+
+    def post(self, request, *args, **kwargs):
+        image_ids = self._get_image_ids(request)
+        images = {image.pk: image for image in self.get_object().images.only('pk', 'order')}
+        if image_ids is None or len(image_ids) != len(images) or set(image_ids) != set(images):
+            return JsonResponse({'error': 'Send the ids of all of the ad\'s images, in the new order.'}, status=400)
+
+        self._apply_order(images, image_ids)
+        return JsonResponse({'order': image_ids})
+
+    def _get_image_ids(self, request):
+        try:
+            image_ids = json.loads(request.body).get('order')
+        except (ValueError, AttributeError):
+            return None
+        if not isinstance(image_ids, list) or not all(isinstance(pk, int) for pk in image_ids):
+            return None
+        return image_ids
+
+    def _apply_order(self, images, image_ids):
+        # Image order values are global across ads, so the ad's own values
+        # are redistributed instead of renumbering from zero.
+        order_values = sorted(image.order for image in images.values())
+        changed = []
+        for image_id, order in zip(image_ids, order_values):
+            image = images[image_id]
+            if image.order != order:
+                image.order = order
+                changed.append(image)
+        AdImage.objects.bulk_update(changed, ['order'])
+
+@method_decorator(require_http_methods(["POST"]), name='dispatch')
+class AdImageUploadView(LoginRequiredMixin, AdOwnerRequiredMixin, SingleObjectMixin, View):
+    """
+    Add several images to an ad from one multipart request. The images are
+    validated first and then inserted in one transaction, after the ad's
+    existing images.
+    """
+    model = Ad
+    pk_url_kwarg = 'ad_id'
+
+    def post(self, request, *args, **kwargs):
+        files = request.FILES.getlist('images')
+        limit = getattr(settings, 'AD_IMAGE_UPLOAD_LIMIT', 20)
+        if not files:
+            return JsonResponse({'error': 'No images were sent.'}, status=400)
+        if len(files) > limit:
+            return JsonResponse({'error': f'Upload at most {limit} images at a time.'}, status=400)
+
+        errors = self._validate_files(files)
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+
+        images = self._create_images(self.get_object(), files)
+        return JsonResponse({
+            'images': [{'id': image.pk, 'url': image.image.url, 'order': image.order} for image in images]
+        }, status=201)
+
+    def _validate_files(self, files):
+        errors = {}
+        for file in files:
+            image_form = AdImageForm(files={'image': file})
+            if not image_form.is_valid():
+                errors[file.name] = image_form.errors['image']
+        return errors
+
+    def _create_images(self, ad, files):
+        with transaction.atomic():
+            # Same numbering OrderedModel.save() would use, once for the batch.
+            next_order = (AdImage.objects.aggregate(max_order=Max('order'))['max_order'] or 0) + 1
+            return AdImage.objects.bulk_create([
+                AdImage(ad=ad, image=file, order=next_order + index) for index, file in enumerate(files)
+            ])
+
 class AdDeleteView(LoginRequiredMixin, AdOwnerRequiredMixin, DeleteView):
     model = Ad
     template_name = 'ad_confirm_delete.html'
     pk_url_kwarg = 'ad_id'
     success_url = reverse_lazy('ad_list')
 
+    def form_valid(self, form):
+        # The ad is hidden now and removed with its conversations and images
+        # by the background deletion job.
+        deletion.schedule_ad_deletion(self.object)
+        messages.success(self.request, f'"{self.object.title}" has been deleted.')
+        return redirect(self.get_success_url())
+
 class StartConversationView(LoginRequiredMixin, View):
     def get(self, request, ad_id, *args, **kwargs):
         ad = self._get_active_ad_or_404(ad_id)
-        owner_user = ad.user
         buyer_user = request.user
 
-        if self._is_owner_starting_conversation(owner_user, buyer_user):
+        if self._is_owner_starting_conversation(ad, buyer_user):
             return self._redirect_to_ad_conversations(ad.id)
 
-        conversation = self._get_or_create_conversation(ad, owner_user, buyer_user)
+        conversation = self._get_or_create_conversation(ad, buyer_user)
         return self._redirect_to_conversation_detail(conversation.pk)
 
     def _get_active_ad_or_404(self, ad_id):
         return get_object_or_404(Ad, pk=ad_id, is_active=True)
 
-    def _is_owner_starting_conversation(self, owner_user, buyer_user):
-        return owner_user == buyer_user
+    def _is_owner_starting_conversation(self, ad, buyer_user):
+        return ad.user_id == buyer_user.pk
 
     def _redirect_to_ad_conversations(self, ad_id):
         return redirect('conversation_list_for_ad', ad_id=ad_id)
 
-    def _get_or_create_conversation(self, ad, owner_user, buyer_user):
-        conversation, _ = Conversation.objects.get_or_create(
-            ad=ad,
-            owner=owner_user,
-            buyer=buyer_user
-        )
-        return conversation
+    def _get_or_create_conversation(self, ad, buyer_user):
+        return Conversation.objects.get_or_start(ad, buyer_user)
 
     def _redirect_to_conversation_detail(self, conversation_id):
         return redirect('conversation_detail', conversation_id=conversation_id)
 
-class ConversationListView(LoginRequiredMixin, ListView):
+class ConversationListView(LoginRequiredMixin, InboxPaginationMixin, ListView):
     model = Conversation
     template_name = 'conversations/list.html'
     context_object_name = 'conversations'
 
     def get_queryset(self):
-        current_user = self.request.user
-        qs = self._get_user_conversations(current_user)
-
-        # check query param
-        filter_type = self.request.GET.get("filter")
-        if filter_type == "unread":
-            unread_message_exists = Exists(
-                Message.objects.filter(
-                    conversation=OuterRef('pk'),
-                    read=False
-                ).exclude(sender=current_user)
-            )
-            qs = qs.annotate(has_unread=unread_message_exists).filter(has_unread=True)
-
-        return qs
-
-    def _get_user_conversations(self, user):
-        return (
-            Conversation.objects
-            .filter(self._get_user_filter(user))
-            .select_related('ad', 'buyer', 'ad__user')
-            .annotate(other_username=self._get_other_username_annotation(user))
-            .order_by('-created_at')
+        unread_only = self.request.GET.get("filter") == "unread"
+        if unread_only:
+            read_receipts.flush(user_id=self.request.user.pk)
+        return self.get_inbox_conversations(
+            ad_id=self._get_ad_id_param(),
+            unread_only=unread_only,
         )
 
-    def _get_user_filter(self, user):
-        return Q(ad__user=user) | Q(buyer=user)
-
-    def _get_other_username_annotation(self, user):
-        return Case(
-            When(ad__user=user, then=F('buyer__username')),
-            default=F('ad__user__username'),
-        )
+    def _get_ad_id_param(self):
+        try:
+            return int(self.request.GET['ad_id'])
+        except (KeyError, ValueError):
+            return None
 
-class ConversationDetailView(LoginRequiredMixin, DetailView):
+class ConversationDetailView(LoginRequiredMixin, CachedObjectMixin, DetailView):
     model = Conversation
     template_name = 'conversations/detail.html'
     context_object_name = 'conversation'
     pk_url_kwarg = 'conversation_id'
 
+    def get_queryset(self):
+        return Conversation.objects.select_related('ad', 'owner', 'buyer')
+
     def dispatch(self, request, *args, **kwargs):
         conversation = self.get_object()
-        if request.user not in (conversation.owner, conversation.buyer):
+        if not conversation.has_participant(request.user):
             return HttpResponseForbidden("You don't have access to this conversation.")
-
-        Message.objects.filter(
-            conversation=conversation,
-            read=False
-        ).exclude(sender=request.user).update(read=True)
-
         return super().dispatch(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         conversation = self.object
-        context['messages'] = conversation.messages.select_related('sender').all()
+        conversation_messages = list(conversation.messages.select_related('sender').all())
+        if conversation_messages:
+            read_receipts.mark_read(conversation.pk, self.request.user.pk, conversation_messages[-1].pk)
+        context['messages'] = conversation_messages
         context['form'] = MessageForm()
         context["other_user"] = conversation.other_user(self.request.user)
         return context
 
 
-class SendMessageView(LoginRequiredMixin, View):
+class SendMessageView(LoginRequiredMixin, RateLimitMixin, View):
+    rate_limit_scope = 'send_message'
+
     def post(self, request, conversation_id, *args, **kwargs):
         conversation = self._get_conversation_or_forbidden(conversation_id, request.user)
         if isinstance(conversation, JsonResponse):
@@ -217,6 +316,7 @@ class SendMessageView(LoginRequiredMixin, View):
         message_form = MessageForm(request.POST)
 
         if message_form.is_valid():
+            read_receipts.flush(conversation_id=conversation.pk)
             message = self._create_message(message_form, conversation, request.user)
             return self._build_success_response(message)
 
@@ -224,7 +324,7 @@ class SendMessageView(LoginRequiredMixin, View):
 
     def _get_conversation_or_forbidden(self, conversation_id, user):
         conversation = get_object_or_404(Conversation, pk=conversation_id)
-        if user not in (conversation.owner, conversation.buyer):
+        if not conversation.has_participant(user):
             return JsonResponse({'error': 'forbidden'}, status=403)
         return conversation
 
@@ -247,7 +347,9 @@ class SendMessageView(LoginRequiredMixin, View):
     def _build_error_response(self, message_form):
         return JsonResponse({'errors': message_form.errors}, status=400)
 
-class ConversationMessagesJSONView(LoginRequiredMixin, View):
+class ConversationMessagesJSONView(LoginRequiredMixin, RateLimitMixin, View):
+    rate_limit_scope = 'poll_messages'
+
     def get(self, request, conversation_id, *args, **kwargs):
         conversation = self._get_conversation_or_forbidden(conversation_id, request.user)
         if isinstance(conversation, JsonResponse):
@@ -259,6 +361,8 @@ class ConversationMessagesJSONView(LoginRequiredMixin, View):
 
         all_message_ids = self._get_message_ids(all_messages_queryset)
         serialized_messages = self._serialize_messages(updated_or_new_messages_queryset)
+        if all_message_ids:
+            read_receipts.mark_read(conversation.pk, request.user.pk, max(all_message_ids))
 
         return JsonResponse({
             'messages': serialized_messages,
@@ -267,7 +371,7 @@ class ConversationMessagesJSONView(LoginRequiredMixin, View):
 
     def _get_conversation_or_forbidden(self, conversation_id, current_user):
         conversation = get_object_or_404(Conversation, pk=conversation_id)
-        if current_user not in (conversation.owner, conversation.buyer):
+        if not conversation.has_participant(current_user):
             return JsonResponse({'error': 'forbidden'}, status=403)
         return conversation
 
@@ -302,17 +406,18 @@ class ConversationMessagesJSONView(LoginRequiredMixin, View):
             for message in messages_queryset
         ]
 
-class AdConversationListView(LoginRequiredMixin, ListView):
+class AdConversationListView(LoginRequiredMixin, InboxPaginationMixin, ListView):
     model = Conversation
     template_name = 'conversations/ad_conversations.html'
     context_object_name = 'conversations'
+    inbox_sides = ('owner',)
 
     def get_queryset(self):
         ad_id = self.kwargs['ad_id']
         self.ad = get_object_or_404(Ad, pk=ad_id)
-        if self.ad.user != self.request.user:
-            return Conversation.objects.none()  # or raise 403
-        return self.ad.conversations.select_related('buyer').all()
+        if self.ad.user_id != self.request.user.pk:
+            return []  # or raise 403
+        return self.get_inbox_conversations(ad_id=self.ad.pk)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -335,7 +440,7 @@ class UpdateMessageView(LoginRequiredMixin, View):
 
     def _get_message_or_forbidden(self, message_id, current_user):
         message = get_object_or_404(Message, pk=message_id)
-        if message.sender != current_user:
+        if message.sender_id != current_user.pk:
             return JsonResponse({'error': 'forbidden'}, status=403)
         return message
 
@@ -369,7 +474,7 @@ class DeleteMessageView(LoginRequiredMixin, View):
 
     def _get_message_or_forbidden(self, message_id, current_user):
         message = get_object_or_404(Message, pk=message_id)
-        if message.sender != current_user:
+        if message.sender_id != current_user.pk:
             return JsonResponse({'error': 'forbidden'}, status=403)
         return message
 
@@ -388,6 +493,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.get_user()
+        read_receipts.flush(user_id=user.pk)
         conversations = self._get_user_conversations(user)
 
         for conv in conversations:
@@ -395,13 +501,12 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
         context["user_obj"] = user
         context["conversations"] = conversations
+        context["new_matches_count"] = user.saved_search_matches.filter(seen=False).count()
         return context
 
     def _get_user_conversations(self, user):
         return (
-            Conversation.objects.filter(
-                Q(owner=user) | Q(buyer=user)
-            )
+            Conversation.objects.for_participant(user)
             .select_related("ad", "owner", "buyer")
             .annotate(
                 other_username=Case(
@@ -411,3 +516,127 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             )
             .order_by("-created_at")
         )
+
+class SavedSearchCreateView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        params = get_filter_params(request.POST)
+        if not params or not AdFilter(params).form.is_valid():
+            messages.error(request, "Apply at least one valid filter before saving a search.")
+            return redirect('ad_list')
+
+        SavedSearch.objects.create(
+            user=request.user,
+            name=request.POST.get('name', '').strip()[:255],
+            params=params,
+        )
+        messages.success(request, "Search saved. Matching new ads will show up in your feed.")
+        return redirect(f"{reverse('ad_list')}?{urlencode(params)}")
+
+class SavedSearchListView(LoginRequiredMixin, ListView):
+    model = SavedSearch
+    template_name = 'saved_searches/list.html'
+    context_object_name = 'saved_searches'
+
+    def get_queryset(self):
+        return self.request.user.saved_searches.all()
+
+@method_decorator(require_http_methods(["POST"]), name='dispatch')
+class SavedSearchDeleteView(LoginRequiredMixin, View):
+    def post(self, request, search_id, *args, **kwargs):
+        saved_search = get_object_or_404(SavedSearch, pk=search_id, user=request.user)
+        saved_search.delete()
+        messages.success(request, "Saved search deleted.")
+        return redirect('saved_search_list')
+
+class SavedSearchFeedView(LoginRequiredMixin, ListView):
+    model = SavedSearchMatch
+    template_name = 'saved_searches/feed.html'
+    context_object_name = 'matches'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return (
+            SavedSearchMatch.objects
+            .filter(user=self.request.user, ad__is_active=True)
+            .select_related('ad', 'ad__category', 'saved_search')
+            .order_by('-matched_at')
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        unseen_ids = [match.pk for match in context['matches'] if not match.seen]
+        if unseen_ids:
+            SavedSearchMatch.objects.filter(pk__in=unseen_ids).update(seen=True)
+        context['unseen_ids'] = set(unseen_ids)
+        return context
+
+class SellerAdDashboardView(LoginRequiredMixin, ListView):
+    """
+    The seller's own ads, active or not, with their conversation, unread
+    message and image counts, last inquiry and cover image.
+    """
+    model = Ad
+    template_name = 'dashboard_ads.html'
+    context_object_name = 'ads'
+    paginate_by = 20
+
+    def get_queryset(self):
+        user = self.request.user
+        read_receipts.flush(user_id=user.pk)
+        ads = (
+            deletion.exclude_pending_deletion(Ad.objects.filter(user=user))
+            .only('pk', 'title', 'price', 'location', 'is_active', 'views', 'created_at', 'expires_at')
+            .order_by('-created_at', '-pk')
+        )
+        return annotate_seller_stats(ads, user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        for ad in context['ads']:
+            ad.cover_image_url = default_storage.url(ad.cover_image) if ad.cover_image else None
+        return context
+
+class ArchivedAdListView(LoginRequiredMixin, ListView):
+    model = ArchivedAd
+    template_name = 'archived_ads/list.html'
+    context_object_name = 'archived_ads'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return self.request.user.archived_ads.defer('data')
+
+@method_decorator(require_http_methods(["POST"]), name='dispatch')
+class ArchivedAdRestoreView(LoginRequiredMixin, View):
+    def post(self, request, archived_ad_id, *args, **kwargs):
+        archived_ad = get_object_or_404(ArchivedAd, pk=archived_ad_id, user=request.user)
+        try:
+            ad = lifecycle.restore_ad(archived_ad)
+        except ValidationError as error:
+            messages.error(request, error.messages[0])
+            return redirect('archived_ad_list')
+        messages.success(request, f'"{ad.title}" has been restored and is active again.')
+        return redirect(ad.get_absolute_url())
+
+class MetricsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Application metrics in the Prometheus text format, for staff only.
+    """
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        body = metrics.REGISTRY.render(getattr(settings, 'METRICS_MULTIPROC_DIR', None))
+        return HttpResponse(body, content_type=metrics.CONTENT_TYPE)
+
+class AutocompleteView(LoginRequiredMixin, View):
+    """Title and location suggestions, for signed-in users like the ad list itself."""
+    def get(self, request, *args, **kwargs):
+        field = request.GET.get('field', 'title')
+        if field not in AUTOCOMPLETE_FIELDS:
+            return JsonResponse({'error': 'Unknown field.'}, status=400)
+        prefix = request.GET.get('q', '').strip()
+        if len(prefix) < 2:
+            return JsonResponse({'suggestions': []})
+        return JsonResponse({'suggestions': ad_autocomplete.suggest(prefix, field, AUTOCOMPLETE_LIMIT)})